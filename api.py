@@ -0,0 +1,417 @@
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pandas as pd
+
+import harga
+import transaksi
+from inventaris import Inventaris, StokTidakCukup, parse_int
+from log_transaksi import LogTransaksi
+
+# ================= REST / JSON API =================
+# API HTTP ringan (http.server bawaan Python, tanpa Streamlit) di atas inti
+# yang sama dengan halaman Kasir & Laporan: katalog dari Inventaris,
+# keranjang transaksi.Keranjang, checkout lewat fungsi checkout milik app dan
+# penjualan / laporan dari fungsi yang sama dengan halaman Laporan.
+#
+#   GET    /sehat
+#   GET    /produk                         GET /produk/<kunci>
+#   POST   /keranjang                      {"daftar": ...} (opsional) -> {"id": ...}
+#   GET    /keranjang/<id>
+#   POST   /keranjang/<id>/item            {"kunci": ..., "qty": 1}
+#   PATCH  /keranjang/<id>/item/<baris>    {"qty": 3}
+#   DELETE /keranjang/<id>/item/<baris>
+#   POST   /keranjang/<id>/checkout
+#   POST   /checkout                       {"items": [{"kunci": ..., "qty": 1}, ...], "daftar": ...}
+#   GET    /penjualan?dari=YYYY-MM-DD&sampai=YYYY-MM-DD&limit=100
+#   GET    /laporan?dari=...&sampai=...
+#
+# Harga keranjang mengikuti harga.Mesin (grosir / promo) kalau Toko diberi
+# mesin_harga, sama dengan keranjang halaman Kasir; tanpa itu harga = kolom
+# harga produk. Daftar harga dipilih saat membuat keranjang: POST
+# /keranjang {"daftar": "Reseller"} (default daftar pertama mesin).
+#
+# Kunci produk majemuk (tuple) dikirim sebagai list JSON. Satu proses,
+# satu thread per koneksi (keep-alive HTTP/1.1); stok dijaga lock
+# Inventaris, jadi checkout dari API dan dari halaman tidak saling tumpang
+# tindih.
+#
+# Dari app (KASIR_API_PORT): API memakai inventaris & checkout app itu, jadi
+# stoknya sama dengan yang dilihat halaman Kasir (termasuk Google Sheet).
+# Mandiri (python api.py --katalog data_lokal/api_produk.json): katalog
+# dari file JSON dan penjualan dicatat ke LogTransaksi (fsync). Stok =
+# stok di file katalog - qty terjual di log, dihitung ulang saat start, jadi
+# restart tidak menghilangkan pengurangan stok. Barang masuk dicatat dengan
+# menambah Stock di file katalog.
+
+logger = logging.getLogger(__name__)
+
+PORT = int(os.environ.get("KASIR_API_PORT", "0"))
+HOST = os.environ.get("KASIR_API_HOST", "127.0.0.1")
+KERANJANG_IDLE = 3600
+
+
+class GagalApi(Exception):
+    def __init__(self, status, pesan):
+        super().__init__(pesan)
+        self.status = status
+
+
+def _qty(qty):
+    """qty dari body JSON: bilangan bulat >= 1, selain itu 400."""
+    if isinstance(qty, bool) or not isinstance(qty, int):
+        raise GagalApi(400, f"qty harus bilangan bulat, bukan {qty!r}")
+    if qty < 1:
+        raise GagalApi(400, "qty minimal 1")
+    return qty
+
+
+class Toko:
+    def __init__(self, inventaris, kolom_qty, kolom_harga, item_dari, checkout, penjualan,
+                 kolom_waktu="Waktu", laporan=None, kolom_subtotal=None, mesin_harga=None):
+        # item_dari(produk) -> item keranjang; checkout(list item) -> data struk (StokTidakCukup diteruskan);
+        # penjualan(dari, sampai) -> DataFrame baris penjualan yang mencakup rentang itu (boleh lebih);
+        # laporan(df) -> DataFrame ringkasan; mesin_harga = harga.Mesin app (opsional)
+        self.inv = inventaris
+        self.kolom_qty = kolom_qty
+        self.kolom_harga = kolom_harga
+        self.kolom_subtotal = kolom_subtotal
+        self.item_dari = item_dari
+        self.checkout = checkout
+        self.penjualan = penjualan
+        self.kolom_waktu = kolom_waktu
+        self.laporan = laporan
+        self.mesin_harga = mesin_harga
+        self.lock = threading.Lock()
+        self._keranjang = {}  # id -> (Keranjang, waktu terakhir dipakai)
+        self._daftar = {}     # id keranjang -> daftar harga
+        self._dibayar = set()  # id keranjang yang sedang checkout
+
+    # ---------- produk ----------
+    def _kunci(self, kunci):
+        return tuple(kunci) if isinstance(self.inv.kunci, tuple) and isinstance(kunci, list) else kunci
+
+    def _produk(self, p):
+        # nilai biner (mis. foto) tidak dikirim
+        return {**{k: v for k, v in p.items() if not isinstance(v, (bytes, bytearray))},
+                "tersedia": self.inv.tersedia(self.inv.kunci_dari(p))}
+
+    def daftar_produk(self):
+        return [self._produk(p) for p in self.inv.daftar()]
+
+    def produk(self, kunci):
+        p = self.inv.cari(self._kunci(kunci))
+        if p is None:
+            raise GagalApi(404, f"Produk {kunci} tidak ada")
+        return self._produk(p)
+
+    # ---------- keranjang ----------
+    def _cek_daftar(self, daftar):
+        if daftar is None:
+            return None
+        if self.mesin_harga is None or daftar not in self.mesin_harga.daftar:
+            raise GagalApi(400, f"Daftar harga {daftar!r} tidak ada")
+        return daftar
+
+    def _harga(self, k, daftar=None):
+        # harga satuan tiap item dari mesin harga (dilewati kalau keranjang & aturan tidak berubah)
+        if self.mesin_harga is not None:
+            self.mesin_harga.terapkan(k, daftar)
+
+    def buat_keranjang(self, daftar=None):
+        daftar = self._cek_daftar(daftar)
+        id_keranjang = uuid.uuid4().hex[:12]
+        with self.lock:
+            sekarang = time.monotonic()
+            for k in [k for k, (_, t) in self._keranjang.items()
+                      if sekarang - t > KERANJANG_IDLE and k not in self._dibayar]:
+                del self._keranjang[k]
+                self._daftar.pop(k, None)
+            self._keranjang[id_keranjang] = (transaksi.Keranjang(self.inv.kunci, self.kolom_qty, self.kolom_harga,
+                                                                 self.kolom_subtotal), sekarang)
+            self._daftar[id_keranjang] = daftar
+        return id_keranjang
+
+    def daftar_harga(self, id_keranjang):
+        with self.lock:
+            return self._daftar.get(id_keranjang)
+
+    def _cek_dibayar(self, id_keranjang):
+        # dipanggil di dalam self.lock: isi keranjang dibekukan selama checkout, jadi
+        # item yang ditambah / diubah saat itu tidak ikut terhapus tanpa dibayar
+        if id_keranjang in self._dibayar:
+            raise GagalApi(409, f"Keranjang {id_keranjang} sedang checkout")
+
+    def keranjang(self, id_keranjang):
+        with self.lock:
+            self._cek_dibayar(id_keranjang)
+            if id_keranjang not in self._keranjang:
+                raise GagalApi(404, f"Keranjang {id_keranjang} tidak ada")
+            k, _ = self._keranjang[id_keranjang]
+            self._keranjang[id_keranjang] = (k, time.monotonic())
+            return k
+
+    def isi(self, k, daftar=None):
+        self._harga(k, daftar)
+        return {"items": [{"baris": b, **item} for b, item in list(k.baris.items())], "total": k.total()}
+
+    def tambah_item(self, k, kunci, qty, id_keranjang=None):
+        p = self.inv.cari(self._kunci(kunci))
+        if p is None:
+            raise GagalApi(404, f"Produk {kunci} tidak ada")
+        qty = _qty(qty)
+        kunci = self.inv.kunci_dari(p)
+        with self.lock:
+            self._cek_dibayar(id_keranjang)
+            # sama seperti halaman Kasir: qty keranjang tidak boleh melebihi stok tersedia
+            if self.inv.tersedia(kunci) < k.qty(kunci) + qty:
+                raise GagalApi(409, f"Stok tidak mencukupi untuk {kunci}")
+            return k.tambah(self.item_dari(p), qty)
+
+    def bayar(self, k, daftar=None):
+        """Checkout isi keranjang yang tidak dipakai request lain (lihat bayar_keranjang); berhasil -> dikosongkan."""
+        self._harga(k, daftar)
+        isi = list(k)
+        if not isi:
+            raise GagalApi(400, "Keranjang kosong")
+        try:
+            hasil = self.checkout(isi)
+        except StokTidakCukup as e:
+            raise GagalApi(409, f"Stok tidak mencukupi untuk {e}")
+        k.kosongkan()
+        return hasil
+
+    def bayar_keranjang(self, id_keranjang):
+        # keranjang ditandai sedang checkout di dalam lock, jadi request kedua untuk
+        # keranjang yang sama dapat 409 alih-alih membayar isi yang sama dua kali, dan
+        # tambah / ubah / hapus item selama checkout juga 409 (tidak hilang saat dikosongkan).
+        # Kalau checkout gagal, isi keranjang tetap utuh untuk dicoba lagi.
+        k = self.keranjang(id_keranjang)
+        with self.lock:
+            self._cek_dibayar(id_keranjang)
+            self._dibayar.add(id_keranjang)
+        try:
+            return self.bayar(k, self.daftar_harga(id_keranjang))
+        finally:
+            with self.lock:
+                self._dibayar.discard(id_keranjang)
+
+    def checkout_langsung(self, items, daftar=None):
+        daftar = self._cek_daftar(daftar)
+        k = transaksi.Keranjang(self.inv.kunci, self.kolom_qty, self.kolom_harga, self.kolom_subtotal)
+        for item in items:
+            self.tambah_item(k, item["kunci"], item.get("qty", 1))
+        return self.bayar(k, daftar)
+
+    # ---------- penjualan & laporan ----------
+    def _rentang(self, df, dari, sampai):
+        if df.empty or self.kolom_waktu not in df:
+            return df
+        waktu = df[self.kolom_waktu].astype(str)
+        pilih = pd.Series(True, index=df.index)
+        if dari:
+            pilih &= waktu >= dari
+        if sampai:
+            pilih &= waktu.str[:len(sampai)] <= sampai
+        return df[pilih]
+
+    def cari_penjualan(self, dari=None, sampai=None, limit=100):
+        df = self._rentang(self.penjualan(dari, sampai), dari, sampai)
+        return {"jumlah": len(df), "baris": json.loads(df.tail(int(limit)).to_json(orient="records", date_format="iso"))}
+
+    def buat_laporan(self, dari=None, sampai=None):
+        df = self._rentang(self.penjualan(dari, sampai), dari, sampai)
+        if self.laporan:
+            ringkasan = self.laporan(df) if not df.empty else pd.DataFrame()
+        else:
+            ringkasan = df.groupby(self.inv.kunci if not isinstance(self.inv.kunci, tuple) else list(self.inv.kunci))[
+                self.kolom_qty].sum().reset_index() if not df.empty else pd.DataFrame()
+        return {"baris": len(df), "ringkasan": json.loads(ringkasan.to_json(orient="records"))}
+
+
+# ---------- HTTP ----------
+def _rute(toko):
+    """(method, pola path, fungsi(cocok, query, body))."""
+    return [
+        ("GET", r"/sehat", lambda m, q, b: {"ok": True, "produk": len(toko.inv.produk)}),
+        ("GET", r"/produk", lambda m, q, b: toko.daftar_produk()),
+        ("GET", r"/produk/(.+)", lambda m, q, b: toko.produk(_kunci_url(m[1]))),
+        ("POST", r"/keranjang", lambda m, q, b: {"id": toko.buat_keranjang((b or {}).get("daftar"))}),
+        ("GET", r"/keranjang/(\w+)", lambda m, q, b: toko.isi(toko.keranjang(m[1]), toko.daftar_harga(m[1]))),
+        ("POST", r"/keranjang/(\w+)/item", lambda m, q, b: {
+            "baris": toko.tambah_item(toko.keranjang(m[1]), b["kunci"], b.get("qty", 1), m[1])}),
+        ("PATCH", r"/keranjang/(\w+)/item/(\w+)", lambda m, q, b: _ubah_qty(toko, m[1], m[2], b["qty"])),
+        ("DELETE", r"/keranjang/(\w+)/item/(\w+)", lambda m, q, b: _hapus_item(toko, m[1], m[2])),
+        ("POST", r"/keranjang/(\w+)/checkout", lambda m, q, b: toko.bayar_keranjang(m[1])),
+        ("POST", r"/checkout", lambda m, q, b: toko.checkout_langsung(b["items"], b.get("daftar"))),
+        ("GET", r"/penjualan", lambda m, q, b: toko.cari_penjualan(q.get("dari"), q.get("sampai"), q.get("limit", 100))),
+        ("GET", r"/laporan", lambda m, q, b: toko.buat_laporan(q.get("dari"), q.get("sampai"))),
+    ]
+
+
+def _kunci_url(teks):
+    teks = unquote(teks)
+    # kunci majemuk dikirim sebagai list JSON, mis. /produk/["SKU1","M"]
+    if teks.startswith("["):
+        return json.loads(teks)
+    return teks
+
+
+def _ubah_qty(toko, id_keranjang, baris, qty):
+    qty = _qty(qty)
+    k = toko.keranjang(id_keranjang)
+    daftar = toko.daftar_harga(id_keranjang)
+    if baris not in k.baris:
+        raise GagalApi(404, f"Baris {baris} tidak ada")
+    with toko.lock:
+        toko._cek_dibayar(id_keranjang)
+        kunci = k._kunci(k.baris[baris])
+        if qty > toko.inv.tersedia(kunci):
+            raise GagalApi(409, f"Stok tidak mencukupi untuk {kunci}")
+        k.ubah_qty(baris, qty)
+        return toko.isi(k, daftar)
+
+
+def _hapus_item(toko, id_keranjang, baris):
+    k = toko.keranjang(id_keranjang)
+    daftar = toko.daftar_harga(id_keranjang)
+    with toko.lock:
+        toko._cek_dibayar(id_keranjang)
+        k.hapus(baris)
+        return toko.isi(k, daftar)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: banyak request per koneksi
+    disable_nagle_algorithm = True  # header & body ditulis terpisah; tanpa ini tiap balasan tertahan ~40 ms
+    rute = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _kirim(self, status, data):
+        isi = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(isi)))
+        self.end_headers()
+        self.wfile.write(isi)
+
+    def _layani(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        panjang = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(panjang) or b"{}") if panjang else {}
+            for method, pola, fungsi in self.rute:
+                cocok = re.fullmatch(pola, url.path.rstrip("/") or "/")
+                if method == self.command and cocok:
+                    self._kirim(200, fungsi(cocok, query, body))
+                    return
+            self._kirim(404, {"error": f"{self.command} {url.path} tidak dikenal"})
+        except GagalApi as e:
+            self._kirim(e.status, {"error": str(e)})
+        except (KeyError, ValueError, TypeError) as e:
+            self._kirim(400, {"error": f"Permintaan tidak valid: {e}"})
+        except Exception as e:
+            # mis. VersiBentrok, OSError dari LogTransaksi, error gspread: klien tetap dapat balasan
+            logger.exception("%s %s gagal", self.command, self.path)
+            self._kirim(500, {"error": f"{type(e).__name__}: {e}"})
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _layani
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # bawaan 5: banyak kasir konek bersamaan -> SYN diulang setelah 1 detik
+
+
+def mulai(toko, host=HOST, port=PORT):
+    """Jalankan API di thread latar. Mengembalikan server (server.shutdown() untuk berhenti)."""
+    handler = type("Handler", (_Handler,), {"rute": _rute(toko)})
+    server = _Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="kasir-api", daemon=True).start()
+    return server
+
+
+# ---------- mandiri ----------
+def kurangi_terjual(inventaris, log, kolom_qty="Qty"):
+    """Stok katalog dikurangi qty terjual di log (dipanggil sekali saat start)."""
+    df = log.baris()
+    if df is None or df.empty:
+        return
+    kunci = list(inventaris.kunci) if isinstance(inventaris.kunci, tuple) else inventaris.kunci
+    terjual = df.groupby(kunci)[kolom_qty].sum()
+    produk = inventaris.daftar()
+    for p in produk:
+        qty = terjual.get(inventaris.kunci_dari(p), 0)
+        if qty:
+            p[inventaris.kolom_stok] = parse_int(p[inventaris.kolom_stok]) - int(qty)
+    inventaris.muat(produk)
+
+
+def toko_standar(inventaris, log, kolom_harga, kolom_qty="Qty", kolom_waktu="Waktu", mesin_harga=None):
+    """Toko untuk katalog apa adanya: item keranjang = baris produk tanpa kolom stok, transaksi dicatat ke LogTransaksi.
+
+    Dengan mesin_harga, kolom_harga item keranjang diisi harga dari aturan (harga.Mesin).
+    """
+
+    def checkout(isi):
+        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        total = sum(i[kolom_harga] * i[kolom_qty] for i in isi)
+        # log ditulis (fsync) sebelum stok di-commit: log yang jadi catatan stok saat restart
+        id_trx = transaksi.checkout(
+            inventaris, [(inventaris.kunci_dari(i), i[kolom_qty]) for i in isi],
+            lambda: log.catat({"id": transaksi.id_transaksi(), kolom_waktu: waktu, "Total": total, "items": isi}),
+        )
+        return {"id": id_trx, "waktu": waktu, "items": isi, "total": total}
+
+    def item_dari(p):
+        return {k: v for k, v in p.items() if k != inventaris.kolom_stok}
+
+    return Toko(inventaris, kolom_qty, kolom_harga, item_dari, checkout, lambda dari, sampai: log.baris(), kolom_waktu,
+                mesin_harga=mesin_harga)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="REST API kasir tanpa Streamlit")
+    parser.add_argument("--katalog", default="data_lokal/api_produk.json",
+                        help="katalog (list produk JSON); Stock = stok sebelum penjualan di log")
+    parser.add_argument("--kunci", default="Nama Produk")
+    parser.add_argument("--stok", default="Stock")
+    parser.add_argument("--harga", default="Harga Retail")
+    parser.add_argument("--aturan", help="nama aturan harga: data_lokal/aturan_harga_<nama>.json (lihat harga.py)")
+    parser.add_argument("--daftar", action="append", metavar="NAMA=KOLOM",
+                        help="daftar harga untuk --aturan, boleh berulang (default Retail=<--harga>)")
+    parser.add_argument("--log", default="api", help="nama LogTransaksi")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT or 8502)
+    args = parser.parse_args()
+
+    with open(args.katalog, encoding="utf-8") as f:
+        inventaris = Inventaris(json.load(f), args.kunci, args.stok)
+    log_api = LogTransaksi(args.log)
+    kurangi_terjual(inventaris, log_api)
+    mesin_harga = None
+    if args.aturan:
+        daftar = dict(d.split("=", 1) for d in args.daftar) if args.daftar else {"Retail": args.harga}
+        mesin_harga = harga.Mesin(inventaris, args.aturan, daftar)
+    server = mulai(toko_standar(inventaris, log_api, args.harga, mesin_harga=mesin_harga), args.host, args.port)
+    print(f"API kasir di http://{args.host}:{args.port} ({len(inventaris.produk)} produk)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+import profil
+
+# ================= ARSIP PENJUALAN (PARQUET) =================
+# Bulan yang sudah tutup disimpan sebagai file Parquet yang dipartisi per
+# bulan dan per owner:
+#
+#   data_lokal/arsip/<nama>/bulan=2024-01/pemilik=Bu.Ilah/data.parquet
+#
+# Laporan cukup membaca partisi bulan/owner dan kolom yang dibutuhkan,
+# bukan membangun ulang DataFrame dari semua record. Data live (sheet
+# Penjualan / log transaksi) tetap jadi sumber utama; gabung() hanya
+# mengambil baris live untuk bulan yang belum diarsipkan.
+#
+# Jumlah baris tiap bulan yang diarsipkan dicatat di bulan=.../_jumlah.json
+# (awalan "_" dilewati pyarrow). Kalau data live ternyata punya lebih banyak
+# baris untuk bulan itu (penjualan offline / terminal lain yang masuk
+# terlambat), partisi bulan itu ditulis ulang dari data live.
+
+FOLDER = os.path.join(os.environ.get("KASIR_DATA_LOKAL", "data_lokal"), "arsip")
+
+
+def bulan_dari(seri):
+    """Waktu -> "YYYY-MM" (NaN kalau tidak terbaca). Lewat datetime64[M] numpy, jauh lebih cepat dari dt.strftime."""
+    waktu = pd.to_datetime(seri, errors="coerce")
+    bulan = waktu.to_numpy().astype("datetime64[M]").astype(str)
+    return pd.Series(bulan, index=seri.index).where(waktu.notna())
+
+
+def _rapikan(df):
+    # kolom campuran (mis. angka & teks "Rp10.000" dari sheet) tidak bisa disimpan kolumnar
+    df = df.copy()
+    for kolom in df.select_dtypes("object").columns:
+        if df[kolom].map(type).nunique() > 1:
+            df[kolom] = df[kolom].astype(str)
+    return df
+
+
+class Arsip:
+    def __init__(self, nama, kolom_waktu, kolom_owner=None):
+        self.folder = os.path.join(FOLDER, nama)
+        self.kolom_waktu = kolom_waktu
+        self.kolom_owner = kolom_owner
+        self.lock = threading.Lock()  # arsipkan() bisa dipanggil beberapa sesi sekaligus
+        os.makedirs(self.folder, exist_ok=True)
+
+    def bulan(self):
+        """Daftar bulan (YYYY-MM) yang sudah diarsipkan."""
+        return sorted(
+            d.split("=", 1)[1] for d in os.listdir(self.folder) if d.startswith("bulan=")
+        )
+
+    def partisi(self, dari=None, sampai=None, owner=None):
+        """File Parquet per partisi dalam rentang: list (bulan, owner, path). owner None kalau tanpa kolom owner."""
+        hasil = []
+        for b in self.bulan():
+            if (dari and b < dari) or (sampai and b > sampai):
+                continue
+            folder = os.path.join(self.folder, f"bulan={b}")
+            if not self.kolom_owner:
+                hasil.append((b, None, os.path.join(folder, "data.parquet")))
+                continue
+            for sub in sorted(os.listdir(folder)):
+                if not sub.startswith("pemilik="):
+                    continue
+                pemilik = unquote(sub.split("=", 1)[1])
+                if owner is None or pemilik == str(owner):
+                    hasil.append((b, pemilik, os.path.join(folder, sub, "data.parquet")))
+        return hasil
+
+    def daftar_bulan(self, df_live):
+        """Semua bulan yang tersedia: arsip + data live."""
+        bulan = set(self.bulan())
+        if not df_live.empty and self.kolom_waktu in df_live:
+            bulan.update(bulan_dari(df_live[self.kolom_waktu]).dropna())
+        return sorted(bulan)
+
+    def jumlah_baris(self, bulan):
+        """Jumlah baris yang diarsipkan untuk satu bulan (dari _jumlah.json, atau metadata Parquet untuk arsip lama)."""
+        folder = os.path.join(self.folder, f"bulan={bulan}")
+        path = os.path.join(folder, "_jumlah.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["baris"]
+        import pyarrow.parquet as pq
+        return sum(pq.ParquetFile(p).metadata.num_rows for _, _, p in self.partisi(bulan, bulan))
+
+    # ---------- tulis ----------
+    def arsipkan(self, df, sebelum=None):
+        """Arsipkan bulan yang sudah tutup (sebelum bulan `sebelum`, default bulan ini).
+
+        Bulan yang sudah diarsipkan dilewati, kecuali data live punya lebih
+        banyak baris untuk bulan itu (baris terlambat): partisinya ditulis
+        ulang. Tiap bulan ditulis ke folder sementara unik lalu di-rename,
+        jadi arsip tidak pernah setengah jadi. Mengembalikan daftar bulan
+        yang (ulang) diarsipkan.
+        """
+        if df.empty or self.kolom_waktu not in df:
+            return []
+        sebelum = sebelum or datetime.now().strftime("%Y-%m")
+        bulan = bulan_dari(df[self.kolom_waktu])
+        per_bulan = bulan[bulan < sebelum].value_counts()
+        with self.lock:
+            sudah = set(self.bulan())
+            tulis = sorted(
+                b for b, n in per_bulan.items() if b not in sudah or n > self.jumlah_baris(b)
+            )
+            if not tulis:
+                return []
+
+            df = _rapikan(df)
+            for b in tulis:
+                tmp = tempfile.mkdtemp(prefix=f".tmp-bulan={b}-", dir=self.folder)
+                data = df[bulan == b]
+                if self.kolom_owner:
+                    for owner, grup in data.groupby(self.kolom_owner, sort=False):
+                        sub = os.path.join(tmp, f"pemilik={quote(str(owner), safe='')}")
+                        os.makedirs(sub)
+                        grup.to_parquet(os.path.join(sub, "data.parquet"), index=False)
+                else:
+                    data.to_parquet(os.path.join(tmp, "data.parquet"), index=False)
+                with open(os.path.join(tmp, "_jumlah.json"), "w", encoding="utf-8") as f:
+                    json.dump({"baris": len(data)}, f)
+                tujuan = os.path.join(self.folder, f"bulan={b}")
+                lama = None
+                if b in sudah:
+                    # selama dua rename ini bulan b tidak terdaftar, jadi gabung() memakai baris live-nya
+                    lama = tempfile.mkdtemp(prefix=f".lama-bulan={b}-", dir=self.folder)
+                    os.replace(tujuan, os.path.join(lama, "isi"))
+                os.replace(tmp, tujuan)
+                if lama:
+                    shutil.rmtree(lama, ignore_errors=True)
+            return tulis
+
+    def hapus(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+        os.makedirs(self.folder, exist_ok=True)
+
+    # ---------- baca ----------
+    def baca(self, kolom=None, dari=None, sampai=None, owner=None):
+        """Baca arsip, hanya partisi bulan [dari, sampai] / owner dan kolom yang diminta."""
+        if not self.bulan():
+            return pd.DataFrame(columns=kolom)
+        with profil.ukur("import pyarrow"):
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+
+        field = [("bulan", pa.string())]
+        if self.kolom_owner:
+            field.append(("pemilik", pa.string()))
+        dataset = ds.dataset(
+            self.folder, format="parquet",
+            partitioning=ds.partitioning(pa.schema(field), flavor="hive"),
+        )
+        saring = None
+        syarat = []
+        if dari:
+            syarat.append(ds.field("bulan") >= dari)
+        if sampai:
+            syarat.append(ds.field("bulan") <= sampai)
+        if owner is not None and self.kolom_owner:
+            syarat.append(ds.field("pemilik") == str(owner))
+        for s in syarat:
+            saring = s if saring is None else saring & s
+
+        nama_kolom = [c for c in dataset.schema.names if c not in ("bulan", "pemilik")]
+        kolom = kolom or nama_kolom
+        df = dataset.to_table(columns=[c for c in kolom if c in nama_kolom], filter=saring).to_pandas()
+        return df.reindex(columns=kolom)
+
+    def gabung(self, df_live, kolom=None, dari=None, sampai=None, owner=None):
+        """Arsip + baris live untuk bulan yang belum diarsipkan, dalam rentang yang sama."""
+        hasil = self.baca(kolom, dari, sampai, owner)
+        live = self.live(df_live, kolom, dari, sampai, owner)
+        if live is None:
+            return hasil
+        if hasil.empty:
+            return live.reset_index(drop=True)
+        return pd.concat([hasil, live], ignore_index=True)
+
+    def live(self, df_live, kolom=None, dari=None, sampai=None, owner=None):
+        """Baris live untuk bulan yang belum diarsipkan dalam rentang (None kalau tidak ada data live)."""
+        if df_live.empty or self.kolom_waktu not in df_live:
+            return None
+
+        bulan = bulan_dari(df_live[self.kolom_waktu])
+        pilih = ~bulan.isin(self.bulan())
+        if dari:
+            pilih &= bulan >= dari
+        if sampai:
+            pilih &= bulan <= sampai
+        if owner is not None and self.kolom_owner:
+            pilih &= df_live[self.kolom_owner].astype(str) == str(owner)
+        live = df_live[pilih]
+        if kolom:
+            live = live.reindex(columns=kolom)
+        return live
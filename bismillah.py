@@ -1,13 +1,33 @@
-import streamlit as st
-import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from datetime import datetime
+import profil
+
+profil.mulai()
+
+with profil.ukur("import modul app"):
+    import streamlit as st
+    import pandas as pd
+    from datetime import datetime
+
+    import arsip
+    import ekspor
+    import harga
+    import jurnal
+    import laporan_paralel
+    import memori
+    import offline
+    import pemilik
+    import penjadwal
+    import pos
+    import prakiraan
+    import salinan_sheet
+    import selisih
+    import sheet_lokal
+    import sheet_mentah
+    import sinkron
+    import stok_menipis
+    import struk
+    from inventaris import Inventaris, StokTidakCukup, VersiBentrok, checkout_remote
+
+st.set_page_config(page_title="Kasir Kawani", layout="wide")
 
 # ================= GOOGLE SHEET SETUP =================
 SCOPE = [
@@ -15,19 +35,26 @@ SCOPE = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive"
 ]
+SHEET_ID = "1ksV8WUxNLleiyAv9FbpLUqgIQ3Njt-_HNTshfSEDVS4"
 
-try:
-    creds_dict = st.secrets["gcp_service_account"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
-    CLIENT = gspread.authorize(creds)
-
-    SHEET_ID = "1ksV8WUxNLleiyAv9FbpLUqgIQ3Njt-_HNTshfSEDVS4"
-    sheet_produk = CLIENT.open_by_key(SHEET_ID).worksheet("Produk")
-    sheet_penjualan = CLIENT.open_by_key(SHEET_ID).worksheet("Penjualan")
-
-except Exception as e:
-    st.error(f"Gagal konek ke Google Sheet. Error: {e}")
-    st.stop()
+def connect_sheet():
+    # dipanggil di thread latar oleh offline.Koneksi, bukan tiap rerun
+    if sheet_lokal.PATH:
+        spreadsheet = sheet_lokal.Spreadsheet()
+    else:
+        with profil.ukur("import gspread"):
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+        creds_dict = st.secrets["gcp_service_account"]
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
+        client = gspread.authorize(creds)
+        spreadsheet = client.open_by_key(SHEET_ID)
+    # semua request Sheets lewat penjadwal: batas kuota, gabung baca/tulis, ulang saat 429 (lihat penjadwal.py)
+    spreadsheet = penjadwal.bungkus(spreadsheet)
+    sheet_penjualan = spreadsheet.worksheet("Penjualan")
+    struk.pastikan_kolom_id(sheet_penjualan)
+    return spreadsheet, spreadsheet.worksheet("Produk"), sheet_penjualan
 
 # ================= HELPER FUNCTIONS =================
 def parse_int(value):
@@ -38,141 +65,300 @@ def parse_int(value):
 
 def load_produk():
     try:
-        data = sheet_produk.get_all_records()
-        return pd.DataFrame(data)
+        # nilai mentah, kolom bertipe langsung dari grid (lihat sheet_mentah.py)
+        return sheet_mentah.tabel(sheet_mentah.grid(sheet_produk))
     except:
         return pd.DataFrame()
 
-def save_produk(df):
-    try:
-        sheet_produk.clear()
-        sheet_produk.update([df.columns.values.tolist()] + df.values.tolist())
-    except:
-        pass
+def save_produk(df, lama=None):
+    # dicatat ke jurnal lokal dulu, sheet ditimpa tanpa clear() (lihat jurnal.py);
+    # dengan katalog lama, hanya baris yang berubah yang dikirim (lihat selisih.py)
+    values = [df.columns.values.tolist()] + df.values.tolist()
+    if lama is None:
+        return get_jurnal().tulis(sheet_produk, values)
+    return get_jurnal().tulis(sheet_produk, values, lambda sheet, values: selisih.terapkan(sheet, values, lama, "Nama Produk"))
 
 def load_penjualan():
+    # hanya baris yang ditambahkan sejak muat terakhir yang diunduh (lihat salinan_sheet.py)
     try:
-        data = sheet_penjualan.get_all_records()
-        return pd.DataFrame(data)
+        return get_salinan_penjualan().muat(sheet_penjualan)
     except:
         return pd.DataFrame()
 
 def save_penjualan(df):
+    get_jurnal().tulis(sheet_penjualan, [df.columns.values.tolist()] + df.values.tolist())
+
+def append_penjualan(rows):
+    # append, bukan clear+update, supaya penjualan kasir lain tidak tertimpa
+    sheet_penjualan.append_rows([list(r.values()) for r in rows])
+
+# ================= INVENTARIS BERSAMA =================
+# Satu katalog & stok untuk semua kasir di server ini (bukan per sesi).
+# Startup memakai snapshot lokal; katalog dari sheet dimuat di thread latar.
+@st.cache_resource
+def get_inventaris():
+    return Inventaris(offline.muat_snapshot("bismillah"), "Nama Produk", "Stock", "Owner")
+
+@st.cache_resource
+def get_ledger():
+    return offline.Ledger("bismillah")
+
+@st.cache_resource
+def get_arsip():
+    return arsip.Arsip("bismillah", "Waktu", "Owner")
+
+@st.cache_resource
+def get_jurnal():
+    return jurnal.Jurnal("bismillah")
+
+@st.cache_resource
+def get_salinan_penjualan():
+    return salinan_sheet.SalinanSheet()
+
+# Penjualan dipakai bersama semua sesi (versi baru tiap perubahan), bukan disalin per sesi.
+# Mulai kosong; diisi dari sheet oleh muat_ulang_katalog begitu koneksi online.
+@st.cache_resource
+def get_penjualan():
+    return memori.Bersama()
+
+# ekspor laporan dibuat di latar (lihat ekspor.py), bukan di dalam rerun halaman
+@st.cache_resource
+def get_ekspor():
+    arsip_penjualan, koneksi_bersama, salinan = get_arsip(), get_koneksi(), get_salinan_penjualan()
+
+    def muat(dari, sampai, owner):
+        # jalan di thread latar: sheet diambil dari koneksi bersama, bukan variabel rerun tertentu
+        sheets = koneksi_bersama.sheets
+        live = salinan.muat(sheets[2]) if sheets else pd.DataFrame()
+        return arsip_penjualan.gabung(live, dari=dari, sampai=sampai, owner=owner)
+
+    return ekspor.Antrian("bismillah", muat)
+
+inventaris = get_inventaris()
+ledger = get_ledger()
+
+# Mode sinkron multi-terminal: stok dicatat sebagai delta (lihat sinkron.py)
+def get_sinkron(sheets):
+    spreadsheet, produk, _ = sheets
+    s = sinkron.dapatkan(spreadsheet, produk, "Nama Produk", "Stock")
+    s.mulai_otomatis(inventaris, lambda: sheet_mentah.baca_records(produk))
+    return s
+
+# stok menipis & kecepatan jual, diperbarui tiap checkout / edit (lihat stok_menipis.py);
+# kecepatan jual diisi dari histori sheet oleh muat_ulang_katalog begitu online
+@st.cache_resource
+def get_stok_menipis():
+    return stok_menipis.StokMenipis(inventaris, "bismillah", ["Nama Produk", "Owner"])
+
+# ================= MODE OFFLINE =================
+def pulihkan_jurnal(sheets):
+    # tulis ulang worksheet yang terputus di tengah jalan diselesaikan dulu
+    get_jurnal().pulihkan(sheets[0])
+
+def kirim_ledger(sheets):
+    _, produk, penjualan = sheets
+    if sinkron.AKTIF:
+        kirim_stok = lambda stok, penanda: get_sinkron(sheets).catat([(k, -q) for k, q in stok], ref=penanda[1])
+    else:
+        kirim_stok = lambda stok, penanda: offline.kurangi_stok_remote(produk, "Nama Produk", "Stock", stok, penanda)
+    offline.rekonsiliasi(ledger, penjualan, kirim_stok)
+
+def muat_ulang_katalog(sheets):
+    # hanya katalog yang diunduh penuh (nilai mentah, lihat sheet_mentah.py);
+    # penjualan cukup baris baru lewat salinan inkremental (lihat salinan_sheet.py)
+    _, produk, penjualan = sheets
+    records = sheet_mentah.baca_records(produk)
+    histori = get_salinan_penjualan().muat(penjualan)
+    get_penjualan().ganti(histori)
+    get_stok_menipis().muat_penjualan(histori, "Waktu", "Qty")
+    if sinkron.AKTIF:
+        get_sinkron(sheets).segarkan(inventaris, records)
+    else:
+        inventaris.muat(records)
+    offline.simpan_snapshot(inventaris.daftar(), "bismillah")
+
+@st.cache_resource
+def get_koneksi():
+    # ledger dikirim dulu, baru katalog dimuat ulang, supaya stok yang
+    # terjual saat offline sudah tercermin di sheet
+    return offline.Koneksi(connect_sheet, saat_online=[pulihkan_jurnal, kirim_ledger, muat_ulang_katalog])
+
+koneksi = get_koneksi()
+spreadsheet, sheet_produk, sheet_penjualan = koneksi.sheets or (None, None, None)
+
+monitor = get_stok_menipis()
+
+# harga jual per daftar harga (Retail / Reseller), grosir & promo (lihat harga.py)
+@st.cache_resource
+def get_harga():
+    return harga.Mesin(inventaris, "bismillah", {"Retail": "Harga Retail", "Reseller": "Harga Reseller"})
+
+harga_jual = get_harga()
+
+if not koneksi.online:
+    st.sidebar.warning(f"Mode offline: penjualan disimpan lokal. ({koneksi.error or 'menghubungkan...'})")
+
+def katalog_df():
+    return pd.DataFrame(inventaris.daftar())
+
+def simpan_katalog(df):
+    if not koneksi.online:
+        st.error("Offline: perubahan produk belum bisa disimpan ke Google Sheet.")
+        st.stop()
     try:
-        sheet_penjualan.clear()
-        sheet_penjualan.update([df.columns.values.tolist()] + df.values.tolist())
-    except:
-        pass
+        save_produk(df, lama=inventaris.daftar())
+    except Exception as e:
+        # isi baru tetap di jurnal lokal dan dikirim ulang begitu koneksi pulih
+        koneksi.tandai_offline(e)
+        st.warning(f"Gagal menyimpan ke Google Sheet ({e}); perubahan dikirim ulang otomatis saat online.")
+    inventaris.muat(df.to_dict("records"))
+    offline.simpan_snapshot(df.to_dict("records"), "bismillah")
+
+def checkout_online(items, new_rows):
+    if sinkron.AKTIF:
+        sinkron.checkout_delta(get_sinkron(koneksi.sheets), inventaris, items)
+    else:
+        checkout_remote(sheet_produk, inventaris, items, lambda: sheet_mentah.baca_records(sheet_produk))
+    try:
+        append_penjualan(new_rows)
+    except Exception as e:
+        # stok sudah terkirim, penjualan disimpan dulu di ledger lokal
+        koneksi.tandai_offline(e)
+        ledger.catat(new_rows, [])
 
-# ================= STREAMLIT APP =================
-st.set_page_config(page_title="Kasir Kawani", layout="wide")
+def checkout_offline(items, new_rows):
+    inventaris.checkout(items)
+    ledger.catat(new_rows, items)
 
-# Load produk & penjualan ke session_state
-if "produk_df" not in st.session_state:
-    st.session_state.produk_df = load_produk()
-if "penjualan_df" not in st.session_state:
-    st.session_state.penjualan_df = load_penjualan()
-if "cart" not in st.session_state:
-    st.session_state.cart = []
+# ================= STREAMLIT APP =================
+penjualan = get_penjualan()
+# keranjang sesi ini (lihat pos.py)
+keranjang = pos.keranjang("Nama Produk", "Qty", "Harga Jual", "Subtotal")
+
+def item_keranjang(row):
+    return {
+        "Nama Produk": row['Nama Produk'],
+        "Owner": row['Owner'],
+        "Harga Jual": parse_int(row.get('Harga Retail', 0)),
+    }
+
+# ================= FRAGMENT KASIR =================
+# Katalog, keranjang & pembayaran dirender sebagai fragment terpisah:
+# edit qty / hapus di keranjang hanya merender ulang keranjang, bukan katalog.
+@pos.fragment
+def tampil_katalog():
+    produk_df = katalog_df()
 
-menu = st.sidebar.radio("Menu", ["Kasir", "Daftar Produk", "Tambah Produk", "Edit Produk", "Hapus Produk", "Laporan Penjualan"])
+    if produk_df.empty:
+        st.warning("Belum ada produk di database.")
+        return
+    for idx, row in produk_df.iterrows():
+        col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 2, 1])
+        with col1:
+            st.write(f"**{row['Nama Produk']}**")
+            st.caption(f"Owner: {row['Owner']}")
+        with col2:
+            harga_retail = parse_int(row.get('Harga Retail', 0))
+            st.write(f"Harga Retail: Rp{harga_retail:,}")
+            stock = inventaris.tersedia(row['Nama Produk'])
+            st.write(f"Stock: {stock}")
+        with col3:
+            qty = st.number_input(f"Qty-{idx}", 1, max(stock,1), 1, key=f"qty{idx}")
+        with col4:
+            if st.button("Tambah", key=f"add{idx}"):
+                keranjang.tambah(item_keranjang(row), qty)
+                pos.selesai(f"{row['Nama Produk']} ditambahkan ke keranjang!")
+
+@pos.fragment
+def tampil_keranjang():
+    st.subheader("Keranjang")
+    if not keranjang:
+        return
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+    pos.editor_keranjang(keranjang, ["Nama Produk", "Owner", "Harga Jual", "Qty"])
+    st.write(f"### Total: Rp{int(keranjang.total()):,}")
+
+@pos.fragment
+def tampil_pembayaran():
+    bayar = st.number_input("Nominal Pembayaran", min_value=0, step=1000)
+    if st.button("Checkout"):
+        harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+        total = keranjang.total()
+        if not keranjang:
+            st.warning("Keranjang kosong.")
+        elif bayar >= total:
+            items = [(item["Nama Produk"], item["Qty"]) for item in keranjang]
+            # satu waktu & ID untuk semua baris transaksi ini (dipakai untuk struk)
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            id_trx = struk.id_transaksi()
+            new_rows = []
+            for item in keranjang:
+                new_rows.append({
+                    "Waktu": waktu,
+                    "Nama Produk": item["Nama Produk"],
+                    "Owner": item["Owner"],
+                    "Harga Jual": item["Harga Jual"],
+                    "Qty": item["Qty"],
+                    "Subtotal": item["Subtotal"],
+                    struk.KOLOM_ID: id_trx
+                })
+
+            # Update stock: reserve di inventaris bersama, tulis ke sheet dengan cek versi.
+            # Kalau koneksi putus, transaksi dicatat ke ledger lokal.
+            try:
+                if koneksi.online:
+                    try:
+                        checkout_online(items, new_rows)
+                    except (StokTidakCukup, VersiBentrok):
+                        raise
+                    except Exception as e:
+                        koneksi.tandai_offline(e)
+                        checkout_offline(items, new_rows)
+                else:
+                    checkout_offline(items, new_rows)
+            except StokTidakCukup as e:
+                st.error(f"Stok {e} tidak mencukupi!")
+                st.stop()
+            except VersiBentrok:
+                st.error("Stok sedang diubah kasir lain, silakan checkout ulang.")
+                st.stop()
+
+            kembalian = bayar - total
+            st.session_state.struk_terakhir = {
+                "id": id_trx,
+                "waktu": waktu,
+                "items": [{"nama": r["Nama Produk"], "qty": r["Qty"], "harga": r["Harga Jual"]} for r in new_rows],
+                "total": total,
+                "bayar": bayar,
+                "kembalian": kembalian,
+            }
+
+            penjualan.tambah(new_rows)
+            keranjang.kosongkan()
+            pos.selesai(f"Transaksi berhasil! Kembalian Rp{kembalian:,}")
+        else:
+            st.error("Nominal pembayaran kurang!")
+
+menu = st.sidebar.radio("Menu", ["Kasir", "Daftar Produk", "Tambah Produk", "Edit Produk", "Hapus Produk", "Aturan Harga", "Laporan Penjualan", "Per Owner", "Stok Menipis", "Prakiraan"])
+stok_menipis.peringatan(monitor)
 
 # ================= KASIR =================
 if menu == "Kasir":
     st.title("🛒 Kasir")
-    produk_df = st.session_state.produk_df
+    pos.tampilkan_pesan()
+    harga.pilih_daftar(harga_jual)
+    pos.input_cepat(keranjang, inventaris.daftar(), "Nama Produk", item_keranjang, inventaris.tersedia)
+    tampil_katalog()
+    tampil_keranjang()
+    tampil_pembayaran()
 
-    if produk_df.empty:
-        st.warning("Belum ada produk di database.")
-    else:
-        for idx, row in produk_df.iterrows():
-            col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 2, 1])
-            with col1:
-                st.write(f"**{row['Nama Produk']}**")
-                st.caption(f"Owner: {row['Owner']}")
-            with col2:
-                harga_retail = parse_int(row.get('Harga Retail', 0))
-                st.write(f"Harga Retail: Rp{harga_retail:,}")
-                stock = int(row.get('Stock', 0))
-                st.write(f"Stock: {stock}")
-            with col3:
-                qty = st.number_input(f"Qty-{idx}", 1, max(stock,1), 1, key=f"qty{idx}")
-            with col4:
-                if st.button("Tambah", key=f"add{idx}"):
-                    found = False
-                    for item in st.session_state.cart:
-                        if item["Nama Produk"] == row['Nama Produk']:
-                            item["Qty"] += qty
-                            item["Subtotal"] = item["Harga Jual"] * item["Qty"]
-                            found = True
-                            break
-                    if not found:
-                        st.session_state.cart.append({
-                            "Nama Produk": row['Nama Produk'],
-                            "Owner": row['Owner'],
-                            "Harga Jual": harga_retail,
-                            "Qty": qty,
-                            "Subtotal": harga_retail * qty
-                        })
-                    st.success(f"{row['Nama Produk']} ditambahkan ke keranjang!")
-
-    # Tampilkan keranjang
-    st.subheader("Keranjang")
-    if st.session_state.cart:
-        df_cart = pd.DataFrame(st.session_state.cart)
-        st.dataframe(df_cart)
-
-        hapus_index = None
-        for i, item in enumerate(st.session_state.cart):
-            col1, col2, col3 = st.columns([3,2,1])
-            with col1:
-                st.write(f"{item['Nama Produk']} ({item['Owner']})")
-            with col2:
-                new_qty = st.number_input(f"Edit Qty-{i}", 1, 1000, item['Qty'], key=f"editqty{i}")
-                st.session_state.cart[i]['Qty'] = new_qty
-                st.session_state.cart[i]['Subtotal'] = new_qty * item['Harga Jual']
-            with col3:
-                if st.button("Hapus", key=f"hapus{i}"):
-                    hapus_index = i
-        if hapus_index is not None:
-            st.session_state.cart.pop(hapus_index)
-            st.experimental_rerun()
-
-        total = sum([x["Subtotal"] for x in st.session_state.cart])
-        st.write(f"### Total: Rp{int(total):,}")
-
-        bayar = st.number_input("Nominal Pembayaran", min_value=0, step=1000)
-        if st.button("Checkout"):
-            if bayar >= total:
-                kembalian = bayar - total
-                st.success(f"Transaksi berhasil! Kembalian Rp{kembalian:,}")
-
-                for item in st.session_state.cart:
-                    new_row = {
-                        "Waktu": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "Nama Produk": item["Nama Produk"],
-                        "Owner": item["Owner"],
-                        "Harga Jual": item["Harga Jual"],
-                        "Qty": item["Qty"],
-                        "Subtotal": item["Subtotal"]
-                    }
-                    st.session_state.penjualan_df = pd.concat([st.session_state.penjualan_df, pd.DataFrame([new_row])], ignore_index=True)
-
-                    # Update stock
-                    idx_produk = produk_df[produk_df["Nama Produk"] == item["Nama Produk"]].index[0]
-                    produk_df.at[idx_produk, "Stock"] = int(produk_df.at[idx_produk, "Stock"]) - item["Qty"]
-
-                save_penjualan(st.session_state.penjualan_df)
-                save_produk(produk_df)
-                st.session_state.cart = []
-                st.experimental_rerun()
-            else:
-                st.error("Nominal pembayaran kurang!")
+    if "struk_terakhir" in st.session_state:
+        struk.tampilkan(st.session_state.struk_terakhir, struk.template("Kasir Kawani"))
 
 # ================= MENU LAIN =================
 elif menu == "Daftar Produk":
     st.title("📦 Daftar Produk")
-    produk_df = st.session_state.produk_df
+    produk_df = katalog_df()
     st.dataframe(produk_df)
 
     st.download_button("Download Template Produk", 
@@ -183,13 +369,12 @@ elif menu == "Daftar Produk":
     uploaded_file = st.file_uploader("Upload Produk (CSV)", type=["csv"])
     if uploaded_file:
         new_df = pd.read_csv(uploaded_file)
-        st.session_state.produk_df = new_df
-        save_produk(new_df)
+        simpan_katalog(new_df)
         st.success("Produk berhasil diupload.")
 
 elif menu == "Tambah Produk":
     st.title("➕ Tambah Produk")
-    produk_df = st.session_state.produk_df
+    produk_df = katalog_df()
 
     nama = st.text_input("Nama Produk")
     owner = st.text_input("Owner")
@@ -208,13 +393,12 @@ elif menu == "Tambah Produk":
             "Stock": stock
         }
         produk_df = pd.concat([produk_df, pd.DataFrame([new_row])], ignore_index=True)
-        st.session_state.produk_df = produk_df
-        save_produk(produk_df)
+        simpan_katalog(produk_df)
         st.success("Produk berhasil ditambahkan.")
 
 elif menu == "Edit Produk":
     st.title("✏️ Edit Produk")
-    produk_df = st.session_state.produk_df
+    produk_df = katalog_df()
     if not produk_df.empty:
         pilihan = st.selectbox("Pilih Produk", produk_df["Nama Produk"].unique())
         row = produk_df[produk_df["Nama Produk"] == pilihan].iloc[0]
@@ -227,45 +411,89 @@ elif menu == "Edit Produk":
         stock          = st.number_input("Stock", min_value=0, value=int(row.get("Stock",0)))
 
         if st.button("Update Produk"):
+            ubah_stok = stock != int(row["Stock"])
+            if ubah_stok and sinkron.AKTIF and koneksi.online:
+                # perubahan stok dikirim sebagai delta, kolom Stock tidak ditimpa
+                get_sinkron(koneksi.sheets).catat([(pilihan, stock - int(row["Stock"]))])
+                ubah_stok = False
             idx_produk = produk_df[produk_df["Nama Produk"] == pilihan].index[0]
             produk_df.at[idx_produk, "Nama Produk"] = nama
             produk_df.at[idx_produk, "Owner"] = owner
             produk_df.at[idx_produk, "Harga Reseller"] = harga_reseller
             produk_df.at[idx_produk, "Harga Retail"] = harga_retail
             produk_df.at[idx_produk, "Potongan"] = potongan
-            produk_df.at[idx_produk, "Stock"] = stock
-            st.session_state.produk_df = produk_df
-            save_produk(produk_df)
+            if ubah_stok:
+                # Stock hanya dikirim kalau diedit; selain itu sel Stock di sheet dibiarkan (lihat selisih.py)
+                produk_df.at[idx_produk, "Stock"] = stock
+            simpan_katalog(produk_df)
             st.success("Produk berhasil diupdate.")
 
 elif menu == "Hapus Produk":
     st.title("🗑️ Hapus Produk")
-    produk_df = st.session_state.produk_df
+    produk_df = katalog_df()
     if not produk_df.empty:
         pilihan = st.selectbox("Pilih Produk", produk_df["Nama Produk"].unique())
         if st.button("Hapus"):
             produk_df = produk_df[produk_df["Nama Produk"] != pilihan]
-            st.session_state.produk_df = produk_df
-            save_produk(produk_df)
+            simpan_katalog(produk_df)
             st.success("Produk berhasil dihapus.")
 
+elif menu == "Aturan Harga":
+    harga.halaman(harga_jual)
+
 elif menu == "Laporan Penjualan":
     st.title("📊 Laporan Penjualan")
-    laporan_df = st.session_state.penjualan_df
+    # penjualan kasir lain sejak muat terakhir ikut diambil; yang diunduh hanya baris barunya
+    if koneksi.online:
+        terbaru = load_penjualan()
+        if not terbaru.empty:
+            penjualan.ganti(terbaru)
+    laporan_df = penjualan.df
+
+    # bulan yang sudah tutup dibaca dari arsip Parquet, bulan berjalan dari sheet
+    arsip_penjualan = get_arsip()
+    arsip_penjualan.arsipkan(laporan_df)
+    bulan = arsip_penjualan.daftar_bulan(laporan_df)
+    if bulan:
+        col1, col2 = st.columns(2)
+        dari = col1.selectbox("Dari Bulan", bulan, index=0)
+        sampai = col2.selectbox("Sampai Bulan", bulan, index=len(bulan) - 1)
+        owner = st.selectbox("Owner", ["Semua"] + sorted({str(p["Owner"]) for p in inventaris.daftar()}))
+        laporan_df = arsip_penjualan.gabung(laporan_df, dari=dari, sampai=sampai,
+                                            owner=None if owner == "Semua" else owner)
     st.dataframe(laporan_df)
 
     if not laporan_df.empty:
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            laporan_df.to_excel(writer, index=False, sheet_name="Laporan")
-        st.download_button("Download Excel", data=output.getvalue(), file_name="laporan_penjualan.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-        pdf_output = BytesIO()
-        doc = SimpleDocTemplate(pdf_output, pagesize=A4)
-        styles = getSampleStyleSheet()
-        table_data = [laporan_df.columns.tolist()] + laporan_df.values.tolist()
-        table = Table(table_data)
-        table.setStyle(TableStyle([("BACKGROUND", (0,0), (-1,0), colors.grey),
-                                   ("GRID", (0,0), (-1,-1), 1, colors.black)]))
-        doc.build([Paragraph("Laporan Penjualan", styles["Title"]), table])
-        st.download_button("Download PDF", data=pdf_output.getvalue(), file_name="laporan_penjualan.pdf", mime="application/pdf")
+        # Export Excel / PDF dibuat di latar (lihat ekspor.py)
+        ekspor.halaman(get_ekspor(), bulan, inventaris.owners())
+
+        struk.cetak_ulang(laporan_df, struk.template("Kasir Kawani"), kolom_waktu="Waktu", kolom_nama="Nama Produk",
+                          kolom_qty="Qty", kolom_harga="Harga Jual", kolom_id=struk.KOLOM_ID)
+
+    # rekap & statement akhir bulan semua owner dibangun di process pool (lihat laporan_paralel.py)
+    laporan_paralel.halaman(arsip_penjualan, penjualan.df, inventaris.owners(), "Nama Produk", "Qty", "Subtotal")
+
+# ================= PER OWNER =================
+elif menu == "Per Owner":
+    def penjualan_owner(owner):
+        # bulan tutup dari partisi arsip owner ini, bulan berjalan dari sheet Penjualan
+        df = penjualan.df
+        if not df.empty and "Owner" in df:
+            df = df[df["Owner"].astype(str) == str(owner)]
+        return get_arsip().gabung(df, owner=owner)
+
+    pemilik.halaman(inventaris, penjualan_owner, monitor, get_ekspor())
+
+elif menu == "Stok Menipis":
+    stok_menipis.halaman(monitor)
+
+elif menu == "Prakiraan":
+    def penjualan_setahun():
+        return get_arsip().gabung(penjualan.df, ["Waktu", "Nama Produk", "Qty"], dari=prakiraan.setahun_lalu())
+
+    prakiraan.halaman(penjualan_setahun, "bismillah", "Waktu", "Nama Produk", "Qty", inventaris.stok,
+                      siap=penjualan.dimuat)
+
+penjadwal.tampilkan()
+memori.tampilkan(penjualan=penjualan)
+profil.tampilkan()
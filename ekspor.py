@@ -0,0 +1,238 @@
+import json
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+import laporan_paralel
+import pos
+
+# ================= ANTRIAN EKSPOR =================
+# Ekspor laporan (Excel / PDF) tidak dibuat di dalam rerun halaman. Halaman
+# hanya mengirim job (format, rentang bulan, owner) ke antrian, atau lewat
+# tombol() data yang sudah dimuat halaman itu (mis. Per Owner); thread
+# pekerja memuat datanya lalu merender file di process pool
+# (laporan_paralel.pool()), jadi render reportlab/openpyxl yang berat tidak
+# berebut GIL dengan sesi kasir di server yang sama.
+#
+# Hasil disimpan sebagai artefak di data_lokal/ekspor/<app>/, status job di
+# jobs.json (tetap ada setelah server dimulai ulang). Halaman memantau job
+# yang belum selesai lewat fragment yang dirender ulang tiap DETIK_POLLING.
+
+FOLDER = os.path.join(os.environ.get("KASIR_DATA_LOKAL", "data_lokal"), "ekspor")
+DETIK_POLLING = 2
+
+
+# ---------- render (dijalankan di process pool) ----------
+def tulis_excel(df, path, judul):
+    """df bisa satu DataFrame atau dict {nama sheet: DataFrame}."""
+    lembar = df if isinstance(df, dict) else {judul: df}
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for nama, isi in lembar.items():
+            isi.to_excel(writer, index=False, sheet_name=nama[:31])
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp, path)
+
+
+def tulis_pdf(df, path, judul):
+    """Tabel sederhana di canvas reportlab; lebar kolom mengikuti isi, landscape kalau kolomnya banyak."""
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
+    ukuran = landscape(A4) if len(df.columns) > 6 else A4
+    lebar, tinggi = ukuran
+    teks = df.astype(str)
+    panjang = [min(max([len(str(k))] + teks[k].str.len().tolist()), 30) + 2 for k in df.columns]
+    skala = (lebar - 60) / max(sum(panjang), 1)
+    posisi_x = [30 + sum(panjang[:i]) * skala for i in range(len(panjang))]
+
+    tmp = path + ".tmp"
+    c = canvas.Canvas(tmp, pagesize=ukuran)
+
+    def kepala(y):
+        c.setFont("Helvetica-Bold", 8)
+        for x, k, p in zip(posisi_x, df.columns, panjang):
+            c.drawString(x, y, str(k)[:p])
+        c.setFont("Helvetica", 8)
+        return y - 14
+
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(30, tinggi - 40, judul)
+    y = kepala(tinggi - 70)
+    for baris in teks.itertuples(index=False):
+        for x, nilai, p in zip(posisi_x, baris, panjang):
+            c.drawString(x, y, nilai[:p])
+        y -= 12
+        if y < 40:
+            c.showPage()
+            y = kepala(tinggi - 40)
+    c.save()
+    os.replace(tmp, path)
+
+
+FORMAT = {
+    "Excel": (tulis_excel, "xlsx"),
+    "PDF": (tulis_pdf, "pdf"),
+}
+
+
+# ---------- antrian ----------
+class Antrian:
+    def __init__(self, nama, muat, judul="Laporan Penjualan", pekerja=2, simpan=50):
+        # muat(dari, sampai, owner) -> DataFrame yang diekspor; dipanggil di thread pekerja
+        self.folder = os.path.join(FOLDER, nama)
+        self.path_jobs = os.path.join(self.folder, "jobs.json")
+        self.muat = muat
+        self.judul = judul
+        self.simpan = simpan
+        self.lock = threading.Lock()
+        self._antrian = queue.Queue()
+        os.makedirs(self.folder, exist_ok=True)
+        self.jobs = self._muat_jobs()
+        for _ in range(pekerja):
+            threading.Thread(target=self._kerja, daemon=True).start()
+
+    def _muat_jobs(self):
+        if not os.path.exists(self.path_jobs):
+            return {}
+        with open(self.path_jobs, encoding="utf-8") as f:
+            jobs = json.load(f)
+        for job in jobs.values():
+            if job["status"] in ("menunggu", "berjalan"):
+                job.update(status="gagal", error="Server dimulai ulang sebelum ekspor selesai")
+        return jobs
+
+    def _simpan_jobs(self):
+        tmp = self.path_jobs + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.jobs, f)
+        os.replace(tmp, self.path_jobs)
+
+    def _ubah(self, id_job, **data):
+        with self.lock:
+            self.jobs[id_job].update(data)
+            self._simpan_jobs()
+
+    def kirim(self, format, dari=None, sampai=None, owner=None, muat=None, label=None, nama_file=None):
+        """Masukkan job ekspor ke antrian. Mengembalikan ID job.
+
+        muat(dari, sampai, owner) menggantikan self.muat untuk job ini saja
+        (tidak ikut disimpan di jobs.json; job yang belum selesai memang
+        dianggap gagal setelah server dimulai ulang).
+        """
+        id_job = uuid.uuid4().hex[:10]
+        with self.lock:
+            self.jobs[id_job] = {
+                "id": id_job, "format": format, "dari": dari, "sampai": sampai,
+                "owner": None if owner is None else str(owner), "status": "menunggu",
+                "dibuat": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "file": None, "error": None,
+                "label": label, "nama_file": nama_file,
+            }
+            self._bersihkan()
+            self._simpan_jobs()
+        self._antrian.put((id_job, owner, muat))
+        return id_job
+
+    def status(self, id_job):
+        with self.lock:
+            job = self.jobs.get(id_job)
+            return dict(job) if job else None
+
+    def baca(self, id_job):
+        job = self.status(id_job)
+        with open(os.path.join(self.folder, job["file"]), "rb") as f:
+            return f.read()
+
+    def _bersihkan(self):
+        # job lama yang sudah tuntas dibuang beserta artefaknya
+        tuntas = [j for j in self.jobs.values() if j["status"] in ("selesai", "gagal")]
+        for job in sorted(tuntas, key=lambda j: j["dibuat"])[:max(len(self.jobs) - self.simpan, 0)]:
+            if job["file"] and os.path.exists(os.path.join(self.folder, job["file"])):
+                os.remove(os.path.join(self.folder, job["file"]))
+            del self.jobs[job["id"]]
+
+    def _kerja(self):
+        while True:
+            id_job, owner, muat = self._antrian.get()
+            job = self.status(id_job)
+            try:
+                self._ubah(id_job, status="berjalan")
+                df = (muat or self.muat)(job["dari"], job["sampai"], owner)
+                tulis, ext = FORMAT[job["format"]]
+                nama_file = f"{id_job}.{ext}"
+                laporan_paralel.pool().submit(tulis, df, os.path.join(self.folder, nama_file), self.judul).result()
+                baris = sum(map(len, df.values())) if isinstance(df, dict) else len(df)
+                self._ubah(id_job, status="selesai", file=nama_file, baris=baris)
+            except Exception as e:
+                self._ubah(id_job, status="gagal", error=str(e))
+
+
+# ---------- tampilan streamlit ----------
+def _polling(fungsi):
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return fragment(run_every=DETIK_POLLING)(fungsi) if fragment else fungsi
+
+
+@_polling
+def _pantau(antrian, ids):
+    """Status job yang belum selesai; begitu semuanya tuntas, seluruh halaman dirender ulang sekali."""
+    berjalan = [j for j in map(antrian.status, ids) if j and j["status"] in ("menunggu", "berjalan")]
+    if not berjalan:
+        pos.rerun_app()
+    for job in berjalan:
+        label = job.get("label") or f"{job['format']} {job['dari']} s/d {job['sampai']}"
+        st.info(f"⏳ {label}: {job['status']}...")
+
+
+def halaman(antrian, bulan, owners=None):
+    """Form ekspor + daftar ekspor sesi ini. bulan = pilihan bulan (YYYY-MM)."""
+    st.subheader("📤 Ekspor Laporan")
+    if not bulan:
+        st.info("Belum ada transaksi untuk diekspor.")
+        return
+    with st.form("form_ekspor"):
+        format = st.selectbox("Format", list(FORMAT))
+        col1, col2 = st.columns(2)
+        dari = col1.selectbox("Dari Bulan", bulan, index=0, key="ekspor_dari")
+        sampai = col2.selectbox("Sampai Bulan", bulan, index=len(bulan) - 1, key="ekspor_sampai")
+        owner = st.selectbox("Owner", ["Semua"] + list(owners), format_func=str, key="ekspor_owner") if owners else "Semua"
+        if st.form_submit_button("Buat Ekspor"):
+            id_job = antrian.kirim(format, dari, sampai, None if owner == "Semua" else owner)
+            st.session_state.setdefault("ekspor_job", []).append(id_job)
+
+    _daftar(antrian, st.session_state.get("ekspor_job", []))
+
+
+def tombol(antrian, label, muat, nama_file, kunci, owner=None):
+    """Tombol ekspor Excel untuk data yang sudah dimuat halaman; muat() -> DataFrame / {sheet: DataFrame}.
+
+    File dibuat di latar seperti form ekspor, bukan di tiap rerun.
+    """
+    if st.button(f"📤 Buat {label}", key=f"buat_{kunci}"):
+        id_job = antrian.kirim("Excel", owner=owner, muat=lambda *_: muat(), label=label, nama_file=nama_file)
+        st.session_state.setdefault(f"ekspor_{kunci}", []).append(id_job)
+    _daftar(antrian, st.session_state.get(f"ekspor_{kunci}", []))
+
+
+def _daftar(antrian, ids):
+    """Download / error / status job ekspor sesi ini, yang terbaru di atas."""
+    jobs = [j for j in map(antrian.status, reversed(ids)) if j]
+    for job in jobs:
+        label = job.get("label") or (
+            f"{job['format']} {job['dari']} s/d {job['sampai']}" + (f" ({job['owner']})" if job["owner"] else ""))
+        nama_file = job.get("nama_file") or f"laporan_{job['dari']}_{job['sampai']}.{FORMAT[job['format']][1]}"
+        if job["status"] == "selesai":
+            st.download_button(f"⬇️ {label}, {job['baris']} baris", antrian.baca(job["id"]),
+                               nama_file, key=f"ekspor_{job['id']}")
+        elif job["status"] == "gagal":
+            st.error(f"{label}: gagal ({job['error']})")
+    if any(j["status"] in ("menunggu", "berjalan") for j in jobs):
+        _pantau(antrian, ids)
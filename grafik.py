@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+import pos
+import profil
+
+# ================= GRAFIK PENJUALAN =================
+# Grafik dirender ke PNG lewat API objek matplotlib (Figure), bukan pyplot,
+# sehingga tidak ada figure yang tertinggal di registry global pyplot.
+#
+# Render tidak dijalankan di dalam rerun halaman: grafik_batang() /
+# grafik_waktu() mengirim render ke satu thread latar dan langsung kembali.
+# Selama PNG belum jadi, tempat grafik dipantau fragment yang dirender ulang
+# tiap DETIK_POLLING; begitu jadi, halaman dirender ulang sekali (seperti
+# ekspor.py). Hasil di-cache berdasarkan data agregat (MAKS_GRAFIK terakhir,
+# dipakai bersama semua sesi): selama data belum berubah, gambar yang sama
+# dipakai ulang tanpa render ulang.
+
+DETIK_POLLING = 1
+MAKS_GRAFIK = 64
+
+# satu pekerja: figure matplotlib tidak dirender bersamaan
+_pekerja = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kasir-grafik")
+_hasil = OrderedDict()  # (fungsi, argumen) -> Future PNG, yang terakhir dipakai di akhir
+_lock = threading.Lock()
+
+
+def _figure(figsize):
+    with profil.ukur("import matplotlib"):
+        from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+
+def _png(fig):
+    buffer = BytesIO()
+    fig.tight_layout()
+    fig.savefig(buffer, format="png", dpi=100)
+    return buffer.getvalue()
+
+
+# ---------- render (dijalankan di thread latar) ----------
+def _batang(label, nilai, judul, xlabel, ylabel, top_n):
+    pasangan = sorted(zip(label, nilai), key=lambda x: x[1], reverse=True)
+    if top_n:
+        pasangan = pasangan[:top_n]
+
+    fig = _figure((6, 4))
+    ax = fig.subplots()
+    ax.bar([str(p[0]) for p in pasangan], [p[1] for p in pasangan])
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(judul)
+    ax.tick_params(axis="x", labelrotation=45)
+    return _png(fig)
+
+
+def _waktu(tanggal, nilai, judul, ylabel):
+    fig = _figure((7, 3.5))
+    ax = fig.subplots()
+    ax.plot([str(t) for t in tanggal], nilai, marker="o")
+    ax.set_xlabel("Tanggal")
+    ax.set_ylabel(ylabel)
+    ax.set_title(judul)
+    ax.tick_params(axis="x", labelrotation=45)
+    return _png(fig)
+
+
+def _kirim(fungsi, *args):
+    """(kunci, Future PNG) untuk fungsi(*args): dari cache, atau dikirim ke pekerja kalau belum ada."""
+    kunci = (fungsi.__name__,) + args
+    with _lock:
+        future = _hasil.get(kunci)
+        if future is None:
+            future = _hasil[kunci] = _pekerja.submit(fungsi, *args)
+        _hasil.move_to_end(kunci)
+        while len(_hasil) > MAKS_GRAFIK:
+            _hasil.popitem(last=False)
+    return kunci, future
+
+
+def _buang(kunci):
+    with _lock:
+        _hasil.pop(kunci, None)
+
+
+# ---------- tampilan streamlit ----------
+def _polling(fungsi):
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return fragment(run_every=DETIK_POLLING)(fungsi) if fragment else None
+
+
+@_polling
+def _pantau(future):
+    """Placeholder grafik yang belum jadi; begitu selesai, seluruh halaman dirender ulang sekali."""
+    if future.done():
+        pos.rerun_app()
+    st.info("⏳ Menyiapkan grafik...")
+
+
+def _tampilkan(kunci, future):
+    if not future.done() and _pantau is not None:
+        _pantau(future)
+        return
+    # tanpa fragment (Streamlit lama) ditunggu di rerun ini seperti sebelumnya
+    try:
+        st.image(future.result())
+    except Exception as e:
+        # render yang gagal tidak di-cache: dicoba lagi di rerun berikutnya
+        _buang(kunci)
+        st.error(f"Grafik gagal dibuat: {e}")
+
+
+def grafik_batang(label, nilai, judul, xlabel, ylabel, top_n=None):
+    """label & nilai berupa tuple (hashable) hasil agregasi. top_n = ambil N terbesar."""
+    _tampilkan(*_kirim(_batang, label, nilai, judul, xlabel, ylabel, top_n))
+
+
+def grafik_waktu(tanggal, nilai, judul, ylabel):
+    """tanggal & nilai berupa tuple yang sudah diurutkan per hari."""
+    _tampilkan(*_kirim(_waktu, tanggal, nilai, judul, ylabel))
+
+
+def seri_harian(df, kolom_waktu, kolom_nilai):
+    """Agregasi df per hari -> (tuple tanggal, tuple nilai) siap untuk grafik_waktu."""
+    if kolom_waktu not in df or df[kolom_waktu].isna().all():
+        return (), ()
+    harian = (
+        df.dropna(subset=[kolom_waktu])
+        .assign(tanggal=lambda d: pd.to_datetime(d[kolom_waktu]).dt.date)
+        .groupby("tanggal")[kolom_nilai]
+        .sum()
+    )
+    return tuple(harian.index), tuple(harian.tolist())
@@ -0,0 +1,283 @@
+import bisect
+import json
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from inventaris import parse_int
+
+# ================= HARGA & DISKON =================
+# Harga jual dihitung dari aturan, bukan lagi selalu Harga Retail:
+#
+# - daftar harga: tiap daftar (mis. Retail, Reseller) memakai kolom harga
+#   produknya sendiri; kasir memilih daftar per keranjang,
+# - aturan (disimpan di data_lokal) berlaku untuk satu produk, satu owner
+#   atau semua produk, opsional hanya untuk satu daftar harga, mulai dari
+#   Min Qty (harga grosir), opsional hanya antara Mulai dan Selesai. Hasilnya
+#   harga tetap (Harga) atau potongan dari harga dasar (Diskon % lalu
+#   Diskon Rp). Kalau beberapa aturan cocok, yang termurah yang dipakai.
+#
+# Aturan tidak dievaluasi per item tiap rerun. Aturan yang sedang aktif
+# dikompilasi jadi "tangga" harga per (produk, daftar): ambang qty naik ->
+# harga satuan, jadi harga satu item = satu bisect. Tangga diperbarui per
+# produk lewat inventaris.pengamat (tambah / edit / hapus produk), dibangun
+# ulang seluruhnya saat katalog dimuat ulang, aturan disimpan, atau saat
+# aturan berjangka mulai / selesai. Keranjang yang tidak berubah sejak
+# terakhir dihitung (versi keranjang & versi tabel sama) dilewati.
+#
+# Mesin juga dipakai api.py (tanpa Streamlit), jadi streamlit hanya
+# di-import di fungsi halaman.
+
+FOLDER = os.environ.get("KASIR_DATA_LOKAL", "data_lokal")
+KOLOM = ["Nama", "Daftar", "Produk", "Owner", "Min Qty", "Harga", "Diskon %", "Diskon Rp", "Mulai", "Selesai"]
+
+
+def _teks(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return ""
+    if isinstance(v, tuple):
+        return json.dumps(list(v))
+    return str(v).strip()
+
+
+def _angka(v):
+    try:
+        v = float(_teks(v) or 0)
+    except ValueError:
+        return 0.0
+    return 0.0 if math.isnan(v) else v
+
+
+def _waktu(teks, akhir=False):
+    """'2024-12-01' / '2024-12-01 18:00' -> datetime; kosong -> None. Selesai berupa tanggal = sampai akhir hari itu."""
+    teks = _teks(teks)
+    if not teks:
+        return None
+    waktu = datetime.fromisoformat(teks)
+    return waktu + timedelta(days=1) if akhir and len(teks) == 10 else waktu
+
+
+def kompilasi_aturan(baris):
+    """Baris aturan (dict dengan KOLOM) -> aturan siap pakai. ValueError kalau ada yang tidak valid."""
+    hasil = []
+    for i, a in enumerate(baris, start=1):
+        try:
+            aturan = {
+                "daftar": _teks(a.get("Daftar")),
+                "produk": _teks(a.get("Produk")),
+                "owner": _teks(a.get("Owner")),
+                "min": max(int(_angka(a.get("Min Qty"))), 1),
+                "harga": int(_angka(a.get("Harga"))),
+                "persen": _angka(a.get("Diskon %")),
+                "rp": int(_angka(a.get("Diskon Rp"))),
+                "mulai": _waktu(a.get("Mulai")),
+                "selesai": _waktu(a.get("Selesai"), akhir=True),
+            }
+        except ValueError as e:
+            raise ValueError(f"Aturan baris {i}: {e}")
+        if not 0 <= aturan["persen"] <= 100:
+            raise ValueError(f"Aturan baris {i}: Diskon % harus 0 - 100")
+        hasil.append(aturan)
+    return hasil
+
+
+def _harga_aturan(aturan, dasar):
+    if aturan["harga"]:
+        return aturan["harga"]
+    return max(0, round(dasar * (1 - aturan["persen"] / 100)) - aturan["rp"])
+
+
+def tangga(dasar, aturan):
+    """Harga dasar + aturan yang berlaku untuk satu produk & daftar -> (ambang qty, harga satuan), keduanya urut naik/turun."""
+    ambang, harga = [1], [dasar]
+    for a in sorted(aturan, key=lambda a: a["min"]):
+        h = min(harga[-1], _harga_aturan(a, dasar))
+        if a["min"] == ambang[-1]:
+            harga[-1] = h
+        elif h < harga[-1]:
+            ambang.append(a["min"])
+            harga.append(h)
+    return ambang, harga
+
+
+class Mesin:
+    def __init__(self, inventaris, nama, daftar_harga):
+        # daftar_harga: nama daftar -> kolom harga produk, mis. {"Retail": "Harga Retail", ...};
+        # daftar pertama dipakai kalau keranjang tidak memilih daftar
+        self.inv = inventaris
+        self.daftar_harga = daftar_harga
+        self.daftar = list(daftar_harga)
+        self.path = os.path.join(FOLDER, f"aturan_harga_{nama}.json")
+        self.lock = threading.Lock()
+        self.aturan = self._muat()
+        self.versi = 0
+        self._aktif = ({}, {}, [])  # aturan aktif per produk, per owner, untuk semua
+        self._tangga = {}           # kunci -> {daftar: (ambang, harga)}
+        self.berlaku_sampai = None  # waktu aturan berjangka berikutnya mulai / selesai
+        # urutan lock sama dengan saat dikabari: inventaris dulu, baru mesin harga
+        with inventaris.lock, self.lock:
+            self._bangun()
+            inventaris.pengamat.append(self._kabar)
+
+    # ---------- aturan ----------
+    def _muat(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def simpan(self, baris):
+        """Ganti semua aturan (list dict dengan KOLOM). ValueError kalau ada aturan yang tidak valid."""
+        baris = [{k: _teks(a.get(k)) for k in KOLOM} for a in baris if any(_teks(a.get(k)) for k in KOLOM)]
+        kompilasi_aturan(baris)
+        with self.inv.lock, self.lock:
+            os.makedirs(FOLDER, exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(baris, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self.aturan = baris
+            self._bangun()
+
+    # ---------- kompilasi ----------
+    def _bangun(self, sekarang=None):
+        sekarang = sekarang or datetime.now()
+        per_produk, per_owner, semua = {}, {}, []
+        batas = []
+        for a in kompilasi_aturan(self.aturan):
+            batas += [w for w in (a["mulai"], a["selesai"]) if w and w > sekarang]
+            if (a["mulai"] and a["mulai"] > sekarang) or (a["selesai"] and a["selesai"] <= sekarang):
+                continue
+            if a["produk"]:
+                per_produk.setdefault(a["produk"], []).append(a)
+            elif a["owner"]:
+                per_owner.setdefault(a["owner"], []).append(a)
+            else:
+                semua.append(a)
+        self._aktif = (per_produk, per_owner, semua)
+        self.berlaku_sampai = min(batas, default=None)
+        self._tangga = dict(self._kompilasi(p) for p in self.inv.produk)
+        self.versi += 1
+
+    def _kompilasi(self, produk):
+        kunci = self.inv.kunci_dari(produk)
+        owner = _teks(produk.get(self.inv.kolom_owner)) if self.inv.kolom_owner else ""
+        per_produk, per_owner, semua = self._aktif
+        calon = [a for a in per_produk.get(_teks(kunci), []) if a["owner"] in ("", owner)]
+        calon += per_owner.get(owner, []) + semua
+        utama = parse_int(produk.get(self.daftar_harga[self.daftar[0]], 0))
+        hasil = {}
+        for daftar, kolom in self.daftar_harga.items():
+            # produk tanpa harga di daftar ini (mis. Harga Reseller kosong) memakai harga daftar utama
+            dasar = parse_int(produk.get(kolom, 0)) or utama
+            hasil[daftar] = tangga(dasar, [a for a in calon if a["daftar"] in ("", daftar)])
+        return kunci, hasil
+
+    def _kabar(self, keys, terjual):
+        if terjual:
+            return  # checkout hanya mengubah stok, harga tetap
+        with self.lock:
+            if keys is None:
+                self._bangun()
+                return
+            for kunci in keys:
+                produk = self.inv.cari(kunci)
+                if produk is None:
+                    self._tangga.pop(kunci, None)
+                else:
+                    self._tangga[kunci] = self._kompilasi(produk)[1]
+            self.versi += 1
+
+    def _segarkan(self):
+        # aturan berjangka mulai / selesai: bangun ulang sekali, bukan cek waktu per item
+        if self.berlaku_sampai and datetime.now() >= self.berlaku_sampai:
+            with self.inv.lock, self.lock:
+                if self.berlaku_sampai and datetime.now() >= self.berlaku_sampai:
+                    self._bangun()
+
+    # ---------- harga ----------
+    def harga(self, kunci, qty=1, daftar=None):
+        """Harga satuan produk untuk qty tertentu; None kalau produk tidak ada."""
+        self._segarkan()
+        with self.lock:
+            t = self._tangga.get(kunci)
+            if t is None:
+                return None
+            ambang, harga = t[daftar or self.daftar[0]]
+            return harga[bisect.bisect_right(ambang, qty) - 1]
+
+    def terapkan(self, keranjang, daftar=None):
+        """Isi ulang harga jual tiap item keranjang dari tabel. Mengembalikan False kalau tidak ada yang perlu dihitung."""
+        self._segarkan()
+        daftar = daftar or self.daftar[0]
+        with self.lock:
+            tanda = (keranjang.versi, self.versi, daftar)
+            if keranjang.tanda_harga == tanda:
+                return False
+            for item in keranjang.baris.values():
+                t = self._tangga.get(keranjang._kunci(item))
+                if t is None:
+                    continue  # produk sudah dihapus dari katalog: harga saat ditambahkan dipertahankan
+                ambang, harga = t[daftar]
+                item[keranjang.kolom_harga] = harga[bisect.bisect_right(ambang, item[keranjang.kolom_qty]) - 1]
+                keranjang._hitung(item)
+            keranjang.tanda_harga = tanda
+            return True
+
+
+# ---------- halaman ----------
+def pilih_daftar(mesin):
+    """Pilihan daftar harga untuk keranjang sesi ini."""
+    import streamlit as st
+    return st.radio("Daftar Harga", mesin.daftar, horizontal=True, key="daftar_harga")
+
+
+def halaman(mesin):
+    import streamlit as st
+
+    st.title("🏷️ Aturan Harga")
+    st.caption(
+        "Kosongkan Daftar / Produk / Owner supaya berlaku untuk semua. Isi Harga untuk harga tetap, "
+        "atau Diskon % / Diskon Rp dari harga dasar. Min Qty untuk harga grosir; Mulai / Selesai "
+        "(YYYY-MM-DD atau YYYY-MM-DD HH:MM) untuk promo berjangka. Aturan termurah yang dipakai."
+    )
+    df = pd.DataFrame(mesin.aturan, columns=KOLOM)
+    for kolom in ["Min Qty", "Harga", "Diskon %", "Diskon Rp"]:
+        df[kolom] = pd.to_numeric(df[kolom], errors="coerce")
+    kolom = {
+        "Daftar": st.column_config.SelectboxColumn("Daftar", options=[""] + mesin.daftar),
+        "Min Qty": st.column_config.NumberColumn("Min Qty", min_value=1, step=1),
+        "Harga": st.column_config.NumberColumn("Harga", min_value=0, step=100),
+        "Diskon %": st.column_config.NumberColumn("Diskon %", min_value=0, max_value=100),
+        "Diskon Rp": st.column_config.NumberColumn("Diskon Rp", min_value=0, step=100),
+    }
+    if mesin.inv.kolom_owner:
+        kolom["Owner"] = st.column_config.SelectboxColumn("Owner", options=[""] + [str(o) for o in mesin.inv.owners()])
+    hasil = st.data_editor(df, num_rows="dynamic", hide_index=True, use_container_width=True,
+                           key="editor_aturan_harga", column_config=kolom)
+    if st.button("Simpan Aturan"):
+        try:
+            mesin.simpan(hasil.to_dict("records"))
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.success("Aturan harga disimpan.")
+
+    if mesin.berlaku_sampai:
+        st.info(f"Aturan berjangka berikutnya berubah pada {mesin.berlaku_sampai:%Y-%m-%d %H:%M}.")
+
+    st.subheader("Cek Harga")
+    produk = mesin.inv.daftar()
+    if produk:
+        col1, col2, col3 = st.columns(3)
+        kunci = col1.selectbox("Produk", [mesin.inv.kunci_dari(p) for p in produk], format_func=str)
+        qty = col2.number_input("Qty", min_value=1, value=1, step=1)
+        daftar = col3.selectbox("Daftar", mesin.daftar)
+        satuan = mesin.harga(kunci, int(qty), daftar)
+        if satuan is None:
+            st.warning(f"Produk {kunci} tidak ada di tabel harga (baru dihapus / katalog sedang dimuat ulang).")
+        else:
+            st.write(f"Harga satuan: Rp{satuan:,} — Total: Rp{satuan * int(qty):,}")
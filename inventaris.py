@@ -0,0 +1,249 @@
+import threading
+import uuid
+
+# ================= INVENTARIS BERSAMA =================
+# Satu objek Inventaris dipakai bersama oleh semua sesi (tab/kasir) di satu
+# proses server, lewat st.cache_resource di masing-masing app. Semua
+# perubahan stok lewat reserve/commit/release di bawah lock, sehingga dua
+# kasir tidak bisa menjual stok yang sama.
+#
+# Kalau kolom_owner diisi, produk juga diindeks per owner (partisi), jadi
+# tampilan / laporan per owner hanya membaca produk owner itu.
+#
+# Pengamat (mis. monitor stok menipis) didaftarkan di inventaris.pengamat
+# dan dikabari kunci produk yang berubah: pengamat(kunci, terjual), dengan
+# kunci=None kalau seluruh katalog dimuat ulang.
+
+
+class StokTidakCukup(Exception):
+    pass
+
+
+class VersiBentrok(Exception):
+    """Stok di Google Sheet sudah diubah terminal lain sejak terakhir dimuat."""
+
+
+def parse_int(value):
+    try:
+        return int(str(value).replace('Rp', '').replace('.', '').replace(',', '').strip() or 0)
+    except ValueError:
+        return 0
+
+
+class Inventaris:
+    def __init__(self, produk, kunci, kolom_stok, kolom_owner=None):
+        # kunci: nama kolom (mis. "SKU") atau tuple kolom (mis. ("Nama Produk", "Owner"))
+        self.produk = produk
+        self.kunci = kunci
+        self.kolom_stok = kolom_stok
+        self.kolom_owner = kolom_owner
+        self.lock = threading.RLock()
+        self.versi = 0
+        self._dipesan = {}     # kunci -> qty yang sedang di-reserve
+        self._reservasi = {}   # id reservasi -> {kunci: qty}
+        self._indeks = {}
+        self._per_owner = {}   # owner -> {kunci: produk}
+        self.pengamat = []
+        self.reindeks()
+        # stok terakhir yang diketahui di Google Sheet
+        self.stok_remote = {k: parse_int(p[kolom_stok]) for k, p in self._indeks.items()}
+
+    def kunci_dari(self, produk):
+        if isinstance(self.kunci, tuple):
+            return tuple(produk[k] for k in self.kunci)
+        return produk[self.kunci]
+
+    def reindeks(self):
+        with self.lock:
+            self._indeks = {self.kunci_dari(p): p for p in self.produk}
+            self._per_owner = {}
+            if self.kolom_owner:
+                for key, p in self._indeks.items():
+                    self._per_owner.setdefault(p.get(self.kolom_owner), {})[key] = p
+
+    def _owner_hapus(self, key, produk):
+        if self.kolom_owner:
+            partisi = self._per_owner.get(produk.get(self.kolom_owner), {})
+            partisi.pop(key, None)
+            if not partisi:
+                self._per_owner.pop(produk.get(self.kolom_owner), None)
+
+    def _kabari(self, keys, terjual=None):
+        for pengamat in self.pengamat:
+            pengamat(keys, terjual or {})
+
+    def daftar(self):
+        with self.lock:
+            return list(self.produk)
+
+    def owners(self):
+        with self.lock:
+            return sorted(self._per_owner, key=str)
+
+    def daftar_owner(self, owner):
+        """Produk milik satu owner saja (tanpa scan seluruh katalog)."""
+        with self.lock:
+            return list(self._per_owner.get(owner, {}).values())
+
+    def cari(self, key):
+        return self._indeks.get(key)
+
+    def stok(self, key):
+        p = self._indeks.get(key)
+        return parse_int(p[self.kolom_stok]) if p is not None else 0
+
+    def tersedia(self, key):
+        with self.lock:
+            return self.stok(key) - self._dipesan.get(key, 0)
+
+    # ---------- reserve / commit / release ----------
+    def reserve(self, items):
+        """items: list (kunci, qty). Semua item di-reserve atau tidak sama sekali.
+
+        qty <= 0 ditolak (ValueError): penjualan negatif akan menambah stok.
+        """
+        butuh = {}
+        for key, qty in items:
+            if int(qty) <= 0:
+                raise ValueError(f"Qty {key} harus lebih dari 0, bukan {qty}")
+            butuh[key] = butuh.get(key, 0) + int(qty)
+        with self.lock:
+            for key, qty in butuh.items():
+                if self.tersedia(key) < qty:
+                    raise StokTidakCukup(key)
+            for key, qty in butuh.items():
+                self._dipesan[key] = self._dipesan.get(key, 0) + qty
+            rid = uuid.uuid4().hex
+            self._reservasi[rid] = butuh
+            return rid
+
+    def commit(self, rid):
+        with self.lock:
+            butuh = self._reservasi.pop(rid)
+            for key, qty in butuh.items():
+                self._lepas(key, qty)
+                p = self._indeks.get(key)
+                if p is not None:
+                    p[self.kolom_stok] = parse_int(p[self.kolom_stok]) - qty
+            self.versi += 1
+            self._kabari(list(butuh), butuh)
+            return butuh
+
+    def release(self, rid):
+        with self.lock:
+            for key, qty in self._reservasi.pop(rid, {}).items():
+                self._lepas(key, qty)
+
+    def _lepas(self, key, qty):
+        sisa = self._dipesan.get(key, 0) - qty
+        if sisa > 0:
+            self._dipesan[key] = sisa
+        else:
+            self._dipesan.pop(key, None)
+
+    def isi_reservasi(self, rid):
+        with self.lock:
+            return dict(self._reservasi.get(rid, {}))
+
+    def checkout(self, items):
+        return self.commit(self.reserve(items))
+
+    # ---------- perubahan katalog ----------
+    def tambah(self, produk):
+        with self.lock:
+            self.produk.append(produk)
+            key = self.kunci_dari(produk)
+            self._indeks[key] = produk
+            if self.kolom_owner:
+                self._per_owner.setdefault(produk.get(self.kolom_owner), {})[key] = produk
+            self.versi += 1
+            self._kabari([key])
+
+    def ubah(self, key, data):
+        with self.lock:
+            p = self._indeks[key]
+            p.update(data)
+            self.reindeks()
+            self.versi += 1
+            # kunci bisa ikut berubah (mis. nama produk diganti)
+            self._kabari([key, self.kunci_dari(p)])
+
+    def hapus(self, key):
+        with self.lock:
+            p = self._indeks.pop(key, None)
+            if p is not None:
+                self.produk.remove(p)
+                self._owner_hapus(key, p)
+                self.versi += 1
+                self._kabari([key])
+
+    def muat(self, produk):
+        """Ganti seluruh katalog, mis. setelah dimuat ulang dari Google Sheet."""
+        with self.lock:
+            self.produk[:] = produk
+            self.reindeks()
+            self.stok_remote = {k: parse_int(p[self.kolom_stok]) for k, p in self._indeks.items()}
+            self.versi += 1
+            self._kabari(None)
+
+
+# ================= STOK DI GOOGLE SHEET =================
+_lock_remote = threading.Lock()
+
+
+def sel_a1(row, col):
+    huruf = ""
+    while col:
+        col, sisa = divmod(col - 1, 26)
+        huruf = chr(65 + sisa) + huruf
+    return f"{huruf}{row}"
+
+
+def _tulis_stok(sheet, inv, butuh):
+    """Tulis pengurangan stok hanya ke sel Stock yang berubah.
+
+    Sebelum menulis, nilai stok di sheet dibandingkan dengan stok_remote
+    (versi yang terakhir kita lihat). Kalau berbeda, terminal lain sudah
+    menulis duluan -> VersiBentrok, supaya pengurangan stok tidak tertimpa.
+    """
+    with _lock_remote:
+        header = sheet.row_values(1)
+        col_kunci = header.index(inv.kunci) + 1
+        col_stok = header.index(inv.kolom_stok) + 1
+        nilai_kunci = sheet.col_values(col_kunci)[1:]
+        nilai_stok = sheet.col_values(col_stok)[1:]
+
+        updates = []
+        stok_baru = {}
+        for key, qty in butuh.items():
+            if key not in nilai_kunci:
+                raise VersiBentrok(key)
+            baris = nilai_kunci.index(key)
+            remote = parse_int(nilai_stok[baris]) if baris < len(nilai_stok) else 0
+            if remote != inv.stok_remote.get(key):
+                raise VersiBentrok(key)
+            stok_baru[key] = remote - qty
+            updates.append({"range": sel_a1(baris + 2, col_stok), "values": [[stok_baru[key]]]})
+
+        sheet.batch_update(updates)
+        inv.stok_remote.update(stok_baru)
+
+
+def checkout_remote(sheet, inv, items, load_records, percobaan=3):
+    """Reserve stok lokal, tulis ke Google Sheet dengan cek versi, lalu commit.
+
+    load_records dipanggil untuk memuat ulang katalog kalau terjadi bentrok.
+    """
+    for _ in range(percobaan):
+        rid = inv.reserve(items)
+        try:
+            _tulis_stok(sheet, inv, inv.isi_reservasi(rid))
+        except VersiBentrok:
+            inv.release(rid)
+            inv.muat(load_records())
+            continue
+        except Exception:
+            inv.release(rid)
+            raise
+        return inv.commit(rid)
+    raise VersiBentrok("Stok terus berubah, silakan ulangi checkout")
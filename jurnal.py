@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from inventaris import sel_a1
+
+# ================= JURNAL TULIS SHEET =================
+# Tulis ulang satu worksheet (save_produk / save_penjualan) dulu berupa
+# clear() lalu update(): kalau proses mati atau update gagal di antara
+# keduanya, seluruh katalog / histori penjualan hilang. Sekarang:
+#
+# 1. Isi baru dicatat dulu ke jurnal lokal (file JSON, fsync, rename),
+# 2. worksheet ditimpa dari A1 tanpa clear(), lalu sisa baris / kolom
+#    lama di luar isi baru dibersihkan (tulis_ulang),
+# 3. baru setelah itu entri jurnal dihapus.
+#
+# Entri yang masih ada saat start / online lagi berarti tulisnya belum
+# tentu selesai; pulihkan() mengirim ulang entri terbaru tiap worksheet
+# (yang lebih lama sudah tergantikan) sebelum hal lain dikirim ke sheet.
+
+FOLDER = os.path.join(os.environ.get("KASIR_DATA_LOKAL", "data_lokal"), "jurnal")
+
+
+def tulis_ulang(sheet, values):
+    """Timpa isi worksheet dengan `values` (header + baris) tanpa mengosongkannya dulu."""
+    lebar_lama = len(sheet.row_values(1))
+    lebar_baru = len(values[0]) if values else 0
+    sheet.update(values)
+    sisa = [f"A{len(values) + 1}:{sel_a1('', max(lebar_lama, lebar_baru, 1))}"]
+    if lebar_lama > lebar_baru and values:
+        sisa.append(f"{sel_a1(1, lebar_baru + 1)}:{sel_a1(len(values), lebar_lama)}")
+    sheet.batch_clear(sisa)
+
+
+class Jurnal:
+    def __init__(self, nama):
+        self.folder = os.path.join(FOLDER, nama)
+        self.lock = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _entri(self):
+        """(path, judul worksheet) semua entri, urut dari yang paling lama."""
+        hasil = []
+        for nama in sorted(os.listdir(self.folder)):
+            if not nama.endswith(".json"):
+                continue
+            path = os.path.join(self.folder, nama)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    hasil.append((path, json.load(f)["judul"]))
+            except (OSError, ValueError, KeyError):
+                continue  # file setengah jadi tidak pernah di-rename, jadi tidak mungkin di sini
+        return hasil
+
+    def _catat(self, judul, values):
+        # nama file diawali waktu (ns) supaya urutan listdir = urutan tulis
+        path = os.path.join(self.folder, f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"judul": judul, "values": values}, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return path
+
+    def _selesai(self, judul, sampai):
+        # entri worksheet yang sama sampai `sampai` sudah tergantikan oleh tulis ini
+        for path, j in self._entri():
+            if j == judul and path <= sampai:
+                os.remove(path)
+
+    def tulis(self, sheet, values, kirim=tulis_ulang):
+        """Catat ke jurnal, kirim(sheet, values), lalu hapus entri. Kalau gagal, error diteruskan dan entri tetap ada.
+
+        kirim boleh hanya mengirim sebagian (mis. selisih.terapkan); pemulihan
+        selalu menulis ulang seluruh isi dari jurnal. Kalau worksheet ini masih
+        punya entri tertunda, isinya ditulis ulang penuh supaya perubahan yang
+        tertunda itu ikut terkirim.
+        """
+        with self.lock:
+            if any(j == sheet.title for _, j in self._entri()):
+                kirim = tulis_ulang
+            path = self._catat(sheet.title, values)
+            hasil = kirim(sheet, values)
+            self._selesai(sheet.title, path)
+            return hasil
+
+    def tertunda(self):
+        with self.lock:
+            return [j for _, j in self._entri()]
+
+    def pulihkan(self, spreadsheet):
+        """Kirim ulang entri yang tertinggal (terbaru per worksheet). Mengembalikan judul worksheet yang dipulihkan."""
+        with self.lock:
+            terbaru = {}
+            for path, judul in self._entri():
+                terbaru[judul] = path
+            for judul, path in terbaru.items():
+                with open(path, encoding="utf-8") as f:
+                    values = json.load(f)["values"]
+                tulis_ulang(spreadsheet.worksheet(judul), values)
+                self._selesai(judul, path)
+            return list(terbaru)
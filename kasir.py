@@ -1,117 +1,170 @@
 import streamlit as st
-import pandas as pd
 import os
 from datetime import datetime
 
+import harga
+import memori
+import pos
+import prakiraan
+import stok_menipis
+import struk
+import transaksi
+from inventaris import Inventaris, StokTidakCukup
+from log_transaksi import LogTransaksi
+
 # ==================== INISIALISASI ====================
-if "produk" not in st.session_state:
-    st.session_state.produk = pd.DataFrame(
-        columns=["SKU", "Nama", "Owner", "Harga Reseller", "Harga Ritel", "Stok", "Foto"]
-    )
+# Katalog & stok dipakai bersama semua kasir di server ini
+@st.cache_resource
+def get_inventaris():
+    return Inventaris([], "SKU", "Stok")
+
+inventaris = get_inventaris()
+
+# keranjang sesi ini (lihat pos.py)
+keranjang = pos.keranjang("SKU", "Qty", "Harga")
+
+# Histori transaksi disimpan di log append-only (tidak hilang saat refresh)
+@st.cache_resource
+def get_log():
+    return LogTransaksi("kasir")
+
+log = get_log()
 
-if "keranjang" not in st.session_state:
-    st.session_state.keranjang = []
+# stok menipis & kecepatan jual, diperbarui tiap checkout / edit (lihat stok_menipis.py)
+@st.cache_resource
+def get_stok_menipis():
+    monitor = stok_menipis.StokMenipis(inventaris, "kasir", ["SKU", "Nama"])
+    monitor.muat_penjualan(get_log().baris(), "Waktu", "Qty")
+    return monitor
 
-if "histori" not in st.session_state:
-    st.session_state.histori = []
+monitor = get_stok_menipis()
+
+# harga jual per daftar harga (Retail / Reseller), grosir & promo (lihat harga.py);
+# "Harga" di keranjang & log = harga yang dibayar
+@st.cache_resource
+def get_harga():
+    return harga.Mesin(inventaris, "kasir", {"Retail": "Harga Ritel", "Reseller": "Harga Reseller"})
+
+harga_jual = get_harga()
 
 # Folder foto produk
 if not os.path.exists("produk_foto"):
     os.makedirs("produk_foto")
 
 # ==================== FUNGSI ====================
-def tambah_ke_keranjang(produk_row):
-    # jika produk sudah ada di keranjang, tambah qty
-    for item in st.session_state.keranjang:
-        if item["SKU"] == produk_row["SKU"]:
-            item["Qty"] += 1
-            return
-    # jika belum ada, masukkan baru
-    st.session_state.keranjang.append({
+def item_keranjang(produk_row):
+    return {
         "SKU": produk_row["SKU"],
         "Nama": produk_row["Nama"],
         "Harga": produk_row["Harga Ritel"],
-        "Qty": 1
-    })
+    }
+
+def tambah_ke_keranjang(produk_row):
+    # qty tidak boleh melebihi stok yang tersedia
+    if keranjang.qty(produk_row["SKU"]) < inventaris.tersedia(produk_row["SKU"]):
+        keranjang.tambah(item_keranjang(produk_row), 1)
 
 def checkout():
-    total = sum([item["Harga"] * item["Qty"] for item in st.session_state.keranjang])
-    transaksi = {
+    if not keranjang:
+        st.warning("Keranjang kosong")
+        return
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+    total = keranjang.total()
+    trx = {
+        "id": struk.id_transaksi(),
         "Waktu": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Item": st.session_state.keranjang.copy(),
-        "Total": total
+        "Total": total,
+        "items": list(keranjang)
+    }
+    # stok di-reserve, log ditulis, baru stok di-commit (lihat transaksi.py)
+    try:
+        transaksi.checkout(inventaris, [(item["SKU"], item["Qty"]) for item in trx["items"]], lambda: log.catat(trx))
+    except StokTidakCukup as e:
+        st.error(f"Stok tidak mencukupi untuk SKU {e}")
+        return
+    st.session_state.struk_terakhir = {
+        "id": trx["id"],
+        "waktu": trx["Waktu"],
+        "items": [{"nama": i["Nama"], "qty": i["Qty"], "harga": i["Harga"]} for i in trx["items"]],
+        "total": total,
     }
-    st.session_state.histori.append(transaksi)
-
-    # Kurangi stok
-    for item in st.session_state.keranjang:
-        idx = st.session_state.produk.index[st.session_state.produk["SKU"] == item["SKU"]].tolist()
-        if idx:
-            idx = idx[0]
-            st.session_state.produk.at[idx, "Stok"] -= item["Qty"]
 
-    st.session_state.keranjang = []
-    st.success("Checkout berhasil! Stok sudah diperbarui.")
+    keranjang.kosongkan()
+    pos.selesai("Checkout berhasil! Stok sudah diperbarui.")
+
+# ==================== FRAGMENT KASIR ====================
+# Katalog, keranjang & checkout dirender sebagai fragment terpisah:
+# hapus item di keranjang hanya merender ulang keranjang, bukan katalog.
+@pos.fragment
+def tampil_katalog():
+    st.subheader("Pilih Produk")
+    if not inventaris.produk:
+        st.info("Belum ada produk. Tambahkan di menu 'Daftar Produk'.")
+        return
+    for idx, row in enumerate(inventaris.daftar()):
+        colp = st.columns([1, 2])
+        with colp[0]:
+            if row["Foto"] and os.path.exists(row["Foto"]):
+                st.image(row["Foto"], width=120)
+            else:
+                st.image("https://via.placeholder.com/120", width=120)
+
+            if inventaris.tersedia(row["SKU"]) > 0:
+                if st.button(f"Tambah {row['Nama']}", key=f"add_{idx}"):
+                    tambah_ke_keranjang(row)
+                    pos.rerun_app()
+                if monitor.rendah(row["SKU"]):
+                    st.warning(f"Stok menipis (batas {monitor.batas(row['SKU'])})")
+            else:
+                st.error("Stok Habis")
+
+        with colp[1]:
+            st.write(f"**{row['Nama']}**")
+            st.write(f"SKU: {row['SKU']}")
+            st.write(f"Harga: Rp{row['Harga Ritel']:,}")
+            st.write(f"Stok: {row['Stok']}")
+
+        st.markdown("---")
+
+@pos.fragment
+def tampil_keranjang():
+    st.subheader("Keranjang")
+    if not keranjang:
+        st.info("Keranjang kosong")
+        return
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+    pos.editor_keranjang(keranjang, ["SKU", "Nama", "Harga", "Qty"])
+    st.write(f"**Total: Rp{keranjang.total():,}**")
+
+@pos.fragment
+def tampil_checkout():
+    if st.button("✅ Checkout"):
+        checkout()
 
 # ==================== SIDEBAR ====================
-menu = st.sidebar.radio("📌 Menu", ["Kasir", "Daftar Produk", "Histori Transaksi"])
+menu = st.sidebar.radio("📌 Menu", ["Kasir", "Daftar Produk", "Aturan Harga", "Histori Transaksi", "Stok Menipis", "Prakiraan"])
+stok_menipis.peringatan(monitor)
 
 # ==================== HALAMAN KASIR ====================
 if menu == "Kasir":
     st.title("🛒 Kasir")
+    pos.tampilkan_pesan()
+    harga.pilih_daftar(harga_jual)
+    pos.input_cepat(keranjang, inventaris.daftar(), "SKU", item_keranjang, inventaris.tersedia)
 
     col1, col2 = st.columns([2, 1])
 
     # ----- Daftar Produk -----
     with col1:
-        st.subheader("Pilih Produk")
-        if st.session_state.produk.empty:
-            st.info("Belum ada produk. Tambahkan di menu 'Daftar Produk'.")
-        else:
-            for idx, row in st.session_state.produk.iterrows():
-                colp = st.columns([1, 2])
-                with colp[0]:
-                    if row["Foto"] and os.path.exists(row["Foto"]):
-                        st.image(row["Foto"], width=120)
-                    else:
-                        st.image("https://via.placeholder.com/120", width=120)
-
-                    if row["Stok"] > 0:
-                        if st.button(f"Tambah {row['Nama']}", key=f"add_{idx}"):
-                            tambah_ke_keranjang(row)
-                    else:
-                        st.error("Stok Habis")
-
-                with colp[1]:
-                    st.write(f"**{row['Nama']}**")
-                    st.write(f"SKU: {row['SKU']}")
-                    st.write(f"Harga: Rp{row['Harga Ritel']:,}")
-                    st.write(f"Stok: {row['Stok']}")
-
-                st.markdown("---")
+        tampil_katalog()
 
     # ----- Keranjang -----
     with col2:
-        st.subheader("Keranjang")
-        if st.session_state.keranjang:
-            total = 0
-            for i, item in enumerate(st.session_state.keranjang):
-                colk = st.columns([3,1,1])
-                with colk[0]:
-                    st.write(f"{item['Nama']} (x{item['Qty']})")
-                with colk[1]:
-                    st.write(f"Rp{item['Harga']*item['Qty']:,}")
-                with colk[2]:
-                    if st.button("❌", key=f"hapus_{i}"):
-                        st.session_state.keranjang.pop(i)
-                        st.rerun()
-                total += item["Harga"] * item["Qty"]
-
-            st.write(f"**Total: Rp{total:,}**")
-            if st.button("✅ Checkout"):
-                checkout()
-        else:
-            st.info("Keranjang kosong")
+        tampil_keranjang()
+        tampil_checkout()
+
+        if "struk_terakhir" in st.session_state:
+            struk.tampilkan(st.session_state.struk_terakhir, struk.template("Kasir"))
 
 # ==================== HALAMAN PRODUK ====================
 elif menu == "Daftar Produk":
@@ -148,18 +201,14 @@ elif menu == "Daftar Produk":
                     "Stok": stok,
                     "Foto": foto_path
                 }
-                st.session_state.produk = pd.concat(
-                    [st.session_state.produk, pd.DataFrame([new_row])],
-                    ignore_index=True
-                )
+                inventaris.tambah(new_row)
                 st.success("Produk berhasil ditambahkan!")
 
     # ---- Edit Produk ----
     with tab2:
-        if not st.session_state.produk.empty:
-            pilih_sku = st.selectbox("Pilih SKU", st.session_state.produk["SKU"])
-            idx = st.session_state.produk.index[st.session_state.produk["SKU"] == pilih_sku][0]
-            data_produk = st.session_state.produk.loc[idx]
+        if inventaris.produk:
+            pilih_sku = st.selectbox("Pilih SKU", [p["SKU"] for p in inventaris.daftar()])
+            data_produk = inventaris.cari(pilih_sku)
 
             with st.form("form_edit"):
                 sku_edit = st.text_input("SKU", value=data_produk["SKU"])
@@ -179,40 +228,59 @@ elif menu == "Daftar Produk":
                         with open(foto_path, "wb") as f:
                             f.write(foto_edit.getbuffer())
 
-                    st.session_state.produk.at[idx, "SKU"] = sku_edit
-                    st.session_state.produk.at[idx, "Nama"] = nama_edit
-                    st.session_state.produk.at[idx, "Owner"] = owner_edit
-                    st.session_state.produk.at[idx, "Harga Reseller"] = harga_reseller_edit
-                    st.session_state.produk.at[idx, "Harga Ritel"] = harga_ritel_edit
-                    st.session_state.produk.at[idx, "Stok"] = stok_edit
-                    st.session_state.produk.at[idx, "Foto"] = foto_path
+                    inventaris.ubah(pilih_sku, {
+                        "SKU": sku_edit,
+                        "Nama": nama_edit,
+                        "Owner": owner_edit,
+                        "Harga Reseller": harga_reseller_edit,
+                        "Harga Ritel": harga_ritel_edit,
+                        "Stok": stok_edit,
+                        "Foto": foto_path
+                    })
 
                     st.success("Produk berhasil diperbarui!")
 
     st.subheader("📋 List Produk")
-    if st.session_state.produk.empty:
+    if not inventaris.produk:
         st.info("Belum ada produk")
     else:
-        for i, row in st.session_state.produk.iterrows():
+        for i, row in enumerate(inventaris.daftar()):
             colp = st.columns([4,1])
             with colp[0]:
                 st.write(f"**{row['Nama']}** | SKU: {row['SKU']} | Harga: Rp{row['Harga Ritel']:,} | Stok: {row['Stok']}")
             with colp[1]:
                 if st.button("❌ Hapus", key=f"hapus_produk_{i}"):
-                    st.session_state.produk.drop(i, inplace=True)
-                    st.session_state.produk.reset_index(drop=True, inplace=True)
+                    inventaris.hapus(row["SKU"])
                     st.rerun()
 
+# ==================== HALAMAN ATURAN HARGA ====================
+elif menu == "Aturan Harga":
+    harga.halaman(harga_jual)
+
 # ==================== HALAMAN HISTORI ====================
 elif menu == "Histori Transaksi":
     st.title("🧾 Histori Transaksi")
 
-    if st.session_state.histori:
-        for trx in st.session_state.histori:
-            st.write(f"📅 {trx['Waktu']}")
-            for item in trx["Item"]:
+    df = log.baris()
+    if not df.empty:
+        for _, trx in df.groupby("id", sort=False):
+            st.write(f"📅 {trx['Waktu'].iloc[0]} | No: {trx['id'].iloc[0]}")
+            for _, item in trx.iterrows():
                 st.write(f"- {item['Nama']} x{item['Qty']} = Rp{item['Harga']*item['Qty']:,}")
-            st.write(f"**Total: Rp{trx['Total']:,}**")
+            st.write(f"**Total: Rp{trx['Total'].iloc[0]:,}**")
             st.markdown("---")
+
+        struk.cetak_ulang(df, struk.template("Kasir"), kolom_waktu="Waktu", kolom_nama="Nama",
+                          kolom_qty="Qty", kolom_harga="Harga", kolom_id="id")
     else:
         st.info("Belum ada transaksi")
+
+# ==================== HALAMAN STOK MENIPIS ====================
+elif menu == "Stok Menipis":
+    stok_menipis.halaman(monitor)
+
+# ==================== HALAMAN PRAKIRAAN ====================
+elif menu == "Prakiraan":
+    prakiraan.halaman(log.baris, "kasir", "Waktu", "SKU", "Qty", inventaris.stok)
+
+memori.tampilkan()
@@ -1,16 +1,33 @@
-import streamlit as st
-import pandas as pd
-import base64
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import matplotlib.pyplot as plt
+import profil
+
+profil.mulai()
+
+with profil.ukur("import modul app"):
+    import streamlit as st
+    import pandas as pd
+    import base64
+    from datetime import datetime
+
+    import arsip
+    import ekspor
+    import grafik
+    import harga
+    import memori
+    import pos
+    import prakiraan
+    import stok_menipis
+    import struk
+    import transaksi
+    from inventaris import Inventaris, StokTidakCukup
+    from log_transaksi import LogTransaksi
 
 st.set_page_config(page_title="Kasir App", layout="wide")
 
 # ----------------- SESSION STATE -----------------
-if "products" not in st.session_state:
-    st.session_state.products = [
+# katalog & stok dipakai bersama semua sesi di server ini
+@st.cache_resource
+def get_inventaris():
+    return Inventaris([
         {
             "sku": "SKU001",
             "name": "Produk A",
@@ -29,143 +46,179 @@ if "products" not in st.session_state:
             "stock": 5,
             "image": None,
         },
-    ]
+    ], "sku", "stock")
+
+inventaris = get_inventaris()
+
+# keranjang sesi ini (lihat pos.py)
+keranjang = pos.keranjang("sku", "qty", "price")
+
+# histori transaksi tersimpan di log append-only (tidak hilang saat refresh)
+@st.cache_resource
+def get_log():
+    return LogTransaksi("kasirpdf")
+
+@st.cache_resource
+def get_arsip():
+    return arsip.Arsip("kasirpdf", "waktu")
+
+# ekspor laporan dibuat di latar (lihat ekspor.py), bukan di dalam rerun halaman
+@st.cache_resource
+def get_ekspor():
+    arsip_penjualan, log_penjualan = get_arsip(), get_log()
+    return ekspor.Antrian("kasirpdf", lambda dari, sampai, owner: ringkas_sku(
+        arsip_penjualan.gabung(log_penjualan.baris(), ["waktu", "sku", "name", "qty", "subtotal"], dari, sampai)))
+
+log = get_log()
 
-if "cart" not in st.session_state:
-    st.session_state.cart = []
+# stok menipis & kecepatan jual, diperbarui tiap checkout / edit (lihat stok_menipis.py)
+@st.cache_resource
+def get_stok_menipis():
+    monitor = stok_menipis.StokMenipis(inventaris, "kasirpdf", ["sku", "name"])
+    monitor.muat_penjualan(get_log().baris(), "waktu", "qty")
+    return monitor
 
-if "history" not in st.session_state:
-    st.session_state.history = []  # transaksi tersimpan di sini
+monitor = get_stok_menipis()
+
+# harga jual per daftar harga (Retail / Reseller), grosir & promo (lihat harga.py);
+# "price" di keranjang & log = harga yang dibayar
+@st.cache_resource
+def get_harga():
+    return harga.Mesin(inventaris, "kasirpdf", {"Retail": "retail_price", "Reseller": "reseller_price"})
+
+harga_jual = get_harga()
 
 # ----------------- SIDEBAR -----------------
-menu = st.sidebar.radio("📌 Menu", ["Kasir", "Daftar Produk", "Tambah Produk", "Edit Produk", "Laporan Penjualan"])
+menu = st.sidebar.radio("📌 Menu", ["Kasir", "Daftar Produk", "Tambah Produk", "Edit Produk", "Aturan Harga", "Laporan Penjualan", "Stok Menipis", "Prakiraan"])
+stok_menipis.peringatan(monitor)
 
 # ----------------- FUNGSI -----------------
+def item_keranjang(product):
+    return {
+        "sku": product["sku"],
+        "name": product["name"],
+        "price": product["retail_price"],
+    }
+
 def add_to_cart(product, qty):
-    if product["stock"] >= qty:
-        found = False
-        for item in st.session_state.cart:
-            if item["sku"] == product["sku"]:
-                item["qty"] += qty
-                found = True
-                break
-        if not found:
-            st.session_state.cart.append({
-                "sku": product["sku"],
-                "name": product["name"],
-                "price": product["retail_price"],
-                "qty": qty
-            })
-        st.success(f"{product['name']} ditambahkan ke keranjang")
-    else:
-        st.error("Stok tidak mencukupi!")
+    if inventaris.tersedia(product["sku"]) >= keranjang.qty(product["sku"]) + qty:
+        keranjang.tambah(item_keranjang(product), qty)
+        return True
+    st.error("Stok tidak mencukupi!")
+    return False
 
 def checkout():
-    if len(st.session_state.cart) == 0:
+    if not keranjang:
         st.warning("Keranjang kosong!")
         return
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
     total = 0
-    transaksi = []
-    for item in st.session_state.cart:
+    rincian = []
+    waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for item in keranjang:
         subtotal = item["price"] * item["qty"]
         total += subtotal
-        transaksi.append({
+        rincian.append({
             "sku": item["sku"],
             "name": item["name"],
             "qty": item["qty"],
             "price": item["price"],
             "subtotal": subtotal
         })
-        # kurangi stok
-        for p in st.session_state.products:
-            if p["sku"] == item["sku"]:
-                p["stock"] -= item["qty"]
-    st.session_state.history.append(transaksi)
-    st.session_state.cart = []
-    st.success(f"Checkout berhasil! Total: Rp{total:,}")
-
-def export_excel(df):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Laporan Penjualan")
-    return output.getvalue()
-
-def export_pdf(df):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(200, height - 50, "Laporan Penjualan")
-
-    c.setFont("Helvetica", 10)
-    y = height - 100
-    for idx, row in df.iterrows():
-        text = f"{row['sku']} - {row['nama']} | Qty: {row['total_qty']} | Total: Rp{row['total_penjualan']:,}"
-        c.drawString(50, y, text)
-        y -= 20
-        if y < 50:
-            c.showPage()
-            y = height - 50
-    c.save()
-    return buffer.getvalue()
+    # stok di-reserve (atomik untuk seluruh keranjang), log ditulis, baru stok di-commit
+    try:
+        id_trx = transaksi.checkout(
+            inventaris, [(t["sku"], t["qty"]) for t in rincian],
+            lambda: log.catat({"id": struk.id_transaksi(), "waktu": waktu, "items": rincian}),
+        )
+    except StokTidakCukup as e:
+        st.error(f"Stok tidak mencukupi untuk {e}")
+        return
+    st.session_state.struk_terakhir = {
+        "id": id_trx,
+        "waktu": waktu,
+        "items": [{"nama": t["name"], "qty": t["qty"], "harga": t["price"]} for t in rincian],
+        "total": total,
+    }
+    keranjang.kosongkan()
+    pos.selesai(f"Checkout berhasil! Total: Rp{total:,}")
+
+def ringkas_sku(df):
+    return df.groupby("sku").agg(
+        nama=("name", "first"),
+        total_qty=("qty", "sum"),
+        total_penjualan=("subtotal", "sum")
+    ).reset_index()
+
+# ----------------- FRAGMENT KASIR -----------------
+# Katalog, keranjang & pembayaran dirender sebagai fragment terpisah:
+# hapus item di keranjang hanya merender ulang keranjang, bukan katalog.
+@pos.fragment
+def tampil_katalog():
+    st.subheader("Pilih Produk")
+    for product in inventaris.daftar():
+        with st.container():
+            col1, col2 = st.columns([1, 2])  # gambar kiri, detail kanan
+            with col1:
+                if product["image"]:
+                    st.image(product["image"], width=120)
+                else:
+                    st.write("No Image")
+
+            with col2:
+                st.write(f"**{product['name']}**")
+                st.write(f"SKU: {product['sku']}")
+                st.write(f"Harga: Rp{product['retail_price']:,}")
+                st.write(f"Stok: {product['stock']}")
+                qty = st.number_input(
+                    f"Qty {product['sku']}",
+                    min_value=1,
+                    max_value=max(inventaris.tersedia(product["sku"]), 1),
+                    value=1,
+                    key=f"qty_{product['sku']}"
+                )
+                if st.button(f"Tambah ke Keranjang ({product['sku']})", key=f"btn_{product['sku']}"):
+                    if add_to_cart(product, qty):
+                        pos.selesai(f"{product['name']} ditambahkan ke keranjang")
+        st.markdown("---")
+
+@pos.fragment
+def tampil_keranjang():
+    st.subheader("Keranjang")
+    if not keranjang:
+        st.info("Keranjang kosong")
+        return
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+    pos.editor_keranjang(keranjang, ["sku", "name", "price", "qty"])
+    st.write(f"### Total: Rp{keranjang.total():,}")
+
+@pos.fragment
+def tampil_pembayaran():
+    if st.button("Checkout"):
+        checkout()
 
-# ----------------- MENU KASIR -----------------
 # ----------------- MENU KASIR -----------------
 if menu == "Kasir":
     st.title("🛒 Kasir")
-
+    pos.tampilkan_pesan()
+    harga.pilih_daftar(harga_jual)
+    pos.input_cepat(keranjang, inventaris.daftar(), "sku", item_keranjang, inventaris.tersedia)
     col_left, col_right = st.columns([3, 2])
 
     with col_left:
-        st.subheader("Pilih Produk")
-        for product in st.session_state.products:
-            with st.container():
-                col1, col2 = st.columns([1, 2])  # gambar kiri, detail kanan
-                with col1:
-                    if product["image"]:
-                        st.image(product["image"], width=120)
-                    else:
-                        st.write("No Image")
-
-                with col2:
-                    st.write(f"**{product['name']}**")
-                    st.write(f"SKU: {product['sku']}")
-                    st.write(f"Harga: Rp{product['retail_price']:,}")
-                    st.write(f"Stok: {product['stock']}")
-                    qty = st.number_input(
-                        f"Qty {product['sku']}",
-                        min_value=1,
-                        max_value=product["stock"],
-                        value=1,
-                        key=f"qty_{product['sku']}"
-                    )
-                    if st.button(f"Tambah ke Keranjang ({product['sku']})", key=f"btn_{product['sku']}"):
-                        add_to_cart(product, qty)
-            st.markdown("---")
+        tampil_katalog()
 
     with col_right:
-        st.subheader("Keranjang")
-        if len(st.session_state.cart) == 0:
-            st.info("Keranjang kosong")
-        else:
-            total = 0
-            for item in st.session_state.cart:
-                subtotal = item["price"] * item["qty"]
-                total += subtotal
-                st.write(f"{item['name']} x{item['qty']} - Rp{subtotal:,}")
-                if st.button(f"Hapus {item['sku']}", key=f"del_{item['sku']}"):
-                    st.session_state.cart.remove(item)
-                    st.rerun()
-            st.write(f"### Total: Rp{total:,}")
-            if st.button("Checkout"):
-                checkout()
-                st.rerun()
+        tampil_keranjang()
+        tampil_pembayaran()
+
+        if "struk_terakhir" in st.session_state:
+            struk.tampilkan(st.session_state.struk_terakhir, struk.template("Kasir App"))
 
 # ----------------- MENU DAFTAR PRODUK -----------------
 elif menu == "Daftar Produk":
     st.title("📦 Daftar Produk")
-    df = pd.DataFrame(st.session_state.products)
+    df = pd.DataFrame(inventaris.daftar())
     st.dataframe(df[["sku", "name", "owner", "reseller_price", "retail_price", "stock"]])
 
 # ----------------- MENU TAMBAH PRODUK -----------------
@@ -185,7 +238,7 @@ elif menu == "Tambah Produk":
             image_data = None
             if image_file:
                 image_data = image_file.read()
-            st.session_state.products.append({
+            inventaris.tambah({
                 "sku": sku,
                 "name": name,
                 "owner": owner,
@@ -199,9 +252,9 @@ elif menu == "Tambah Produk":
 # ----------------- MENU EDIT PRODUK -----------------
 elif menu == "Edit Produk":
     st.title("✏️ Edit Produk")
-    sku_list = [p["sku"] for p in st.session_state.products]
+    sku_list = [p["sku"] for p in inventaris.daftar()]
     selected_sku = st.selectbox("Pilih SKU", sku_list)
-    product = next((p for p in st.session_state.products if p["sku"] == selected_sku), None)
+    product = inventaris.cari(selected_sku)
 
     if product:
         with st.form("edit_product"):
@@ -214,57 +267,83 @@ elif menu == "Edit Produk":
             submit = st.form_submit_button("Update")
 
             if submit:
-                product["name"] = name
-                product["owner"] = owner
-                product["reseller_price"] = reseller_price
-                product["retail_price"] = retail_price
-                product["stock"] = stock
+                data = {
+                    "name": name,
+                    "owner": owner,
+                    "reseller_price": reseller_price,
+                    "retail_price": retail_price,
+                    "stock": stock,
+                }
                 if image_file:
-                    product["image"] = image_file.read()
+                    data["image"] = image_file.read()
+                inventaris.ubah(selected_sku, data)
                 st.success("Produk berhasil diupdate!")
 
+# ----------------- MENU ATURAN HARGA -----------------
+elif menu == "Aturan Harga":
+    harga.halaman(harga_jual)
+
 # ----------------- MENU LAPORAN PENJUALAN -----------------
 elif menu == "Laporan Penjualan":
     st.title("📊 Laporan Penjualan")
-    if len(st.session_state.history) == 0:
+    df = log.baris()
+
+    # bulan yang sudah tutup dibaca dari arsip Parquet (hanya kolom yang dipakai laporan)
+    arsip_penjualan = get_arsip()
+    arsip_penjualan.arsipkan(df)
+    bulan = arsip_penjualan.daftar_bulan(df)
+    if bulan:
+        col1, col2 = st.columns(2)
+        dari = col1.selectbox("Dari Bulan", bulan, index=0)
+        sampai = col2.selectbox("Sampai Bulan", bulan, index=len(bulan) - 1)
+        df = arsip_penjualan.gabung(df, ["waktu", "sku", "name", "qty", "subtotal", "id", "price"], dari, sampai)
+    if df.empty:
         st.info("Belum ada transaksi.")
     else:
-        all_data = []
-        for transaksi in st.session_state.history:
-            for item in transaksi:
-                all_data.append(item)
-        df = pd.DataFrame(all_data)
-        laporan = df.groupby("sku").agg(
-            nama=("name", "first"),
-            total_qty=("qty", "sum"),
-            total_penjualan=("subtotal", "sum")
-        ).reset_index()
+        laporan = ringkas_sku(df)
         st.dataframe(laporan)
 
         # Grafik penjualan
         st.subheader("📈 Grafik Penjualan per Produk")
-        fig, ax = plt.subplots()
-        ax.bar(laporan["sku"], laporan["total_qty"])
-        ax.set_xlabel("SKU")
-        ax.set_ylabel("Total Terjual")
-        ax.set_title("Grafik Penjualan")
-        st.pyplot(fig)
+        jenis_grafik = st.radio("Jenis Grafik", ["Per SKU", "Per Hari"], horizontal=True)
+        if jenis_grafik == "Per Hari":
+            tanggal, nilai = grafik.seri_harian(df, "waktu", "subtotal")
+            if tanggal:
+                grafik.grafik_waktu(tanggal, nilai, "Grafik Penjualan Harian", "Total Penjualan (Rp)")
+            else:
+                st.info("Belum ada transaksi dengan data waktu.")
+        else:
+            top_n = st.number_input("Tampilkan Top-N", min_value=1, max_value=max(len(laporan), 1), value=min(10, len(laporan)))
+            grafik.grafik_batang(
+                tuple(laporan["sku"].astype(str)), tuple(laporan["total_qty"].tolist()),
+                "Grafik Penjualan", "SKU", "Total Terjual", top_n=int(top_n)
+            )
 
         # Export
-        col1, col2 = st.columns(2)
-        with col1:
-            excel_data = export_excel(laporan)
-            st.download_button("⬇️ Download Excel", data=excel_data, file_name="laporan_penjualan.xlsx")
-        with col2:
-            pdf_data = export_pdf(laporan)
-            st.download_button("⬇️ Download PDF", data=pdf_data, file_name="laporan_penjualan.pdf")
+        ekspor.halaman(get_ekspor(), bulan)
+
+        struk.cetak_ulang(df, struk.template("Kasir App"), kolom_waktu="waktu", kolom_nama="name",
+                          kolom_qty="qty", kolom_harga="price", kolom_id="id")
 
         # Hapus histori dengan password
         with st.expander("⚠️ Hapus Histori"):
             pwd = st.text_input("Masukkan Password", type="password")
             if st.button("Hapus Histori"):
                 if pwd == "Sellacyute":
-                    st.session_state.history = []
+                    log.hapus()
+                    get_arsip().hapus()
                     st.success("Histori berhasil dihapus!")
                 else:
                     st.error("Password salah!")
+
+elif menu == "Stok Menipis":
+    stok_menipis.halaman(monitor)
+
+elif menu == "Prakiraan":
+    def penjualan_setahun():
+        return get_arsip().gabung(log.baris(), ["waktu", "sku", "qty"], dari=prakiraan.setahun_lalu())
+
+    prakiraan.halaman(penjualan_setahun, "kasirpdf", "waktu", "sku", "qty", inventaris.stok)
+
+memori.tampilkan()
+profil.tampilkan()
@@ -1,15 +1,35 @@
-import streamlit as st
-import pandas as pd
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import matplotlib.pyplot as plt
+import profil
+
+profil.mulai()
+
+with profil.ukur("import modul app"):
+    import streamlit as st
+    import pandas as pd
+    from datetime import datetime
+
+    import api
+    import arsip
+    import ekspor
+    import grafik
+    import harga
+    import laporan_paralel
+    import memori
+    import pemilik
+    import pos
+    import prakiraan
+    import stok_menipis
+    import struk
+    import transaksi
+    from inventaris import Inventaris, StokTidakCukup
+    from log_transaksi import LogTransaksi
 
 st.set_page_config(page_title="Kasir App", layout="wide")
 
 # ----------------- SESSION STATE -----------------
-if "products" not in st.session_state:
-    st.session_state.products = [
+# katalog & stok dipakai bersama semua sesi di server ini
+@st.cache_resource
+def get_inventaris():
+    return Inventaris([
         {
             "name": "Produk A",
             "owner": "Nizar",
@@ -28,45 +48,76 @@ if "products" not in st.session_state:
             "stock": 5,
             "image": None,
         },
-    ]
+    ], "name", "stock", "owner")
+
+inventaris = get_inventaris()
+
+# keranjang sesi ini (lihat pos.py)
+keranjang = pos.keranjang("name", "qty", "price")
+
+# histori transaksi tersimpan di log append-only (tidak hilang saat refresh)
+@st.cache_resource
+def get_log():
+    return LogTransaksi("kawanirev", kolom_owner="owner")
 
-if "cart" not in st.session_state:
-    st.session_state.cart = []
+@st.cache_resource
+def get_arsip():
+    return arsip.Arsip("kawanirev", "waktu", "owner")
 
-if "history" not in st.session_state:
-    st.session_state.history = []  # transaksi tersimpan di sini
+# ekspor laporan dibuat di latar (lihat ekspor.py), bukan di dalam rerun halaman
+@st.cache_resource
+def get_ekspor():
+    arsip_penjualan, log_penjualan = get_arsip(), get_log()
+    return ekspor.Antrian("kawanirev", lambda dari, sampai, owner: ringkas_owner(arsip_penjualan.gabung(
+        log_penjualan.baris(owner), ["waktu", "owner", "qty", "subtotal", "total_potongan"], dari, sampai, owner)))
+
+log = get_log()
+
+# stok menipis & kecepatan jual, diperbarui tiap checkout / edit (lihat stok_menipis.py)
+@st.cache_resource
+def get_stok_menipis():
+    monitor = stok_menipis.StokMenipis(inventaris, "kawanirev", ["name", "owner"])
+    monitor.muat_penjualan(get_log().baris(), "waktu", "qty")
+    return monitor
+
+monitor = get_stok_menipis()
+
+# harga jual per daftar harga (Retail / Reseller), grosir & promo (lihat harga.py);
+# "price" di keranjang & log = harga yang dibayar, potongan tetap bagian toko
+@st.cache_resource
+def get_harga():
+    return harga.Mesin(inventaris, "kawanirev", {"Retail": "retail_price", "Reseller": "reseller_price"})
+
+harga_jual = get_harga()
 
 # ----------------- FUNGSI -----------------
+def item_keranjang(product):
+    return {
+        "name": product["name"],
+        "owner": product["owner"],
+        "price": product["retail_price"],
+        "potongan": product["potongan"],
+    }
+
 def add_to_cart(product, qty):
-    if product["stock"] >= qty:
-        found = False
-        for item in st.session_state.cart:
-            if item["name"] == product["name"]:
-                item["qty"] += qty
-                found = True
-                break
-        if not found:
-            st.session_state.cart.append({
-                "name": product["name"],
-                "owner": product["owner"],
-                "price": product["retail_price"],
-                "potongan": product["potongan"],
-                "qty": qty
-            })
-        st.success(f"{product['name']} ditambahkan ke keranjang")
-    else:
-        st.error("Stok tidak mencukupi!")
+    if inventaris.tersedia(product["name"]) >= keranjang.qty(product["name"]) + qty:
+        keranjang.tambah(item_keranjang(product), qty)
+        return True
+    st.error("Stok tidak mencukupi!")
+    return False
 
-def checkout():
-    if len(st.session_state.cart) == 0:
-        st.warning("Keranjang kosong!")
-        return
+def proses_checkout(inventaris, log, isi):
+    """Inti checkout (dipakai halaman Kasir & api.py): catat transaksi lalu kurangi stok.
+
+    StokTidakCukup diteruskan ke pemanggil. Mengembalikan data struk.
+    """
     total = 0
-    transaksi = []
-    for item in st.session_state.cart:
+    rincian = []
+    waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for item in isi:
         subtotal = (item["price"] * item["qty"])
         total += subtotal
-        transaksi.append({
+        rincian.append({
             "name": item["name"],
             "owner": item["owner"],
             "qty": item["qty"],
@@ -75,113 +126,131 @@ def checkout():
             "subtotal": subtotal,
             "total_potongan": item["potongan"] * item["qty"]
         })
-        # kurangi stok
-        for p in st.session_state.products:
-            if p["name"] == item["name"]:
-                p["stock"] -= item["qty"]
-    st.session_state.history.append(transaksi)
-    st.session_state.cart = []
-    st.success(f"Checkout berhasil! Total: Rp{total:,}")
-
-def export_excel(df):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Laporan Penjualan")
-    return output.getvalue()
-
-def export_pdf(df):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(200, height - 50, "Laporan Penjualan per Owner")
-
-    c.setFont("Helvetica", 10)
-    y = height - 100
-    headers = ["Owner", "Qty", "Penjualan Kotor", "Potongan", "Penjualan Bersih"]
-    col_widths = [100, 60, 120, 100, 120]
-
-    # header tabel
-    x = 50
-    for i, h in enumerate(headers):
-        c.drawString(x, y, h)
-        x += col_widths[i]
-    y -= 20
-
-    # isi tabel
-    for _, row in df.iterrows():
-        x = 50
-        c.drawString(x, y, str(row["owner"])); x += col_widths[0]
-        c.drawString(x, y, str(row["total_qty"])); x += col_widths[1]
-        c.drawString(x, y, f"Rp{row['penjualan_kotor']:,}"); x += col_widths[2]
-        c.drawString(x, y, f"Rp{row['total_potongan']:,}"); x += col_widths[3]
-        c.drawString(x, y, f"Rp{row['penjualan_bersih']:,}")
-        y -= 20
-
-        if y < 50:
-            c.showPage()
-            y = height - 50
-    c.save()
-    return buffer.getvalue()
+    # stok di-reserve (atomik untuk seluruh keranjang), log ditulis, baru stok di-commit;
+    # kalau log gagal ditulis, reservasi dilepas dan stok tetap (lihat transaksi.py)
+    id_trx = transaksi.checkout(
+        inventaris, [(item["name"], item["qty"]) for item in isi],
+        lambda: log.catat({"id": struk.id_transaksi(), "waktu": waktu, "items": rincian}),
+    )
+    return {
+        "id": id_trx,
+        "waktu": waktu,
+        "items": [{"nama": t["name"], "qty": t["qty"], "harga": t["price"]} for t in rincian],
+        "total": total,
+    }
+
+def checkout():
+    if not keranjang:
+        st.warning("Keranjang kosong!")
+        return
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+    try:
+        st.session_state.struk_terakhir = proses_checkout(inventaris, log, list(keranjang))
+    except StokTidakCukup as e:
+        st.error(f"Stok tidak mencukupi untuk {e}")
+        return
+    keranjang.kosongkan()
+    pos.selesai(f"Checkout berhasil! Total: Rp{st.session_state.struk_terakhir['total']:,}")
+
+def ringkas_owner(df):
+    laporan = df.groupby("owner").agg(
+        total_qty=("qty", "sum"),
+        penjualan_kotor=("subtotal", "sum"),
+        total_potongan=("total_potongan", "sum")
+    ).reset_index()
+    laporan["penjualan_bersih"] = laporan["penjualan_kotor"] - laporan["total_potongan"]
+    return laporan
+
+# API JSON (lihat api.py) untuk scanner / front-end lain, aktif kalau KASIR_API_PORT diisi.
+# Memakai inventaris, log & proses_checkout yang sama dengan halaman Kasir.
+@st.cache_resource
+def get_api():
+    if not api.PORT:
+        return None
+    inventaris_api, log_api, arsip_api = get_inventaris(), get_log(), get_arsip()
+    toko = api.Toko(
+        inventaris_api, "qty", "price", item_keranjang,
+        lambda isi: proses_checkout(inventaris_api, log_api, isi),
+        lambda dari, sampai: arsip_api.gabung(log_api.baris(), None, dari and dari[:7], sampai and sampai[:7]),
+        kolom_waktu="waktu", laporan=ringkas_owner, mesin_harga=get_harga(),
+    )
+    return api.mulai(toko)
+
+get_api()
 
 # ----------------- SIDEBAR -----------------
-menu = st.sidebar.radio("📌 Menu", ["Kasir", "Daftar Produk", "Tambah Produk", "Edit Produk", "Laporan Penjualan"])
+menu = st.sidebar.radio("📌 Menu", ["Kasir", "Daftar Produk", "Tambah Produk", "Edit Produk", "Aturan Harga", "Laporan Penjualan", "Per Owner", "Stok Menipis", "Prakiraan"])
+stok_menipis.peringatan(monitor)
+
+# ----------------- FRAGMENT KASIR -----------------
+# Katalog, keranjang & pembayaran dirender sebagai fragment terpisah:
+# hapus item di keranjang hanya merender ulang keranjang, bukan katalog.
+@pos.fragment
+def tampil_katalog():
+    st.subheader("Pilih Produk")
+    for product in inventaris.daftar():
+        with st.container():
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                if product["image"]:
+                    st.image(product["image"], width=120)
+                else:
+                    st.write("No Image")
+
+            with col2:
+                st.write(f"**{product['name']}**")
+                st.write(f"Harga: Rp{product['retail_price']:,}")
+                st.write(f"Potongan: Rp{product['potongan']:,}")
+                st.write(f"Stok: {product['stock']}")
+                qty = st.number_input(
+                    f"Qty {product['name']}",
+                    min_value=1,
+                    max_value=max(inventaris.tersedia(product["name"]), 1),
+                    value=1,
+                    key=f"qty_{product['name']}"
+                )
+                if st.button(f"Tambah ke Keranjang ({product['name']})", key=f"btn_{product['name']}"):
+                    if add_to_cart(product, qty):
+                        pos.selesai(f"{product['name']} ditambahkan ke keranjang")
+        st.markdown("---")
+
+@pos.fragment
+def tampil_keranjang():
+    st.subheader("Keranjang")
+    if not keranjang:
+        st.info("Keranjang kosong")
+        return
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+    pos.editor_keranjang(keranjang, ["name", "owner", "price", "qty"])
+    st.write(f"### Total: Rp{keranjang.total():,}")
+
+@pos.fragment
+def tampil_pembayaran():
+    if st.button("Checkout"):
+        checkout()
 
 # ----------------- MENU KASIR -----------------
 if menu == "Kasir":
     st.title("🛒 Kasir")
+    pos.tampilkan_pesan()
+    harga.pilih_daftar(harga_jual)
+    pos.input_cepat(keranjang, inventaris.daftar(), "name", item_keranjang, inventaris.tersedia)
     col_left, col_right = st.columns([3, 2])
 
     with col_left:
-        st.subheader("Pilih Produk")
-        for product in st.session_state.products:
-            with st.container():
-                col1, col2 = st.columns([1, 2])
-                with col1:
-                    if product["image"]:
-                        st.image(product["image"], width=120)
-                    else:
-                        st.write("No Image")
-
-                with col2:
-                    st.write(f"**{product['name']}**")
-                    st.write(f"Harga: Rp{product['retail_price']:,}")
-                    st.write(f"Potongan: Rp{product['potongan']:,}")
-                    st.write(f"Stok: {product['stock']}")
-                    qty = st.number_input(
-                        f"Qty {product['name']}",
-                        min_value=1,
-                        max_value=product["stock"],
-                        value=1,
-                        key=f"qty_{product['name']}"
-                    )
-                    if st.button(f"Tambah ke Keranjang ({product['name']})", key=f"btn_{product['name']}"):
-                        add_to_cart(product, qty)
-            st.markdown("---")
+        tampil_katalog()
 
     with col_right:
-        st.subheader("Keranjang")
-        if len(st.session_state.cart) == 0:
-            st.info("Keranjang kosong")
-        else:
-            total = 0
-            for item in st.session_state.cart:
-                subtotal = item["price"] * item["qty"]
-                total += subtotal
-                st.write(f"{item['name']} x{item['qty']} - Rp{subtotal:,}")
-                if st.button(f"Hapus {item['name']}", key=f"del_{item['name']}"):
-                    st.session_state.cart.remove(item)
-                    st.rerun()
-            st.write(f"### Total: Rp{total:,}")
-            if st.button("Checkout"):
-                checkout()
-                st.rerun()
+        tampil_keranjang()
+        tampil_pembayaran()
+
+        if "struk_terakhir" in st.session_state:
+            struk.tampilkan(st.session_state.struk_terakhir, struk.template("Kasir Kawani"))
 
 # ----------------- MENU DAFTAR PRODUK -----------------
 elif menu == "Daftar Produk":
     st.title("📦 Daftar Produk")
-    df = pd.DataFrame(st.session_state.products)
+    df = pd.DataFrame(inventaris.daftar())
     st.dataframe(df[["name", "owner", "reseller_price", "retail_price", "potongan", "stock"]])
 
 # ----------------- MENU TAMBAH PRODUK -----------------
@@ -201,7 +270,7 @@ elif menu == "Tambah Produk":
             image_data = None
             if image_file:
                 image_data = image_file.read()
-            st.session_state.products.append({
+            inventaris.tambah({
                 "name": name,
                 "owner": owner,
                 "reseller_price": reseller_price,
@@ -215,9 +284,9 @@ elif menu == "Tambah Produk":
 # ----------------- MENU EDIT PRODUK -----------------
 elif menu == "Edit Produk":
     st.title("✏️ Edit Produk")
-    product_list = [p["name"] for p in st.session_state.products]
+    product_list = [p["name"] for p in inventaris.daftar()]
     selected_product = st.selectbox("Pilih Produk", product_list)
-    product = next((p for p in st.session_state.products if p["name"] == selected_product), None)
+    product = inventaris.cari(selected_product)
 
     if product:
         with st.form("edit_product"):
@@ -231,51 +300,84 @@ elif menu == "Edit Produk":
             submit = st.form_submit_button("Update")
 
             if submit:
-                product["name"] = name
-                product["owner"] = owner
-                product["reseller_price"] = reseller_price
-                product["retail_price"] = retail_price
-                product["potongan"] = potongan
-                product["stock"] = stock
+                data = {
+                    "name": name,
+                    "owner": owner,
+                    "reseller_price": reseller_price,
+                    "retail_price": retail_price,
+                    "potongan": potongan,
+                    "stock": stock,
+                }
                 if image_file:
-                    product["image"] = image_file.read()
+                    data["image"] = image_file.read()
+                inventaris.ubah(selected_product, data)
                 st.success("Produk berhasil diupdate!")
 
+# ----------------- MENU ATURAN HARGA -----------------
+elif menu == "Aturan Harga":
+    harga.halaman(harga_jual)
+
 # ----------------- MENU LAPORAN PENJUALAN -----------------
 elif menu == "Laporan Penjualan":
     st.title("📊 Laporan Penjualan")
-    if len(st.session_state.history) == 0:
+    df = log.baris()
+
+    # bulan yang sudah tutup dibaca dari arsip Parquet (hanya kolom yang dipakai laporan)
+    arsip_penjualan = get_arsip()
+    arsip_penjualan.arsipkan(df)
+    bulan = arsip_penjualan.daftar_bulan(df)
+    if bulan:
+        col1, col2 = st.columns(2)
+        dari = col1.selectbox("Dari Bulan", bulan, index=0)
+        sampai = col2.selectbox("Sampai Bulan", bulan, index=len(bulan) - 1)
+        owner = st.selectbox("Owner", ["Semua"] + sorted({str(p["owner"]) for p in inventaris.daftar()}))
+        df = arsip_penjualan.gabung(df, ["waktu", "owner", "qty", "subtotal", "total_potongan", "id", "name", "price"], dari, sampai,
+                                    owner=None if owner == "Semua" else owner)
+    if df.empty:
         st.info("Belum ada transaksi.")
     else:
-        all_data = []
-        for transaksi in st.session_state.history:
-            for item in transaksi:
-                all_data.append(item)
-        df = pd.DataFrame(all_data)
-
-        laporan = df.groupby("owner").agg(
-            total_qty=("qty", "sum"),
-            penjualan_kotor=("subtotal", "sum"),
-            total_potongan=("total_potongan", "sum")
-        ).reset_index()
-        laporan["penjualan_bersih"] = laporan["penjualan_kotor"] - laporan["total_potongan"]
+        laporan = ringkas_owner(df)
 
         st.dataframe(laporan)
 
         # Grafik penjualan
         st.subheader("📈 Grafik Penjualan per Owner")
-        fig, ax = plt.subplots()
-        ax.bar(laporan["owner"], laporan["total_qty"])
-        ax.set_xlabel("Owner")
-        ax.set_ylabel("Total Qty Terjual")
-        ax.set_title("Grafik Penjualan")
-        st.pyplot(fig)
+        jenis_grafik = st.radio("Jenis Grafik", ["Per Owner", "Per Hari"], horizontal=True)
+        if jenis_grafik == "Per Hari":
+            tanggal, nilai = grafik.seri_harian(df, "waktu", "subtotal")
+            if tanggal:
+                grafik.grafik_waktu(tanggal, nilai, "Grafik Penjualan Harian", "Total Penjualan (Rp)")
+            else:
+                st.info("Belum ada transaksi dengan data waktu.")
+        else:
+            top_n = st.number_input("Tampilkan Top-N", min_value=1, max_value=max(len(laporan), 1), value=min(10, len(laporan)))
+            grafik.grafik_batang(
+                tuple(laporan["owner"].astype(str)), tuple(laporan["total_qty"].tolist()),
+                "Grafik Penjualan", "Owner", "Total Qty Terjual", top_n=int(top_n)
+            )
 
         # Export
-        col1, col2 = st.columns(2)
-        with col1:
-            excel_data = export_excel(laporan)
-            st.download_button("⬇️ Download Excel", data=excel_data, file_name="laporan_penjualan.xlsx")
-        with col2:
-            pdf_data = export_pdf(laporan)
-            st.download_button("⬇️ Download PDF", data=pdf_data, file_name="laporan_penjualan.pdf")
+        ekspor.halaman(get_ekspor(), bulan, inventaris.owners())
+
+        struk.cetak_ulang(df, struk.template("Kasir Kawani"), kolom_waktu="waktu", kolom_nama="name",
+                          kolom_qty="qty", kolom_harga="price", kolom_id="id")
+
+    # rekap & statement akhir bulan semua owner dibangun di process pool (lihat laporan_paralel.py)
+    laporan_paralel.halaman(arsip_penjualan, log.baris(), inventaris.owners(), "name", "qty", "subtotal")
+
+# ----------------- PER OWNER -----------------
+elif menu == "Per Owner":
+    # arsip & log dibaca hanya untuk partisi owner yang dipilih
+    pemilik.halaman(inventaris, lambda owner: get_arsip().gabung(log.baris(owner), owner=owner), monitor, get_ekspor())
+
+elif menu == "Stok Menipis":
+    stok_menipis.halaman(monitor)
+
+elif menu == "Prakiraan":
+    def penjualan_setahun():
+        return get_arsip().gabung(log.baris(), ["waktu", "name", "qty"], dari=prakiraan.setahun_lalu())
+
+    prakiraan.halaman(penjualan_setahun, "kawanirev", "waktu", "name", "qty", inventaris.stok)
+
+memori.tampilkan()
+profil.tampilkan()
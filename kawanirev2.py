@@ -1,59 +1,107 @@
-import streamlit as st
-import pandas as pd
-from datetime import datetime
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+import profil
+
+profil.mulai()
+
+with profil.ukur("import modul app"):
+    import streamlit as st
+    import pandas as pd
+    from datetime import datetime
+    from io import BytesIO
+
+    import arsip
+    import ekspor
+    import harga
+    import laporan_paralel
+    import memori
+    import pemilik
+    import pos
+    import prakiraan
+    import stok_menipis
+    import struk
+    import transaksi
+    from inventaris import Inventaris, StokTidakCukup
+    from log_transaksi import LogTransaksi
 
 st.set_page_config(page_title="Kasir Kawani", layout="wide")
 
 # ----------------- SESSION STATE -----------------
-if "products" not in st.session_state:
+# katalog & stok dipakai bersama semua sesi di server ini
+@st.cache_resource
+def get_inventaris():
     # contoh produk awal
-    st.session_state.products = [
+    return Inventaris([
         {"Owner": "Bu.Ilah", "Nama Produk": "Kacang Bawang", "Harga Reseller": 18000, "Harga Retail": 20000, "Potongan": 2000, "Stock": 10},
         {"Owner": "Bu.Ilah", "Nama Produk": "Emping Melinjo", "Harga Reseller": 22000, "Harga Retail": 25000, "Potongan": 3000, "Stock": 5},
         {"Owner": "Pak.Budi", "Nama Produk": "Keripik Pisang", "Harga Reseller": 15000, "Harga Retail": 18000, "Potongan": 3000, "Stock": 8},
-    ]
+    ], ("Nama Produk", "Owner"), "Stock", "Owner")
 
-if "cart" not in st.session_state:
-    st.session_state.cart = []
+inventaris = get_inventaris()
 
-if "laporan" not in st.session_state:
-    st.session_state.laporan = []
+# keranjang sesi ini (lihat pos.py)
+keranjang = pos.keranjang(("Nama Produk", "Owner"), "Qty", "Harga Retail")
+
+# laporan penjualan disimpan di log append-only (tidak hilang saat refresh)
+@st.cache_resource
+def get_log():
+    return LogTransaksi("kawanirev2", kolom_owner="Owner")
+
+@st.cache_resource
+def get_arsip():
+    return arsip.Arsip("kawanirev2", "Timestamp", "Owner")
+
+# ekspor laporan dibuat di latar (lihat ekspor.py), bukan di dalam rerun halaman
+@st.cache_resource
+def get_ekspor():
+    arsip_penjualan, log_penjualan = get_arsip(), get_log()
+    return ekspor.Antrian("kawanirev2", lambda dari, sampai, owner: arsip_penjualan.gabung(
+        log_penjualan.baris(owner), dari=dari, sampai=sampai, owner=owner).drop(columns="id", errors="ignore"))
+
+log = get_log()
+
+# stok menipis & kecepatan jual, diperbarui tiap checkout / edit (lihat stok_menipis.py)
+@st.cache_resource
+def get_stok_menipis():
+    monitor = stok_menipis.StokMenipis(inventaris, "kawanirev2", ["Nama Produk", "Owner"])
+    monitor.muat_penjualan(get_log().baris(), "Timestamp", "Qty")
+    return monitor
+
+monitor = get_stok_menipis()
+
+# harga jual per daftar harga (Retail / Reseller), grosir & promo (lihat harga.py);
+# "Harga Retail" di keranjang & log = harga yang dibayar, Potongan tetap bagian toko
+@st.cache_resource
+def get_harga():
+    return harga.Mesin(inventaris, "kawanirev2", {"Retail": "Harga Retail", "Reseller": "Harga Reseller"})
+
+harga_jual = get_harga()
 
 
 # ----------------- FUNGSI -----------------
-def add_to_cart(product, qty):
-    for item in st.session_state.cart:
-        if item["Nama Produk"] == product["Nama Produk"] and item["Owner"] == product["Owner"]:
-            item["Qty"] += qty
-            return
-    st.session_state.cart.append({
+def item_keranjang(product):
+    return {
         "Owner": product["Owner"],
         "Nama Produk": product["Nama Produk"],
         "Harga Retail": product["Harga Retail"],
         "Harga Reseller": product["Harga Reseller"],
         "Potongan": product["Potongan"],
-        "Qty": qty
-    })
+    }
+
+
+def add_to_cart(product, qty):
+    keranjang.tambah(item_keranjang(product), qty)
 
 
 def checkout(payment):
-    total = sum(item["Harga Retail"] * item["Qty"] for item in st.session_state.cart)
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+    total = keranjang.total()
     if payment < total:
         return None, "Uang pembayaran kurang!"
     change = payment - total
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    # kurangi stok & simpan laporan
-    for item in st.session_state.cart:
-        for p in st.session_state.products:
-            if p["Nama Produk"] == item["Nama Produk"] and p["Owner"] == item["Owner"]:
-                p["Stock"] -= item["Qty"]
-
-        st.session_state.laporan.append({
-            "Timestamp": timestamp,
+    rows = []
+    for item in keranjang:
+        rows.append({
             "Owner": item["Owner"],
             "Nama Produk": item["Nama Produk"],
             "Qty": item["Qty"],
@@ -63,39 +111,26 @@ def checkout(payment):
             "Gross Income": item["Harga Retail"] * item["Qty"],
             "Net Income": (item["Harga Retail"] - item["Potongan"]) * item["Qty"]
         })
-    st.session_state.cart = []
+    # stok di-reserve (atomik untuk seluruh keranjang), laporan ditulis, baru stok di-commit
+    try:
+        id_trx = transaksi.checkout(
+            inventaris, [((r["Nama Produk"], r["Owner"]), r["Qty"]) for r in rows],
+            lambda: log.catat({"id": struk.id_transaksi(), "Timestamp": timestamp, "items": rows}),
+        )
+    except StokTidakCukup as e:
+        return None, f"Stok tidak mencukupi untuk {e.args[0][0]}"
+    st.session_state.struk_terakhir = {
+        "id": id_trx,
+        "waktu": timestamp,
+        "items": [{"nama": r["Nama Produk"], "qty": r["Qty"], "harga": r["Harga Retail"]} for r in rows],
+        "total": total,
+        "bayar": payment,
+        "kembalian": change,
+    }
+    keranjang.kosongkan()
     return change, None
 
 
-def export_excel(data):
-    df = pd.DataFrame(data)
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Laporan")
-    return output.getvalue()
-
-
-def export_pdf(data):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    y = height - 50
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(30, y, "Laporan Penjualan")
-    y -= 30
-    c.setFont("Helvetica", 9)
-    for row in data:
-        line = f"{row['Timestamp']} | {row['Owner']} | {row['Nama Produk']} | Qty:{row['Qty']} | Gross:{row['Gross Income']} | Net:{row['Net Income']}"
-        c.drawString(30, y, line)
-        y -= 15
-        if y < 50:
-            c.showPage()
-            y = height - 50
-    c.save()
-    buffer.seek(0)
-    return buffer.getvalue()
-
-
 def download_template():
     df = pd.DataFrame([{
         "Owner": "Nama Pemilik",
@@ -114,7 +149,7 @@ def download_template():
 def upload_products(file):
     df = pd.read_excel(file)
     for _, row in df.iterrows():
-        st.session_state.products.append({
+        inventaris.tambah({
             "Owner": row["Owner"],
             "Nama Produk": row["Nama Produk"],
             "Harga Reseller": row["Harga Reseller"],
@@ -125,70 +160,73 @@ def upload_products(file):
 
 
 # ----------------- SIDEBAR -----------------
-menu = st.sidebar.radio("Menu", ["Kasir", "Daftar Produk", "Tambah Produk", "Edit Produk", "Laporan Penjualan"])
-
-# ----------------- KASIR -----------------
-# ----------------- KASIR -----------------
-if menu == "Kasir":
-    st.header("Kasir")
-
+menu = st.sidebar.radio("Menu", ["Kasir", "Daftar Produk", "Tambah Produk", "Edit Produk", "Aturan Harga", "Laporan Penjualan", "Per Owner", "Stok Menipis", "Prakiraan"])
+stok_menipis.peringatan(monitor)
+
+# ----------------- FRAGMENT KASIR -----------------
+# Katalog, keranjang & pembayaran dirender sebagai fragment terpisah:
+# kurangi/hapus item di keranjang hanya merender ulang keranjang, bukan katalog.
+@pos.fragment
+def tampil_katalog():
     cols = st.columns(4)
-    for i, product in enumerate(st.session_state.products):
+    for i, product in enumerate(inventaris.daftar()):
+        tersedia = inventaris.tersedia((product["Nama Produk"], product["Owner"]))
         with cols[i % 4]:
             st.markdown(f"**{product['Nama Produk']}**")
             st.write(f"Owner: {product['Owner']}")
             st.write(f"Harga: Rp{product['Harga Retail']:,}")
             st.write(f"Stock: {product['Stock']}")
-            qty = st.number_input(f"Qty {product['Nama Produk']}", min_value=1, max_value=product["Stock"], value=1, key=f"qty_{i}")
+            qty = st.number_input(f"Qty {product['Nama Produk']}", min_value=1, max_value=max(tersedia, 1), value=1, key=f"qty_{i}")
             if st.button(f"Tambah {product['Nama Produk']}", key=f"add_{i}"):
-                if product["Stock"] >= qty:
+                if tersedia >= qty:
                     add_to_cart(product, qty)
-                    st.success("Ditambahkan ke keranjang")
+                    pos.selesai("Ditambahkan ke keranjang")
+
 
+@pos.fragment
+def tampil_keranjang():
     st.subheader("Keranjang")
-    if st.session_state.cart:
-        total = sum(item["Harga Retail"] * item["Qty"] for item in st.session_state.cart)
-        df_cart = pd.DataFrame(st.session_state.cart)
-        st.table(df_cart)
-        st.write(f"Total: Rp{total:,}")
-
-        # --- fitur hapus/kurangi qty ---
-        pilih_item = st.selectbox("Pilih item keranjang", range(len(st.session_state.cart)),
-                                  format_func=lambda x: f"{st.session_state.cart[x]['Nama Produk']} (Qty:{st.session_state.cart[x]['Qty']})")
-
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            if st.button("Kurangi Qty"):
-                if st.session_state.cart[pilih_item]["Qty"] > 1:
-                    st.session_state.cart[pilih_item]["Qty"] -= 1
-                    st.success("Qty dikurangi 1")
-                else:
-                    st.warning("Qty sudah 1, gunakan hapus jika ingin menghilangkan item")
-                st.rerun()
+    if not keranjang:
+        st.write("Keranjang kosong.")
+        return
+    harga_jual.terapkan(keranjang, st.session_state.get("daftar_harga"))
+    pos.editor_keranjang(keranjang, ["Owner", "Nama Produk", "Harga Retail", "Potongan", "Qty"])
+    st.write(f"Total: Rp{keranjang.total():,}")
+
+
+@pos.fragment
+def tampil_pembayaran():
+    # --- checkout ---
+    payment = st.number_input("Nominal Pembayaran", min_value=0, value=0)
+    if st.button("Checkout"):
+        if not keranjang:
+            st.warning("Keranjang kosong.")
+            return
+        change, error = checkout(payment)
+        if error:
+            st.error(error)
+        else:
+            pos.selesai(f"Checkout berhasil! Kembalian: Rp{change:,}")
 
-        with col2:
-            if st.button("Hapus Item"):
-                nama_item = st.session_state.cart[pilih_item]["Nama Produk"]
-                st.session_state.cart.pop(pilih_item)
-                st.success(f"Item '{nama_item}' dihapus dari keranjang")
-                st.rerun()
 
-        # --- checkout ---
-        payment = st.number_input("Nominal Pembayaran", min_value=0, value=0)
-        if st.button("Checkout"):
-            change, error = checkout(payment)
-            if error:
-                st.error(error)
-            else:
-                st.success(f"Checkout berhasil! Kembalian: Rp{change:,}")
-    else:
-        st.write("Keranjang kosong.")
+# ----------------- KASIR -----------------
+if menu == "Kasir":
+    st.header("Kasir")
+    pos.tampilkan_pesan()
+    harga.pilih_daftar(harga_jual)
+    pos.input_cepat(keranjang, inventaris.daftar(), "Nama Produk", item_keranjang, inventaris.tersedia)
+    tampil_katalog()
+    tampil_keranjang()
+    tampil_pembayaran()
+
+    if "struk_terakhir" in st.session_state:
+        struk.tampilkan(st.session_state.struk_terakhir, struk.template("Kasir Kawani"))
 
 
 # ----------------- DAFTAR PRODUK -----------------
 elif menu == "Daftar Produk":
     st.header("Daftar Produk")
-    st.table(pd.DataFrame(st.session_state.products))
+    st.table(pd.DataFrame(inventaris.daftar()))
 
 # ----------------- TAMBAH PRODUK -----------------
 elif menu == "Tambah Produk":
@@ -201,7 +239,7 @@ elif menu == "Tambah Produk":
         stock = st.number_input("Stock", min_value=0)
         submit = st.form_submit_button("Tambah")
         if submit:
-            st.session_state.products.append({
+            inventaris.tambah({
                 "Owner": owner,
                 "Nama Produk": nama,
                 "Harga Reseller": harga_reseller,
@@ -215,17 +253,19 @@ elif menu == "Tambah Produk":
 # ----------------- EDIT PRODUK -----------------
 elif menu == "Edit Produk":
     st.header("Edit Produk")
-    if st.session_state.products:
-        produk_names = [f"{p['Nama Produk']} ({p['Owner']})" for p in st.session_state.products]
+    products = inventaris.daftar()
+    if products:
+        produk_names = [f"{p['Nama Produk']} ({p['Owner']})" for p in products]
         pilihan = st.selectbox("Pilih produk", range(len(produk_names)), format_func=lambda x: produk_names[x])
-        product = st.session_state.products[pilihan]
+        product = products[pilihan]
+        kunci = (product["Nama Produk"], product["Owner"])
 
         with st.form("edit_produk"):
-            product["Owner"] = st.text_input("Owner", value=product["Owner"])
-            product["Nama Produk"] = st.text_input("Nama Produk", value=product["Nama Produk"])
-            product["Harga Reseller"] = st.number_input("Harga Reseller", min_value=0, value=product["Harga Reseller"])
-            product["Harga Retail"] = st.number_input("Harga Retail", min_value=0, value=product["Harga Retail"])
-            product["Stock"] = st.number_input("Stock", min_value=0, value=product["Stock"])
+            owner = st.text_input("Owner", value=product["Owner"])
+            nama = st.text_input("Nama Produk", value=product["Nama Produk"])
+            harga_reseller = st.number_input("Harga Reseller", min_value=0, value=product["Harga Reseller"])
+            harga_retail = st.number_input("Harga Retail", min_value=0, value=product["Harga Retail"])
+            stock = st.number_input("Stock", min_value=0, value=product["Stock"])
             
             col1, col2 = st.columns(2)
             with col1:
@@ -234,21 +274,44 @@ elif menu == "Edit Produk":
                 hapus = st.form_submit_button("Hapus Produk")
 
             if submit:
-                product["Potongan"] = product["Harga Retail"] - product["Harga Reseller"]
+                inventaris.ubah(kunci, {
+                    "Owner": owner,
+                    "Nama Produk": nama,
+                    "Harga Reseller": harga_reseller,
+                    "Harga Retail": harga_retail,
+                    "Potongan": harga_retail - harga_reseller,
+                    "Stock": stock
+                })
                 st.success("Produk berhasil diupdate!")
 
             if hapus:
                 nama_dihapus = product["Nama Produk"]
-                st.session_state.products.pop(pilihan)
+                inventaris.hapus(kunci)
                 st.success(f"Produk '{nama_dihapus}' berhasil dihapus!")
                 st.rerun()
 
+# ----------------- ATURAN HARGA -----------------
+elif menu == "Aturan Harga":
+    harga.halaman(harga_jual)
+
 # ----------------- LAPORAN PENJUALAN -----------------
 elif menu == "Laporan Penjualan":
     st.header("Laporan Penjualan")
-    if st.session_state.laporan:
-        df = pd.DataFrame(st.session_state.laporan)
-        st.dataframe(df)
+    df = log.baris()
+
+    # bulan yang sudah tutup dibaca dari arsip Parquet, bulan berjalan dari log
+    arsip_penjualan = get_arsip()
+    arsip_penjualan.arsipkan(df)
+    bulan = arsip_penjualan.daftar_bulan(df)
+    if bulan:
+        col1, col2 = st.columns(2)
+        dari = col1.selectbox("Dari Bulan", bulan, index=0)
+        sampai = col2.selectbox("Sampai Bulan", bulan, index=len(bulan) - 1)
+        owner = st.selectbox("Owner", ["Semua"] + sorted({str(p["Owner"]) for p in inventaris.daftar()}))
+        df = arsip_penjualan.gabung(df, dari=dari, sampai=sampai,
+                                    owner=None if owner == "Semua" else owner)
+    if not df.empty:
+        st.dataframe(df.drop(columns="id", errors="ignore"))
 
         # Group by Owner untuk summary
         summary = df.groupby("Owner").agg(
@@ -259,10 +322,10 @@ elif menu == "Laporan Penjualan":
         st.table(summary)
 
         # Download
-        excel_data = export_excel(st.session_state.laporan)
-        st.download_button("Download Excel", excel_data, "laporan.xlsx")
-        pdf_data = export_pdf(st.session_state.laporan)
-        st.download_button("Download PDF", pdf_data, "laporan.pdf")
+        ekspor.halaman(get_ekspor(), bulan, inventaris.owners())
+
+        struk.cetak_ulang(df, struk.template("Kasir Kawani"), kolom_waktu="Timestamp", kolom_nama="Nama Produk",
+                          kolom_qty="Qty", kolom_harga="Harga Retail", kolom_id="id")
 
     else:
         st.write("Belum ada transaksi.")
@@ -273,3 +336,23 @@ elif menu == "Laporan Penjualan":
     if uploaded:
         upload_products(uploaded)
         st.success("Produk berhasil diupload!")
+
+    # rekap & statement akhir bulan semua owner dibangun di process pool (lihat laporan_paralel.py)
+    laporan_paralel.halaman(arsip_penjualan, log.baris(), inventaris.owners(), "Nama Produk", "Qty", "Gross Income")
+
+# ----------------- PER OWNER -----------------
+elif menu == "Per Owner":
+    # arsip & log dibaca hanya untuk partisi owner yang dipilih
+    pemilik.halaman(inventaris, lambda owner: get_arsip().gabung(log.baris(owner), owner=owner), monitor, get_ekspor())
+
+elif menu == "Stok Menipis":
+    stok_menipis.halaman(monitor)
+
+elif menu == "Prakiraan":
+    def penjualan_setahun():
+        return get_arsip().gabung(log.baris(), ["Timestamp", "Nama Produk", "Owner", "Qty"], dari=prakiraan.setahun_lalu())
+
+    prakiraan.halaman(penjualan_setahun, "kawanirev2", "Timestamp", ("Nama Produk", "Owner"), "Qty", inventaris.stok)
+
+memori.tampilkan()
+profil.tampilkan()
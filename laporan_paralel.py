@@ -0,0 +1,235 @@
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import memori
+from arsip import bulan_dari
+from inventaris import parse_int
+
+# ================= LAPORAN PARALEL =================
+# Rekap bulanan dan statement akhir bulan per owner dibangun di process
+# pool, bukan di thread script Streamlit:
+#
+# - rekap(): partisi arsip (bulan x owner) dibagi rata ke beberapa tugas
+#   (BAGIAN_PER_WORKER per worker). Worker membaca sendiri file Parquet
+#   partisinya (yang dikirim hanya path-nya) dan mengembalikan agregat
+#   kecil per bulan x owner x produk, lalu digabung di proses utama.
+# - statement(): satu tugas per owner, worker menyusun PDF + Excel owner
+#   itu; hasilnya dikemas jadi satu zip.
+#
+# Baris live (bulan yang belum diarsipkan) dikirim ke worker apa adanya,
+# cukup kecil karena hanya bulan berjalan. Progres dilaporkan lewat
+# callback progres(selesai, total).
+
+WORKER = int(os.environ.get("KASIR_WORKER", "0")) or os.cpu_count() or 1
+# partisi arsip kecil-kecil; satu tugas per partisi lebih mahal ongkos kirimnya daripada kerjanya
+BAGIAN_PER_WORKER = 4
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def pool():
+    """Satu process pool per server. Memakai spawn: fork dari proses Streamlit yang punya banyak thread tidak aman."""
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKER, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _angka(seri):
+    # nilai dari sheet bisa berupa teks "Rp10.000"
+    angka = pd.to_numeric(seri, errors="coerce")
+    kosong = angka.isna()
+    if kosong.any():
+        angka[kosong] = seri[kosong].map(parse_int)
+    return angka
+
+
+def _baca(path, kolom):
+    """Satu file partisi, hanya kolom yang diminta (pyarrow langsung, tanpa overhead read_parquet per file)."""
+    import pyarrow.parquet as pq
+
+    kolom = [c for c in kolom if c]
+    f = pq.ParquetFile(path)
+    ada = [c for c in kolom if c in f.schema_arrow.names]
+    return f.read(columns=ada).to_pandas().reindex(columns=kolom)
+
+
+def _ringkas(df, kolom_nama, kolom_qty, kolom_nilai, grup=()):
+    """Agregat per produk (dan per kolom `grup`, mis. Bulan & Owner): Qty & Nilai."""
+    return (
+        df.assign(**{kolom_qty: _angka(df[kolom_qty]), kolom_nilai: _angka(df[kolom_nilai])})
+        .groupby([*grup, kolom_nama], sort=False, dropna=False)[[kolom_qty, kolom_nilai]]
+        .sum()
+        .reset_index()
+        .rename(columns={kolom_nama: "Produk", kolom_qty: "Qty", kolom_nilai: "Nilai"})
+    )
+
+
+# ---------- tugas worker ----------
+def _tugas_rekap(partisi, kolom):
+    """Agregat beberapa partisi: list (bulan, owner, sumber), sumber = path Parquet (arsip) atau DataFrame (live)."""
+    pakai = [kolom["nama"], kolom["qty"], kolom["nilai"]]
+    bagian = [_baca(s, pakai) if isinstance(s, str) else s[pakai] for _, _, s in partisi]
+    panjang = [len(b) for b in bagian]
+    df = pd.concat(bagian, ignore_index=True)
+    if df.empty:
+        return df
+    # label bulan & owner ditempel sekali setelah concat, bukan per partisi
+    df["Bulan"] = np.repeat([b for b, _, _ in partisi], panjang)
+    df["Owner"] = np.repeat([o for _, o, _ in partisi], panjang)
+    return _ringkas(df, kolom["nama"], kolom["qty"], kolom["nilai"], grup=("Bulan", "Owner"))
+
+
+def _tugas_statement(owner, paths, live, kolom, judul, periode):
+    """PDF + Excel statement satu owner."""
+    bagian = [_baca(p, kolom.values()) for p in paths]
+    if live is not None and not live.empty:
+        bagian.append(live.reindex(columns=[c for c in kolom.values() if c]))
+    detail = pd.concat(bagian, ignore_index=True) if bagian else pd.DataFrame(columns=list(kolom.values()))
+    if kolom["waktu"] in detail:
+        detail = detail.sort_values(kolom["waktu"], kind="stable")
+    ringkasan = _ringkas(detail, kolom["nama"], kolom["qty"], kolom["nilai"])
+    total_qty, total = int(ringkasan["Qty"].sum()), int(ringkasan["Nilai"].sum())
+
+    xlsx = BytesIO()
+    with pd.ExcelWriter(xlsx, engine="openpyxl") as writer:
+        ringkasan.to_excel(writer, index=False, sheet_name="Ringkasan")
+        detail.to_excel(writer, index=False, sheet_name="Detail")
+
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    pdf = BytesIO()
+    styles = getSampleStyleSheet()
+    tabel = Table(
+        [["Produk", "Qty", "Nilai (Rp)"]]
+        + [[str(r.Produk), int(r.Qty), f"{int(r.Nilai):,}"] for r in ringkasan.itertuples(index=False)]
+        + [["TOTAL", total_qty, f"{total:,}"]]
+    )
+    tabel.setStyle(TableStyle([("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+                               ("GRID", (0, 0), (-1, -1), 1, colors.black)]))
+    SimpleDocTemplate(pdf, pagesize=A4).build([
+        # Paragraph membaca markup: nama owner seperti "Bu.Ilah & Co" harus di-escape
+        Paragraph(escape(str(judul)), styles["Title"]),
+        Paragraph(f"Owner: {escape(str(owner))}<br/>Periode: {escape(str(periode))}", styles["Normal"]),
+        Spacer(1, 12),
+        tabel,
+    ])
+    return owner, pdf.getvalue(), xlsx.getvalue(), total
+
+
+# ---------- proses utama ----------
+def _jalankan(tugas, progres):
+    """tugas: list (fungsi, argumen). Hasil dikembalikan sesuai urutan selesai."""
+    if not tugas:
+        return []
+    futures = [pool().submit(fn, *args) for fn, args in tugas]
+    hasil = []
+    for i, future in enumerate(as_completed(futures), 1):
+        hasil.append(future.result())
+        if progres:
+            progres(i, len(futures))
+    return hasil
+
+
+def _kolom(arsip, kolom_nama, kolom_qty, kolom_nilai):
+    return {"waktu": arsip.kolom_waktu, "owner": arsip.kolom_owner,
+            "nama": kolom_nama, "qty": kolom_qty, "nilai": kolom_nilai}
+
+
+def rekap(arsip, df_live, dari, sampai, kolom_nama, kolom_qty, kolom_nilai, progres=None):
+    """Qty & nilai per bulan x owner x produk untuk rentang bulan [dari, sampai]."""
+    kolom = _kolom(arsip, kolom_nama, kolom_qty, kolom_nilai)
+    partisi = arsip.partisi(dari, sampai)
+    live = arsip.live(df_live, None, dari, sampai)
+    if live is not None and not live.empty:
+        bulan = bulan_dari(live[arsip.kolom_waktu])
+        grup = [bulan, live[arsip.kolom_owner]] if arsip.kolom_owner else [bulan]
+        for kunci, bagian in live.groupby(grup, sort=False):
+            kunci = kunci if isinstance(kunci, tuple) else (kunci,)
+            partisi.append((kunci[0], kunci[1] if len(kunci) > 1 else None, bagian))
+    jumlah = min(len(partisi), WORKER * BAGIAN_PER_WORKER)
+    tugas = [(_tugas_rekap, (partisi[i::jumlah], kolom)) for i in range(jumlah)]
+
+    hasil = [h for h in _jalankan(tugas, progres) if not h.empty]
+    if not hasil:
+        return pd.DataFrame(columns=["Bulan", "Owner", "Produk", "Qty", "Nilai"])
+    return (
+        pd.concat(hasil, ignore_index=True)
+        .groupby(["Bulan", "Owner", "Produk"], dropna=False)[["Qty", "Nilai"]]
+        .sum()
+        .reset_index()
+    )
+
+
+def statement(arsip, df_live, bulan, owners, kolom_nama, kolom_qty, kolom_nilai, judul="Statement Penjualan", progres=None):
+    """Statement satu bulan untuk tiap owner (PDF + Excel) dalam satu zip. Mengembalikan (zip, ringkasan)."""
+    kolom = _kolom(arsip, kolom_nama, kolom_qty, kolom_nilai)
+    paths = {}
+    for _, o, path in arsip.partisi(bulan, bulan):
+        paths.setdefault(o, []).append(path)
+    live = arsip.live(df_live, None, bulan, bulan)
+    tugas = []
+    for owner in owners:
+        live_owner = None
+        if live is not None and not live.empty:
+            live_owner = live[live[arsip.kolom_owner].astype(str) == str(owner)]
+        tugas.append((_tugas_statement, (owner, paths.get(str(owner), []), live_owner, kolom, judul, bulan)))
+
+    arsip_zip = BytesIO()
+    ringkasan = []
+    with zipfile.ZipFile(arsip_zip, "w", zipfile.ZIP_DEFLATED) as z:
+        for owner, pdf, xlsx, total in sorted(_jalankan(tugas, progres), key=lambda h: str(h[0])):
+            nama = str(owner).replace("/", "_")
+            z.writestr(f"{bulan}/{nama}.pdf", pdf)
+            z.writestr(f"{bulan}/{nama}.xlsx", xlsx)
+            ringkasan.append({"Owner": owner, "Total": total})
+    return arsip_zip.getvalue(), pd.DataFrame(ringkasan)
+
+
+# ---------- tampilan streamlit ----------
+def halaman(arsip, df_live, owners, kolom_nama, kolom_qty, kolom_nilai, judul="Statement Penjualan"):
+    """Rekap bulan x owner dan statement akhir bulan per owner, dibangun di process pool."""
+    st.subheader("🗂️ Rekap & Statement Akhir Bulan")
+    bulan = arsip.daftar_bulan(df_live)
+    if not bulan:
+        st.info("Belum ada transaksi.")
+        return
+    col1, col2 = st.columns(2)
+    dari = col1.selectbox("Rekap dari", bulan, index=0, key="rekap_dari")
+    sampai = col2.selectbox("Rekap sampai", bulan, index=len(bulan) - 1, key="rekap_sampai")
+    if st.button(f"Buat Rekap ({WORKER} proses)"):
+        bar = st.progress(0.0, "Menggabungkan partisi...")
+        # hasil disimpan di gudang sesi (lihat memori.py), bukan session_state
+        memori.simpan("rekap_paralel", rekap(
+            arsip, df_live, dari, sampai, kolom_nama, kolom_qty, kolom_nilai,
+            progres=lambda i, n: bar.progress(i / n, f"Partisi {i}/{n}"),
+        ))
+    hasil_rekap = memori.ambil("rekap_paralel")
+    if hasil_rekap is not None:
+        st.dataframe(hasil_rekap, hide_index=True)
+
+    bulan_statement = st.selectbox("Bulan statement", bulan, index=len(bulan) - 1, key="statement_bulan")
+    if st.button(f"Buat Statement {len(owners)} Owner"):
+        bar = st.progress(0.0, "Menyusun statement...")
+        memori.simpan("statement_paralel", (bulan_statement,) + statement(
+            arsip, df_live, bulan_statement, owners, kolom_nama, kolom_qty, kolom_nilai, judul,
+            progres=lambda i, n: bar.progress(i / n, f"Owner {i}/{n}"),
+        ))
+    if memori.ambil("statement_paralel") is not None:
+        b, isi_zip, ringkasan = memori.ambil("statement_paralel")
+        st.dataframe(ringkasan, hide_index=True)
+        st.download_button(f"⬇️ Download Statement {b} (zip)", isi_zip, f"statement_{b}.zip", mime="application/zip")
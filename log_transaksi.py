@@ -0,0 +1,137 @@
+import glob
+import json
+import os
+import threading
+import uuid
+
+import pandas as pd
+
+# ================= LOG TRANSAKSI =================
+# Histori transaksi disimpan sebagai log append-only (satu baris JSON per
+# checkout), jadi tidak hilang saat browser di-refresh dan tiap penjualan
+# cukup menambah satu baris, bukan menulis ulang semua data.
+#
+# Tiap `snapshot_tiap` transaksi, seluruh isi log disimpan sebagai snapshot
+# kolumnar (Parquet). Nama file snapshot memuat posisi byte log yang sudah
+# tercakup, jadi saat start ulang cukup baca snapshot lalu replay ekor log.
+#
+# Kalau kolom_owner diisi, posisi baris tiap owner diindeks (partisi), jadi
+# baris(owner) hanya mengambil baris owner itu tanpa memfilter semua baris.
+
+FOLDER = os.environ.get("KASIR_DATA_LOKAL", "data_lokal")
+
+
+def _ratakan(transaksi):
+    """1 transaksi (dengan list 'items') -> beberapa baris per item."""
+    kepala = {k: v for k, v in transaksi.items() if k != "items"}
+    return [{**kepala, **item} for item in transaksi.get("items", [])]
+
+
+class LogTransaksi:
+    def __init__(self, nama, snapshot_tiap=500, kolom_owner=None):
+        os.makedirs(FOLDER, exist_ok=True)
+        self.nama = nama
+        self.path = os.path.join(FOLDER, f"{nama}.jsonl")
+        self.snapshot_tiap = snapshot_tiap
+        self.kolom_owner = kolom_owner
+        self._posisi_owner = {}  # owner -> list posisi baris di _df
+        self.lock = threading.Lock()
+        self._df = None
+        self._offset = 0
+        self._sejak_snapshot = 0
+
+    # ---------- tulis ----------
+    def catat(self, transaksi):
+        """Tambahkan satu transaksi. Mengembalikan ID transaksi."""
+        transaksi = {"id": uuid.uuid4().hex[:12], **transaksi}
+        baris = json.dumps(transaksi, default=str) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(baris)
+                f.flush()
+                os.fsync(f.fileno())
+            self._sejak_snapshot += 1
+            if self._sejak_snapshot >= self.snapshot_tiap:
+                self._snapshot()
+        return transaksi["id"]
+
+    def hapus(self):
+        with self.lock:
+            for path in [self.path] + self._daftar_snapshot():
+                if os.path.exists(path):
+                    os.remove(path)
+            self._df = None
+            self._offset = 0
+            self._sejak_snapshot = 0
+            self._posisi_owner = {}
+
+    # ---------- baca ----------
+    def baris(self, owner=None):
+        """Item transaksi sebagai DataFrame (snapshot + ekor log), opsional hanya satu owner."""
+        with self.lock:
+            self._baca_ekor()
+            if owner is None or not self.kolom_owner:
+                return self._df
+            return self._df.take(self._posisi_owner.get(owner, []))
+
+    def owners(self):
+        with self.lock:
+            self._baca_ekor()
+            return sorted(self._posisi_owner, key=str)
+
+    def _daftar_snapshot(self):
+        return sorted(
+            glob.glob(os.path.join(FOLDER, f"{self.nama}.*.parquet")),
+            key=lambda p: int(p.rsplit(".", 2)[1]),
+        )
+
+    def _baca_ekor(self):
+        muat_awal = self._df is None
+        if muat_awal:
+            snapshot = self._daftar_snapshot()
+            if snapshot:
+                self._df = pd.read_parquet(snapshot[-1])
+                self._offset = int(snapshot[-1].rsplit(".", 2)[1])
+                if self.kolom_owner and self.kolom_owner in self._df:
+                    self._posisi_owner = {
+                        owner: list(posisi) for owner, posisi in self._df.groupby(self.kolom_owner).indices.items()
+                    }
+            else:
+                self._df = pd.DataFrame()
+                self._offset = 0
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # baris terakhir yang belum lengkap (mis. proses mati saat menulis) dilewati
+        akhir = data.rfind(b"\n") + 1
+        if akhir == 0:
+            return
+        rows = []
+        jumlah = 0
+        for baris in data[:akhir].splitlines():
+            if baris.strip():
+                rows.extend(_ratakan(json.loads(baris)))
+                jumlah += 1
+        if rows:
+            if self.kolom_owner:
+                awal = len(self._df)
+                for i, row in enumerate(rows):
+                    self._posisi_owner.setdefault(row.get(self.kolom_owner), []).append(awal + i)
+            self._df = pd.concat([self._df, pd.DataFrame(rows)], ignore_index=True)
+        self._offset += akhir
+        if muat_awal:
+            # transaksi di ekor log yang belum masuk snapshot (catat() menghitung sisanya)
+            self._sejak_snapshot = jumlah
+
+    def _snapshot(self):
+        self._baca_ekor()
+        path = os.path.join(FOLDER, f"{self.nama}.{self._offset}.parquet")
+        tmp = path + ".tmp"
+        self._df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        for lama in self._daftar_snapshot()[:-1]:
+            os.remove(lama)
+        self._sejak_snapshot = 0
@@ -0,0 +1,200 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+# ================= MEMORI SESI =================
+# Data besar tidak lagi disalin ke st.session_state tiap sesi:
+#
+# - Bersama: satu DataFrame per app (mis. penjualan) yang dipakai semua
+#   sesi. Isinya tidak pernah diubah di tempat; ganti() / tambah() membuat
+#   DataFrame baru dengan nomor versi baru (copy-on-write), jadi sesi yang
+#   masih memegang versi lama tidak ikut berubah di tengah render.
+#   tambah() hanya menampung baris; concat dilakukan sekali saat .df
+#   berikutnya dibaca, bukan per penjualan.
+# - Gudang: hasil besar milik satu sesi (rekap, zip statement, PDF cetak
+#   ulang) disimpan di luar session_state, per (id sesi, nama). Sesi yang
+#   tidak aktif lebih dari IDLE_DETIK dibuang isinya; kalau total melebihi
+#   BATAS_MB, entri yang paling lama tidak dipakai dibuang lebih dulu.
+# - tampilkan(): laporan memori per sesi di sidebar.
+
+IDLE_DETIK = int(os.environ.get("KASIR_SESI_IDLE", "1800"))
+BATAS_MB = int(os.environ.get("KASIR_BATAS_MEMORI_SESI", "256"))
+
+
+def ukuran(nilai):
+    """Perkiraan byte sebuah nilai (DataFrame dihitung termasuk isi teksnya)."""
+    if isinstance(nilai, pd.DataFrame):
+        return int(nilai.memory_usage(deep=True).sum())
+    if isinstance(nilai, pd.Series):
+        return int(nilai.memory_usage(deep=True))
+    if isinstance(nilai, (bytes, bytearray)):
+        return len(nilai)
+    if isinstance(nilai, dict):
+        return sys.getsizeof(nilai) + sum(ukuran(k) + ukuran(v) for k, v in nilai.items())
+    if isinstance(nilai, (list, tuple, set)):
+        return sys.getsizeof(nilai) + sum(ukuran(v) for v in nilai)
+    return sys.getsizeof(nilai)
+
+
+class Bersama:
+    """DataFrame bersama semua sesi, versi naik tiap perubahan. Jangan ubah .df di tempat."""
+
+    def __init__(self, df=None):
+        self.lock = threading.Lock()
+        self.versi = 0
+        self._df = pd.DataFrame() if df is None else df
+        self._tambahan = []  # baris dari tambah() yang belum di-concat ke _df
+        self.dimuat = df is not None  # False sampai isi sumber (mis. sheet) pertama kali masuk lewat ganti()
+        self._diganti = 0    # naik tiap ganti(); ukuran deep dihitung sekali per ganti()
+        self._ukuran = None  # (_diganti, byte, baris)
+
+    def _gabung(self):
+        if self._tambahan:
+            baru = pd.DataFrame(self._tambahan)
+            self._df = pd.concat([self._df, baru], ignore_index=True) if not self._df.empty else baru
+            self._tambahan = []
+        return self._df
+
+    @property
+    def df(self):
+        with self.lock:
+            return self._gabung()
+
+    def baca(self):
+        with self.lock:
+            return self.versi, self._gabung()
+
+    def ganti(self, df):
+        with self.lock:
+            if df is not self._df or self._tambahan:
+                self.versi += 1
+                self._df = df
+                self._tambahan = []
+                self._diganti += 1
+            self.dimuat = True
+            return self.versi
+
+    def tambah(self, baris):
+        """Tambah baris (list dict) sebagai versi baru; versi lama tetap utuh untuk yang masih memegangnya."""
+        with self.lock:
+            self._tambahan.extend(baris)
+            self.versi += 1
+            return self.versi
+
+    def ukuran(self):
+        """Perkiraan byte: ukuran deep DataFrame dasar (sekali per ganti()), baris tambahan dihitung rata-rata per baris."""
+        with self.lock:
+            if self._ukuran is None or self._ukuran[0] != self._diganti:
+                self._ukuran = (self._diganti, ukuran(self._df), len(self._df))
+            _, byte, baris = self._ukuran
+            jumlah = len(self._df) + len(self._tambahan)
+        return byte + (jumlah - baris) * (byte // baris if baris else 0)
+
+
+class Gudang:
+    def __init__(self, idle_detik=IDLE_DETIK, batas_mb=BATAS_MB):
+        self.idle_detik = idle_detik
+        self.batas = batas_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self._isi = OrderedDict()   # (sesi, nama) -> (nilai, byte), urut dari yang paling lama dipakai
+        self._aktif = {}            # sesi -> waktu terakhir aktif
+        self.total = 0
+
+    def _buang(self, kunci):
+        _, byte = self._isi.pop(kunci)
+        self.total -= byte
+
+    def sentuh(self, sesi):
+        with self.lock:
+            sekarang = time.monotonic()
+            self._aktif[sesi] = sekarang
+            idle = {s for s, t in self._aktif.items() if sekarang - t > self.idle_detik}
+            for kunci in [k for k in self._isi if k[0] in idle]:
+                self._buang(kunci)
+            for s in idle:
+                del self._aktif[s]
+
+    def simpan(self, sesi, nama, nilai):
+        with self.lock:
+            if (sesi, nama) in self._isi:
+                self._buang((sesi, nama))
+            byte = ukuran(nilai)
+            self._isi[(sesi, nama)] = (nilai, byte)
+            self.total += byte
+            while self.total > self.batas and len(self._isi) > 1:
+                self._buang(next(iter(self._isi)))
+
+    def ambil(self, sesi, nama, default=None):
+        with self.lock:
+            entri = self._isi.get((sesi, nama))
+            if entri is None:
+                return default
+            self._isi.move_to_end((sesi, nama))
+            return entri[0]
+
+    def laporan(self):
+        """Per sesi: jumlah entri, byte, detik sejak terakhir aktif."""
+        with self.lock:
+            sekarang = time.monotonic()
+            hasil = {s: {"Sesi": s[:8], "Entri": 0, "MB": 0.0, "Idle (detik)": int(sekarang - t)}
+                     for s, t in self._aktif.items()}
+            for (sesi, _), (_, byte) in self._isi.items():
+                baris = hasil.setdefault(sesi, {"Sesi": sesi[:8], "Entri": 0, "MB": 0.0, "Idle (detik)": None})
+                baris["Entri"] += 1
+                baris["MB"] += byte / 1e6
+            return list(hasil.values())
+
+
+_gudang = None
+_lock_gudang = threading.Lock()
+
+
+def gudang():
+    """Satu gudang per server."""
+    global _gudang
+    with _lock_gudang:
+        if _gudang is None:
+            _gudang = Gudang()
+        return _gudang
+
+
+def id_sesi():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return "lokal"
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "lokal"
+
+
+# ---------- dipakai halaman (sesi yang sedang render) ----------
+def simpan(nama, nilai):
+    sesi = id_sesi()
+    gudang().sentuh(sesi)
+    gudang().simpan(sesi, nama, nilai)
+
+
+def ambil(nama, default=None):
+    sesi = id_sesi()
+    gudang().sentuh(sesi)
+    return gudang().ambil(sesi, nama, default)
+
+
+def tampilkan(**bersama):
+    """Laporan memori di sidebar. bersama = nama -> objek Bersama milik app. Panggil di baris paling bawah script."""
+    g = gudang()
+    g.sentuh(id_sesi())
+    with st.sidebar.expander("🧠 Memori Sesi", expanded=False):
+        for nama, b in bersama.items():
+            st.write(f"{nama} (bersama, versi {b.versi}): {b.ukuran() / 1e6:,.1f} MB")
+        st.write(f"Gudang sesi: {g.total / 1e6:,.1f} / {g.batas / 1e6:,.0f} MB, idle > {g.idle_detik // 60} menit dibuang")
+        laporan = g.laporan()
+        if laporan:
+            st.dataframe(pd.DataFrame(laporan), hide_index=True)
+        state = {k: ukuran(v) for k, v in st.session_state.items()}
+        st.write(f"session_state sesi ini: {sum(state.values()) / 1e3:,.1f} KB")
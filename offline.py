@@ -0,0 +1,242 @@
+import json
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime
+
+import sinkron
+from inventaris import _lock_remote, parse_int, sel_a1
+from transaksi import KOLOM_ID
+
+# ================= MODE OFFLINE =================
+# - Katalog terakhir disimpan sebagai snapshot lokal, jadi app bisa langsung
+#   jalan dari snapshot tanpa menunggu Google Sheet.
+# - Penjualan yang belum terkirim dicatat ke ledger lokal (append-only,
+#   satu baris JSON per transaksi).
+# - Begitu koneksi kembali, rekonsiliasi mengirim penjualan (append) dan
+#   pengurangan stok (delta) ke sheet, lalu menandai transaksi terkirim.
+#   Penjualan membawa ID Transaksi dan stok membawa ID entri ledger ke sheet,
+#   jadi entri yang terkirim tapi belum sempat ditandai tidak dikirim ulang.
+# - Snapshot & ledger bernama per app (seperti arsip & jurnal), jadi app
+#   yang berbagi folder data_lokal tidak saling menimpa / mengirim ulang.
+
+FOLDER = os.environ.get("KASIR_DATA_LOKAL", "data_lokal")
+HEADER_PENANDA = ["Ledger", "Entri Terakhir", "Waktu"]
+
+
+def _path(nama):
+    os.makedirs(FOLDER, exist_ok=True)
+    return os.path.join(FOLDER, nama)
+
+
+# ---------- snapshot katalog ----------
+def simpan_snapshot(records, nama):
+    path = _path(f"produk_{nama}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(records, f, default=str)
+    os.replace(tmp, path)
+
+
+def muat_snapshot(nama):
+    path = _path(f"produk_{nama}.json")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ---------- ledger lokal ----------
+class Ledger:
+    """Ledger append-only. Tiap transaksi punya dua tahap kirim: penjualan & stok.
+
+    Penanda tahap yang sudah terkirim juga ditulis append-only ke file
+    terpisah, jadi kalau proses mati di tengah rekonsiliasi, tahap yang
+    sudah terkirim tidak dikirim dua kali.
+    """
+
+    def __init__(self, nama):
+        self.path = _path(f"ledger_{nama}.jsonl")
+        self.path_terkirim = self.path + ".terkirim"
+        # nama ledger di sheet penanda stok: tiap server punya ledger lokal sendiri
+        self.kunci = f"{socket.gethostname()}/{nama}"
+        self.lock = threading.Lock()
+
+    def catat(self, penjualan, stok):
+        """penjualan: list dict baris Penjualan; stok: list (kunci, qty terjual)."""
+        entri = {
+            "id": uuid.uuid4().hex,
+            "waktu": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "penjualan": penjualan,
+            "stok": [[k, int(q)] for k, q in stok],
+        }
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entri, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return entri["id"]
+
+    def _terkirim(self):
+        if not os.path.exists(self.path_terkirim):
+            return set()
+        with open(self.path_terkirim, encoding="utf-8") as f:
+            return {baris.strip() for baris in f if baris.strip()}
+
+    def tandai(self, id_entri, tahap):
+        with self.lock, open(self.path_terkirim, "a", encoding="utf-8") as f:
+            f.write(f"{id_entri}:{tahap}\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def belum_terkirim(self):
+        if not os.path.exists(self.path):
+            return []
+        terkirim = self._terkirim()
+        hasil = []
+        with self.lock, open(self.path, encoding="utf-8") as f:
+            for baris in f:
+                if not baris.strip():
+                    continue
+                entri = json.loads(baris)
+                entri["sudah"] = {t for t in ("penjualan", "stok") if f"{entri['id']}:{t}" in terkirim}
+                if len(entri["sudah"]) < 2:
+                    hasil.append(entri)
+        return hasil
+
+
+def kurangi_stok_remote(sheet, kolom_kunci, kolom_stok, stok, penanda=None):
+    """Kurangi stok di sheet Produk berdasarkan nilai saat ini (bukan timpa).
+
+    Baca-lalu-tulis dijalankan di bawah lock yang sama dengan checkout_remote,
+    supaya checkout online di server ini tidak menyelip di antaranya.
+
+    penanda = (kunci ledger, id entri): id entri dicatat di worksheet "Offline"
+    dalam values_batch_update yang sama dengan sel stok, dan entri yang sudah
+    tercatat di sana dilewati. Cukup id entri terakhir per ledger: rekonsiliasi
+    berjalan urut dan berhenti di error pertama, jadi hanya entri terakhir yang
+    bisa sudah terkirim tanpa ditandai. Mengembalikan False kalau dilewati.
+    """
+    with _lock_remote:
+        data = []
+        if penanda is not None:
+            kunci_ledger, id_entri = penanda
+            sheet_penanda = sinkron.buka_worksheet(sheet.spreadsheet, "Offline", HEADER_PENANDA)
+            baris_penanda = sheet_penanda.get_all_values()[1:]
+            terakhir = {r[0]: r[1] for r in baris_penanda if len(r) > 1}
+            if terakhir.get(kunci_ledger) == id_entri:
+                return False
+            urutan = [r[0] if r else "" for r in baris_penanda]
+            baris = (urutan.index(kunci_ledger) if kunci_ledger in urutan else len(urutan)) + 2
+            waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            data.append({"range": f"'{sheet_penanda.title}'!A{baris}:C{baris}",
+                         "values": [[kunci_ledger, id_entri, waktu]]})
+        if stok:
+            header = sheet.row_values(1)
+            col_kunci = header.index(kolom_kunci) + 1
+            col_stok = header.index(kolom_stok) + 1
+            nilai_kunci = sheet.col_values(col_kunci)[1:]
+            nilai_stok = sheet.col_values(col_stok)[1:]
+            for kunci, qty in stok:
+                if kunci not in nilai_kunci:
+                    continue
+                baris = nilai_kunci.index(kunci)
+                sekarang = parse_int(nilai_stok[baris]) if baris < len(nilai_stok) else 0
+                data.append({"range": f"'{sheet.title}'!{sel_a1(baris + 2, col_stok)}", "values": [[sekarang - qty]]})
+        if data:
+            sheet.spreadsheet.values_batch_update({"valueInputOption": "RAW", "data": data})
+    return True
+
+
+def _id_terkirim(sheet_penjualan):
+    """ID Transaksi yang sudah ada di sheet Penjualan (kosong kalau kolomnya belum ada)."""
+    header = sheet_penjualan.row_values(1)
+    if KOLOM_ID not in header:
+        return set()
+    return set(sheet_penjualan.col_values(header.index(KOLOM_ID) + 1)[1:])
+
+
+def rekonsiliasi(ledger, sheet_penjualan, kirim_stok):
+    """Kirim transaksi offline ke Google Sheet. Mengembalikan jumlah transaksi yang selesai.
+
+    kirim_stok(stok, penanda) menerapkan pengurangan stok, mis.
+    kurangi_stok_remote atau pencatatan delta di mode sinkron. penanda =
+    (ledger.kunci, id entri) harus ikut tersimpan di sheet bersama stoknya
+    (satu request), dan penanda yang sudah ada dilewati.
+
+    Kalau proses mati setelah kirim tapi sebelum tandai(), entri itu hanya
+    ditandai saat rekonsiliasi berikutnya: penjualan yang ID Transaksi-nya
+    sudah ada di sheet tidak di-append lagi, dan stok yang penandanya sudah
+    ada di sheet tidak dikurangi lagi.
+    """
+    selesai = 0
+    sudah_di_sheet = None
+    for entri in ledger.belum_terkirim():
+        if "penjualan" not in entri["sudah"]:
+            if entri["penjualan"]:
+                if sudah_di_sheet is None:
+                    sudah_di_sheet = _id_terkirim(sheet_penjualan)
+                id_trx = entri["penjualan"][0].get(KOLOM_ID)
+                if not id_trx or str(id_trx) not in sudah_di_sheet:
+                    sheet_penjualan.append_rows([list(r.values()) for r in entri["penjualan"]])
+                    if id_trx:
+                        sudah_di_sheet.add(str(id_trx))
+            ledger.tandai(entri["id"], "penjualan")
+        if "stok" not in entri["sudah"]:
+            kirim_stok(entri["stok"], (ledger.kunci, entri["id"]))
+            ledger.tandai(entri["id"], "stok")
+        selesai += 1
+    return selesai
+
+
+# ---------- koneksi latar ----------
+class Koneksi:
+    """Membuka koneksi Google Sheet di thread latar, jadi startup tidak menunggu.
+
+    Selama offline, koneksi dicoba ulang tiap `interval` detik. Fungsi di
+    `saat_online` (mis. muat ulang katalog, rekonsiliasi ledger) dijalankan
+    sekali setiap transisi offline -> online, bukan tiap pengecekan; fungsi
+    yang gagal dicoba lagi pada pengecekan berikutnya.
+    """
+
+    def __init__(self, buka, saat_online=(), interval=30):
+        self._buka = buka
+        self.interval = interval
+        self.sheets = None
+        self.error = None
+        self.saat_online = list(saat_online)
+        self._tertunda = []  # fungsi saat_online yang belum sukses sejak terakhir online
+        self._bangun = threading.Event()
+        threading.Thread(target=self._loop, name="kasir-koneksi", daemon=True).start()
+
+    @property
+    def online(self):
+        return self.sheets is not None
+
+    def tandai_offline(self, error):
+        self.sheets = None
+        self.error = error
+        self._bangun.set()
+
+    def _loop(self):
+        while True:
+            if self.sheets is None:
+                try:
+                    sheets = self._buka()
+                    self.error = None
+                    self._tertunda = list(self.saat_online)
+                    self.sheets = sheets
+                except Exception as e:
+                    self.error = e
+            sheets = self.sheets
+            if sheets is not None and self._tertunda:
+                gagal = []
+                for fungsi in self._tertunda:
+                    try:
+                        fungsi(sheets)
+                    except Exception as e:
+                        self.error = e
+                        gagal.append(fungsi)
+                self._tertunda = gagal
+            self._bangun.wait(self.interval)
+            self._bangun.clear()
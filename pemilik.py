@@ -0,0 +1,44 @@
+import pandas as pd
+import streamlit as st
+
+import ekspor
+import stok_menipis
+
+# ================= HALAMAN PER OWNER =================
+# Tampilan, peringatan stok dan ekspor untuk satu owner (konsinyor).
+# Produk dibaca dari partisi owner di Inventaris (daftar_owner) dan
+# penjualan dari fungsi penjualan(owner) milik app, yang membaca arsip
+# Parquet per owner + data live owner itu saja. Excel per owner dibuat di
+# antrian ekspor app (lihat ekspor.py), bukan di tiap rerun.
+
+
+def halaman(inventaris, penjualan, monitor, antrian, sembunyikan=("image",)):
+    """penjualan(owner) -> DataFrame penjualan owner itu saja; monitor = StokMenipis app;
+    antrian = ekspor.Antrian app.
+
+    sembunyikan = kolom produk yang tidak ditampilkan.
+    """
+    st.title("👤 Per Owner")
+    owners = inventaris.owners()
+    if not owners:
+        st.info("Belum ada produk.")
+        return
+    owner = st.selectbox("Owner", owners, format_func=str)
+    daftar = inventaris.daftar_owner(owner)
+
+    st.subheader("📦 Produk")
+    produk = pd.DataFrame(daftar).drop(columns=list(sembunyikan), errors="ignore")
+    st.dataframe(produk)
+
+    st.subheader("⚠️ Stok Menipis")
+    stok_menipis.tampilkan(monitor, owner)
+
+    st.subheader("💰 Penjualan")
+    df = penjualan(owner)
+    if df.empty:
+        st.info("Belum ada penjualan untuk owner ini.")
+    else:
+        st.dataframe(df)
+
+    ekspor.tombol(antrian, f"Excel {owner}", lambda: {"Produk": produk, "Penjualan": df},
+                  f"owner_{owner}.xlsx", kunci=f"owner_{owner}", owner=owner)
@@ -0,0 +1,232 @@
+import copy
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import streamlit as st
+
+# ================= PENJADWAL REQUEST GOOGLE SHEET =================
+# Semua panggilan gspread lewat satu penjadwal per server (bungkus() di
+# connect_sheet membungkus Spreadsheet, dan setiap Worksheet yang diambil
+# darinya ikut terbungkus):
+#
+# - Token bucket: paling banyak PER_MENIT request per menit ditambah
+#   lonjakan KAPASITAS; kalau token habis, pemanggil menunggu (bukan kena
+#   429). Default 50 + 10, di bawah kuota 60 request / menit / user.
+# - Baca yang sama (objek, method, argumen) yang sedang berjalan tidak
+#   dikirim dua kali: pemanggil berikutnya menunggu hasil yang pertama.
+#   Begitu tulis ke worksheet selesai, baca yang sedang berjalan untuk
+#   worksheet itu (dan spreadsheet-nya) tidak lagi bisa ditumpangi, jadi
+#   pemanggil sesudah tulis selalu mendapat data sesudah tulis.
+# - append_rows & batch_update ke worksheet yang sama dalam JEDA_BATCH
+#   detik digabung jadi satu request (urutan panggilan dipertahankan).
+# - 429 diulang dengan backoff eksponensial (+ jitter) sampai COBA kali.
+#   5xx hanya diulang untuk baca & tulis yang idempoten (update,
+#   batch_update, clear): append_rows / delete_rows yang kena 5xx bisa saja
+#   sudah diterapkan, jadi tidak dikirim ulang. Error lain langsung
+#   diteruskan ke pemanggil.
+# - Hitungan request, gabungan, ulang dan waktu tunggu ada di metrik.
+
+PER_MENIT = int(os.environ.get("KASIR_SHEETS_PER_MENIT", "50"))
+KAPASITAS = int(os.environ.get("KASIR_SHEETS_LONJAKAN", "10"))
+JEDA_BATCH = 0.05
+COBA = 5
+
+_BACA = {"get_all_values", "get_all_records", "row_values", "col_values", "get", "batch_get",
+         "values_batch_get", "worksheet", "worksheets"}
+# tulis yang aman dikirim ulang setelah 5xx (menimpa nilai, bukan menambah / menggeser baris)
+_IDEMPOTEN = {"update", "batch_update", "batch_clear", "clear", "update_cell", "update_acell",
+              "values_update", "values_batch_update", "values_clear", "values_batch_clear"}
+# method yang hasilnya Worksheet: ikut dibungkus
+_WORKSHEET = {"worksheet", "worksheets", "add_worksheet"}
+
+
+def _status(error):
+    """Kode HTTP dari APIError gspread (None kalau bukan error HTTP)."""
+    kode = getattr(error, "code", None)
+    if isinstance(kode, int):
+        return kode
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _kunci_objek(objek):
+    return getattr(objek, "id", None) or getattr(objek, "title", None) or id(objek)
+
+
+class Penjadwal:
+    def __init__(self, per_menit=PER_MENIT, kapasitas=KAPASITAS, coba=COBA, jeda_batch=JEDA_BATCH,
+                 backoff=1.0, backoff_maks=32.0):
+        self.laju = per_menit / 60
+        self.kapasitas = kapasitas
+        self.coba = coba
+        self.jeda_batch = jeda_batch
+        self.backoff = backoff
+        self.backoff_maks = backoff_maks
+        self.lock = threading.Lock()
+        self._lock_token = threading.Lock()
+        self._token = float(kapasitas)
+        self._isi_terakhir = time.monotonic()
+        self._baca = {}    # kunci baca -> Future yang sedang berjalan
+        self._batch = {}   # kunci tulis -> {"data": [...], "future": Future}
+        self.metrik = {"request": 0, "baca digabung": 0, "tulis digabung": 0, "diulang": 0,
+                       "gagal": 0, "tunggu token (detik)": 0.0}
+
+    def _catat(self, nama, nilai=1):
+        with self.lock:
+            self.metrik[nama] += nilai
+
+    # ---------- token bucket ----------
+    def _ambil_token(self):
+        with self._lock_token:
+            while True:
+                sekarang = time.monotonic()
+                self._token = min(self.kapasitas, self._token + (sekarang - self._isi_terakhir) * self.laju)
+                self._isi_terakhir = sekarang
+                if self._token >= 1:
+                    self._token -= 1
+                    return
+                tunggu = (1 - self._token) / self.laju
+                self._catat("tunggu token (detik)", tunggu)
+                time.sleep(tunggu)
+
+    def _jalankan(self, fungsi, ulang_5xx=True):
+        for ke in range(self.coba):
+            self._ambil_token()
+            self._catat("request")
+            try:
+                return fungsi()
+            except Exception as e:
+                kode = _status(e)
+                if not (kode == 429 or (ulang_5xx and kode and 500 <= kode < 600)) or ke == self.coba - 1:
+                    self._catat("gagal")
+                    raise
+                self._catat("diulang")
+                time.sleep(min(self.backoff_maks, self.backoff * 2 ** ke) * random.uniform(0.5, 1.0))
+
+    # ---------- baca: gabung yang sedang berjalan ----------
+    def baca(self, kunci, fungsi, salin=True):
+        with self.lock:
+            future = self._baca.get(kunci)
+            pemimpin = future is None
+            if pemimpin:
+                future = self._baca[kunci] = Future()
+            else:
+                self.metrik["baca digabung"] += 1
+        if not pemimpin:
+            # hasil dipakai bersama; salinan supaya pemanggil bebas mengubahnya
+            return copy.deepcopy(future.result()) if salin else future.result()
+        try:
+            future.set_result(self._jalankan(fungsi))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                # bisa sudah dilepas (dan diganti baca baru) oleh _lepas_baca()
+                if self._baca.get(kunci) is future:
+                    del self._baca[kunci]
+        return future.result()
+
+    def _lepas_baca(self, objek):
+        """Setelah tulis ke `objek`: baca yang sedang berjalan untuknya tidak ditumpangi lagi.
+
+        Tulis ke worksheet melepas baca worksheet itu dan spreadsheet-nya;
+        tulis tingkat spreadsheet melepas semua baca.
+        """
+        induk = getattr(objek, "spreadsheet", None)
+        kena = None if induk is None else {_kunci_objek(objek), _kunci_objek(induk)}
+        with self.lock:
+            for kunci in [k for k in self._baca if kena is None or k[0] in kena]:
+                del self._baca[kunci]
+
+    # ---------- tulis: gabung dalam jendela JEDA_BATCH ----------
+    def tulis_batch(self, kunci, data, kirim, ulang_5xx=True):
+        """data = list item (baris / range update); kirim(list gabungan) dijalankan sekali per batch."""
+        with self.lock:
+            batch = self._batch.get(kunci)
+            pemimpin = batch is None
+            if pemimpin:
+                batch = self._batch[kunci] = {"data": [], "future": Future()}
+            else:
+                self.metrik["tulis digabung"] += 1
+            batch["data"].extend(data)
+        if pemimpin:
+            time.sleep(self.jeda_batch)
+            with self.lock:
+                del self._batch[kunci]
+            try:
+                batch["future"].set_result(self._jalankan(lambda: kirim(batch["data"]), ulang_5xx))
+            except Exception as e:
+                batch["future"].set_exception(e)
+        return batch["future"].result()
+
+    # ---------- panggilan gspread ----------
+    def panggil(self, objek, nama, *args, **kwargs):
+        method = getattr(objek, nama)
+        objek_kunci = _kunci_objek(objek)
+        if nama in _BACA:
+            kunci = (objek_kunci, nama, repr(args), repr(sorted(kwargs.items())))
+            hasil = self.baca(kunci, lambda: method(*args, **kwargs), salin=nama not in _WORKSHEET)
+        else:
+            try:
+                if nama in ("append_rows", "append_row"):
+                    baris = [args[0]] if nama == "append_row" else list(args[0])
+                    kunci = (objek_kunci, "append_rows", repr(sorted(kwargs.items())))
+                    hasil = self.tulis_batch(kunci, baris, lambda semua: objek.append_rows(semua, **kwargs),
+                                             ulang_5xx=False)
+                elif nama == "batch_update" and not kwargs and len(args) == 1:
+                    hasil = self.tulis_batch((objek_kunci, "batch_update"), list(args[0]), objek.batch_update)
+                else:
+                    hasil = self._jalankan(lambda: method(*args, **kwargs), ulang_5xx=nama in _IDEMPOTEN)
+            finally:
+                # juga saat gagal: tulis yang kena 5xx mungkin sudah diterapkan
+                self._lepas_baca(objek)
+        if nama in _WORKSHEET:
+            return [Terjadwal(w, self) for w in hasil] if isinstance(hasil, list) else Terjadwal(hasil, self)
+        return hasil
+
+
+class Terjadwal:
+    """Pembungkus Spreadsheet / Worksheet gspread: method dijalankan lewat penjadwal, atribut lain diteruskan."""
+
+    def __init__(self, asli, penjadwal):
+        self._asli = asli
+        self._penjadwal = penjadwal
+
+    def __getattr__(self, nama):
+        nilai = getattr(self._asli, nama)
+        if nama == "spreadsheet":
+            return Terjadwal(nilai, self._penjadwal)
+        if not callable(nilai):
+            return nilai
+        return lambda *args, **kwargs: self._penjadwal.panggil(self._asli, nama, *args, **kwargs)
+
+
+_penjadwal = None
+_lock_penjadwal = threading.Lock()
+
+
+def dapatkan():
+    """Satu penjadwal per server: kuota Sheets dihitung per akun, bukan per sesi."""
+    global _penjadwal
+    with _lock_penjadwal:
+        if _penjadwal is None:
+            _penjadwal = Penjadwal()
+        return _penjadwal
+
+
+def bungkus(spreadsheet):
+    return Terjadwal(spreadsheet, dapatkan())
+
+
+# ---------- tampilan streamlit ----------
+def tampilkan():
+    """Metrik penjadwal di sidebar."""
+    p = dapatkan()
+    with st.sidebar.expander("📶 Request Google Sheet", expanded=False):
+        with p.lock:
+            metrik = dict(p.metrik)
+        st.write(f"Batas: {p.laju * 60:.0f}/menit (+{p.kapasitas} lonjakan)")
+        for nama, nilai in metrik.items():
+            st.write(f"- {nama}: {nilai:,.1f}" if isinstance(nilai, float) else f"- {nama}: {nilai:,}")
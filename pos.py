@@ -0,0 +1,171 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+from transaksi import Keranjang
+
+# ================= POS CORE =================
+# State kasir dipegang satu objek Keranjang per sesi (st.session_state.cart);
+# Keranjang sendiri ada di transaksi.py (tanpa Streamlit, dipakai juga api.py).
+# Halaman Kasir dibagi menjadi fragment (katalog, keranjang, pembayaran):
+# klik di dalam satu fragment hanya merender ulang fragment itu, jadi edit
+# qty di keranjang tidak ikut merender ulang seluruh katalog produk.
+#
+# Perubahan yang memengaruhi bagian lain (tambah produk, checkout) memanggil
+# rerun_app() supaya semua fragment membaca state terbaru.
+
+# produk hotkey default, mis. KASIR_HOTKEY=SKU001,SKU002
+HOTKEY = [k.strip() for k in os.environ.get("KASIR_HOTKEY", "").split(",") if k.strip()]
+
+# st.fragment (Streamlit >= 1.37), st.experimental_fragment di versi lama
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+
+def rerun_app():
+    (getattr(st, "rerun", None) or st.experimental_rerun)()
+
+
+def keranjang(kunci, kolom_qty, kolom_harga, kolom_subtotal=None):
+    """Keranjang sesi ini (dibuat sekali per sesi di st.session_state.cart)."""
+    if not isinstance(st.session_state.get("cart"), Keranjang):
+        st.session_state.cart = Keranjang(kunci, kolom_qty, kolom_harga, kolom_subtotal)
+    return st.session_state.cart
+
+
+# ---------- tabel keranjang ----------
+def editor_keranjang(keranjang, kolom):
+    """Keranjang sebagai satu st.data_editor: qty bisa diubah, centang Hapus untuk membuang baris.
+
+    Perubahan dibaca dari diff data_editor (edited_rows) di callback dan
+    dipetakan ke ID baris keranjang, jadi hanya baris yang berubah yang
+    diterapkan. Key editor memuat versi keranjang: begitu isi keranjang
+    berubah, editor dibuat ulang dari data terbaru (posisi baris tidak basi).
+    """
+    qty = keranjang.kolom_qty
+    ids = list(keranjang.baris)
+    df = pd.DataFrame([{k: keranjang.baris[i].get(k) for k in kolom} for i in ids])
+    df["Subtotal"] = [keranjang.baris[i][keranjang.kolom_harga] * keranjang.baris[i][qty] for i in ids]
+    df["Hapus"] = False
+    key = f"editor_keranjang_{keranjang.versi}"
+
+    def terapkan():
+        for posisi, ubah in st.session_state[key].get("edited_rows", {}).items():
+            id_baris = ids[int(posisi)]
+            if ubah.get("Hapus"):
+                keranjang.hapus(id_baris)
+            elif ubah.get(qty):
+                keranjang.ubah_qty(id_baris, int(ubah[qty]))
+
+    st.data_editor(
+        df, key=key, on_change=terapkan, hide_index=True, use_container_width=True,
+        disabled=[c for c in df.columns if c not in (qty, "Hapus")],
+        column_config={qty: st.column_config.NumberColumn(qty, min_value=1, step=1)},
+    )
+
+
+# ---------- pesan antar rerun ----------
+def selesai(pesan):
+    """Simpan pesan sukses lalu rerun seluruh app (mis. setelah checkout)."""
+    st.session_state.pos_pesan = pesan
+    rerun_app()
+
+
+def tampilkan_pesan():
+    pesan = st.session_state.pop("pos_pesan", None)
+    if pesan:
+        st.success(pesan)
+    for error in st.session_state.pop("pos_error", []):
+        st.error(error)
+
+
+# ---------- input cepat ----------
+def parse_input_cepat(teks):
+    """Baris "SKU001*3", "SKU002", "SKU002" -> [("SKU001", 3), ("SKU002", 2)], daftar error.
+
+    Satu kode per baris (atau dipisah koma), opsional diikuti *qty. Kode yang
+    sama (mis. hasil scan berulang) dijumlahkan.
+    """
+    hasil = {}
+    error = []
+    for bagian in teks.replace(",", "\n").splitlines():
+        bagian = bagian.strip()
+        if not bagian:
+            continue
+        kode, _, qty = bagian.partition("*")
+        kode = kode.strip()
+        try:
+            qty = int(qty) if qty.strip() else 1
+        except ValueError:
+            error.append(f"Qty tidak valid: {bagian}")
+            continue
+        if qty <= 0:
+            error.append(f"Qty harus lebih dari 0: {bagian}")
+            continue
+        kode_asli, total = hasil.get(kode.lower(), (kode, 0))
+        hasil[kode.lower()] = (kode_asli, total + qty)
+    return list(hasil.values()), error
+
+
+def tambah_batch(keranjang, baris, indeks, buat_item, tersedia):
+    """Tambahkan banyak produk sekaligus: semua masuk atau tidak sama sekali.
+
+    indeks: kode (huruf kecil) -> produk; buat_item(produk) -> item keranjang;
+    tersedia(kunci) -> stok yang masih bisa dijual. Mengembalikan daftar error.
+    """
+    siap = []
+    error = []
+    butuh = {}
+    for kode, qty in baris:
+        produk = indeks.get(kode.lower())
+        if produk is None:
+            error.append(f"Kode tidak dikenal: {kode}")
+            continue
+        item = buat_item(produk)
+        kunci = keranjang._kunci(item)
+        butuh[kunci] = butuh.get(kunci, 0) + qty
+        if keranjang.qty(kunci) + butuh[kunci] > tersedia(kunci):
+            error.append(f"Stok {kode} tidak mencukupi")
+            continue
+        siap.append((item, qty))
+    if error:
+        return error
+    for item, qty in siap:
+        keranjang.tambah(item, qty)
+    return []
+
+
+def input_cepat(keranjang, produk, kolom_kode, buat_item, tersedia):
+    """Form input cepat (ketik / scan KODE*qty) dan tombol hotkey produk.
+
+    Panggil di luar fragment: perubahan diterapkan di callback, jadi satu
+    submit atau satu klik hotkey = satu rerun untuk seluruh batch.
+    """
+    indeks = {str(p[kolom_kode]).strip().lower(): p for p in produk}
+
+    def terapkan(baris, error=()):
+        error = list(error) or tambah_batch(keranjang, baris, indeks, buat_item, tersedia)
+        if error:
+            st.session_state.pos_error = error
+        elif baris:
+            st.session_state.pos_pesan = f"{sum(q for _, q in baris)} item ditambahkan ke keranjang"
+
+    def dari_form():
+        baris, error = parse_input_cepat(st.session_state.input_cepat)
+        terapkan(baris, error)
+        if not error:
+            st.session_state.input_cepat = ""
+
+    with st.expander("⚡ Input Cepat", expanded=True):
+        with st.form("form_input_cepat"):
+            st.text_area("Kode produk (satu per baris, KODE*qty untuk jumlah; bisa dari scanner)",
+                         key="input_cepat", height=80)
+            st.form_submit_button("Tambahkan ke Keranjang", on_click=dari_form)
+
+        pilihan = [str(p[kolom_kode]) for p in produk]
+        hotkey = st.multiselect("Produk hotkey", pilihan, default=[k for k in HOTKEY if k in pilihan], key="hotkey")
+        if hotkey:
+            cols = st.columns(min(len(hotkey), 6))
+            for i, kode in enumerate(hotkey):
+                cols[i % len(cols)].button(f"+1 {kode}", key=f"hotkey_{kode}",
+                                           on_click=terapkan, args=([(kode, 1)],))
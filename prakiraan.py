@@ -0,0 +1,185 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import profil
+
+# ================= PRAKIRAAN PENJUALAN =================
+# Semua hitungan memakai matriks qty harian [hari x produk] yang disusun
+# sekali dengan np.bincount (tanpa loop per baris / per produk):
+#
+# - rata-rata bergulir 7 & 28 hari dari selisih cumsum,
+# - musiman hari (Senin..Minggu) = rata-rata total per hari dalam minggu
+#   dibagi rata-rata total harian,
+# - prakiraan qty tiap hari ke depan = rata-rata 28 hari x faktor musiman,
+#   dan hari sampai stok habis = hari pertama cumsum prakiraan >= stok.
+#
+# Hanya hari yang sudah tutup (sebelum hari ini) yang dihitung, jadi hasil
+# cukup dihitung sekali per hari (cache per tanggal).
+
+HARI = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+
+
+def matriks_harian(df, kolom_waktu, kolom_kunci, kolom_qty, sampai):
+    """Qty per hari per produk sampai (tidak termasuk) tanggal `sampai`.
+
+    Mengembalikan (tanggal DatetimeIndex, daftar kunci, matriks float [hari x produk]).
+    Hari tanpa penjualan bernilai 0.
+    """
+    kolom_kunci = list(kolom_kunci) if isinstance(kolom_kunci, tuple) else [kolom_kunci]
+    hari = pd.to_datetime(df[kolom_waktu], errors="coerce").dt.normalize()
+    pilih = (hari.notna() & (hari < pd.Timestamp(sampai))).to_numpy()
+    if not pilih.any():
+        return pd.DatetimeIndex([]), [], np.zeros((0, 0))
+    hari = hari.to_numpy()[pilih]
+    qty = pd.to_numeric(df[kolom_qty], errors="coerce").fillna(0).to_numpy()[pilih]
+
+    if len(kolom_kunci) > 1:
+        kode, unik = pd.MultiIndex.from_frame(df.loc[pilih, kolom_kunci]).factorize()
+    else:
+        kode, unik = pd.factorize(df[kolom_kunci[0]].to_numpy()[pilih])
+    # baris tanpa kunci produk (kode -1) tidak dihitung
+    ada = kode >= 0
+    hari, qty, kode = hari[ada], qty[ada], kode[ada]
+    awal = hari.min()
+    indeks_hari = ((hari - awal) // np.timedelta64(1, "D")).astype(np.int64)
+    jumlah_hari = (np.datetime64(pd.Timestamp(sampai), "D") - awal.astype("datetime64[D]")).astype(np.int64)
+    jumlah_produk = len(unik)
+
+    matriks = np.bincount(
+        indeks_hari * jumlah_produk + kode, weights=qty, minlength=jumlah_hari * jumlah_produk,
+    ).reshape(jumlah_hari, jumlah_produk)
+    return pd.date_range(awal, periods=jumlah_hari, freq="D"), list(unik), matriks
+
+
+def rata_bergulir(matriks, jendela):
+    """Rata-rata `jendela` hari terakhir tiap baris (hari), per produk, lewat selisih cumsum."""
+    kumulatif = np.vstack([np.zeros((1, matriks.shape[1])), np.cumsum(matriks, axis=0)])
+    n = np.minimum(np.arange(1, len(matriks) + 1), jendela)
+    return (kumulatif[1:] - kumulatif[np.arange(1, len(matriks) + 1) - n]) / n[:, None]
+
+
+def musiman(tanggal, matriks, minggu=8):
+    """Faktor per hari dalam minggu (indeks 0 = Senin) dari total harian `minggu` minggu terakhir."""
+    total = matriks.sum(axis=1)[-minggu * 7:]
+    hari = tanggal.dayofweek.to_numpy()[-minggu * 7:]
+    rata = total.mean() if len(total) else 0
+    per_hari = np.bincount(hari, weights=total, minlength=7) / np.maximum(np.bincount(hari, minlength=7), 1)
+    if not rata:
+        return np.ones(7)
+    faktor = per_hari / rata
+    faktor[faktor == 0] = 1.0  # hari yang belum pernah ada datanya
+    return faktor
+
+
+def hitung(df, kolom_waktu, kolom_kunci, kolom_qty, hari_ini=None, jendela=28, horizon=90):
+    """Kecepatan jual, musiman dan prakiraan untuk semua produk sekaligus."""
+    hari_ini = hari_ini or date.today()
+    with profil.ukur("prakiraan: matriks harian"):
+        tanggal, kunci, matriks = matriks_harian(df, kolom_waktu, kolom_kunci, kolom_qty, hari_ini)
+    if not kunci:
+        return None
+    with profil.ukur("prakiraan: rolling & musiman"):
+        rata7 = rata_bergulir(matriks, 7)
+        rata28 = rata_bergulir(matriks, jendela)
+        faktor = musiman(tanggal, matriks)
+        hari_depan = (pd.Timestamp(hari_ini).dayofweek + np.arange(horizon)) % 7
+        # [horizon x produk]
+        ramalan = rata28[-1][None, :] * faktor[hari_depan][:, None]
+    return {
+        "tanggal": tanggal,
+        "kunci": kunci,
+        "harian": matriks,
+        "rata7": rata7,
+        "rata28": rata28,
+        "musiman": faktor,
+        "ramalan": ramalan,
+        "jendela": jendela,
+    }
+
+
+def hari_habis(hasil, stok):
+    """Hari sampai stok habis per produk (NaN kalau tidak habis dalam horizon). stok: array sejajar hasil["kunci"]."""
+    kumulatif = np.cumsum(hasil["ramalan"], axis=0)
+    habis = kumulatif >= np.asarray(stok, dtype=float)[None, :]
+    hari = habis.argmax(axis=0).astype(float) + 1
+    hari[~habis.any(axis=0)] = np.nan
+    hari[np.asarray(stok) <= 0] = 0
+    return hari
+
+
+def ringkasan(hasil, stok):
+    """Tabel per produk: rata-rata 7/28 hari, prakiraan 7 hari ke depan dan hari sampai stok habis."""
+    stok = np.array([stok(k) for k in hasil["kunci"]], dtype=float)
+    return pd.DataFrame({
+        "Produk": [" - ".join(map(str, k)) if isinstance(k, tuple) else k for k in hasil["kunci"]],
+        f"Terjual {hasil['jendela']} Hari": hasil["harian"][-hasil["jendela"]:].sum(axis=0).astype(int),
+        "Rata 7 Hari": hasil["rata7"][-1].round(2),
+        f"Rata {hasil['jendela']} Hari": hasil["rata28"][-1].round(2),
+        "Prakiraan 7 Hari": hasil["ramalan"][:7].sum(axis=0).round(1),
+        "Stok": stok.astype(int),
+        "Habis Dalam (hari)": hari_habis(hasil, stok),
+    }).sort_values("Habis Dalam (hari)", na_position="last")
+
+
+class _BelumAdaData(Exception):
+    """Dilempar dari hitung_harian supaya hasil kosong tidak ikut di-cache sampai besok."""
+
+
+@st.cache_data(max_entries=8, show_spinner="Menghitung prakiraan...")
+def hitung_harian(_muat, nama, hari_ini, kolom_waktu, kolom_kunci, kolom_qty):
+    """hitung() yang di-cache per app per tanggal; _muat() hanya dipanggil saat cache kosong."""
+    hasil = hitung(_muat(), kolom_waktu, kolom_kunci, kolom_qty, hari_ini)
+    if hasil is None:
+        raise _BelumAdaData
+    return hasil
+
+
+# ---------- tampilan streamlit ----------
+def halaman(muat, nama, kolom_waktu, kolom_kunci, kolom_qty, stok, siap=True):
+    """muat() -> DataFrame baris penjualan (setahun terakhir); stok(kunci) -> stok saat ini.
+
+    siap=False selama data penjualan belum berhasil dimuat (mis. sheet masih
+    menghubungkan): prakiraan tidak dihitung, jadi tidak ada hasil kosong yang di-cache.
+    """
+    st.title("📈 Prakiraan Penjualan")
+    if not siap:
+        st.info("Data penjualan belum dimuat (menghubungkan ke Google Sheet...).")
+        return
+    try:
+        hasil = hitung_harian(muat, nama, date.today(), kolom_waktu, kolom_kunci, kolom_qty)
+    except _BelumAdaData:
+        st.info("Belum ada data penjualan (hari yang sudah tutup).")
+        return
+    st.caption(f"Data {hasil['tanggal'][0]:%Y-%m-%d} s/d {hasil['tanggal'][-1]:%Y-%m-%d}, dihitung ulang sekali per hari.")
+
+    tabel = ringkasan(hasil, stok)
+    st.subheader("⏳ Hari Sampai Stok Habis")
+    st.dataframe(tabel, hide_index=True)
+
+    st.subheader("📅 Musiman Hari")
+    st.bar_chart(pd.DataFrame({"Faktor": hasil["musiman"]}, index=HARI))
+
+    st.subheader("📊 Rata-rata Bergulir")
+    produk = st.selectbox("Produk", ["Semua"] + list(tabel["Produk"]))
+    if produk == "Semua":
+        seri = pd.DataFrame({
+            "Harian": hasil["harian"].sum(axis=1),
+            "Rata 7 Hari": hasil["rata7"].sum(axis=1),
+            f"Rata {hasil['jendela']} Hari": hasil["rata28"].sum(axis=1),
+        }, index=hasil["tanggal"])
+    else:
+        i = tabel.index[tabel["Produk"] == produk][0]  # index tabel = kolom matriks
+        seri = pd.DataFrame({
+            "Harian": hasil["harian"][:, i],
+            "Rata 7 Hari": hasil["rata7"][:, i],
+            f"Rata {hasil['jendela']} Hari": hasil["rata28"][:, i],
+        }, index=hasil["tanggal"])
+    st.line_chart(seri.iloc[-120:])
+
+
+def setahun_lalu():
+    """Bulan (YYYY-MM) awal data prakiraan: 12 bulan terakhir."""
+    return (date.today() - timedelta(days=365)).strftime("%Y-%m")
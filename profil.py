@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+# ================= MODE UKUR WAKTU MUAT =================
+# Aktifkan dengan: KASIR_PROFIL=1 streamlit run bismillah.py
+# Hasil ukur tampil di sidebar (waktu import modul berat & total rerun).
+# Script app memanggil mulai() sebelum import lainnya lalu membungkus
+# import-nya dengan ukur(), jadi biaya import ikut terukur (nyata di rerun
+# pertama; rerun berikutnya modul sudah ada di sys.modules).
+AKTIF = os.environ.get("KASIR_PROFIL", "") == "1"
+
+# tiap sesi Streamlit jalan di thread sendiri, jadi catatan rerun disimpan per thread;
+# ukur() dari thread latar (mis. koneksi sheet) dicatat di _latar, bersama untuk semua sesi
+_lokal = threading.local()
+_latar = deque(maxlen=20)
+_lock_latar = threading.Lock()
+
+
+def mulai():
+    """Panggil di baris paling atas script (sebelum import lain), sekali per rerun."""
+    _lokal.catatan = []
+    _lokal.mulai = time.perf_counter()
+
+
+@contextmanager
+def ukur(label):
+    if not AKTIF:
+        yield
+        return
+    t0 = time.perf_counter()
+    modul_awal = len(sys.modules)
+    try:
+        yield
+    finally:
+        durasi = (time.perf_counter() - t0) * 1000
+        modul_baru = len(sys.modules) - modul_awal
+        catatan = getattr(_lokal, "catatan", None)
+        if catatan is not None:
+            catatan.append((label, round(durasi, 1), modul_baru))
+        else:
+            with _lock_latar:
+                _latar.append((threading.current_thread().name, label, round(durasi, 1), modul_baru))
+
+
+def tampilkan():
+    """Tampilkan hasil ukur di sidebar. Panggil di baris paling bawah script."""
+    if not AKTIF:
+        return
+    total = (time.perf_counter() - getattr(_lokal, "mulai", time.perf_counter())) * 1000
+    with st.sidebar.expander("⏱️ Waktu Muat", expanded=False):
+        st.write(f"Total rerun: {total:,.1f} ms")
+        for label, durasi, modul_baru in getattr(_lokal, "catatan", []):
+            st.write(f"- {label}: {durasi:,.1f} ms ({modul_baru} modul baru)")
+        with _lock_latar:
+            latar = list(_latar)
+        if latar:
+            st.write("Thread latar:")
+            for thread, label, durasi, modul_baru in latar:
+                st.write(f"- [{thread}] {label}: {durasi:,.1f} ms ({modul_baru} modul baru)")
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import threading
+import time
+
+import pandas as pd
+
+import sheet_mentah
+from inventaris import sel_a1
+
+# ================= SALINAN SHEET PENJUALAN =================
+# Sheet Penjualan hanya bertambah di bawah (append_rows), jadi tidak perlu
+# diunduh utuh tiap kali halaman laporan dibuka. SalinanSheet menyimpan
+# DataFrame lokal dan jumlah baris yang sudah tersinkron; muat() hanya
+# meminta header + rentang A{n+1}:<kolom terakhir>, yaitu baris terakhir
+# yang sudah dikenal ditambah baris-baris baru di bawahnya.
+#
+# - Baris terakhir yang dikenal ikut diminta sebagai penanda: kalau isinya
+#   berbeda (sheet ditulis ulang / baris dihapus) atau header berubah,
+#   salinan dimuat ulang penuh.
+# - Tiap VERIFIKASI_DETIK, muat() mengunduh seluruh sheet sekali dan
+#   mencocokkan checksum (sha1 semua baris) dengan checksum salinan, untuk
+#   menangkap perubahan di tengah sheet yang tidak terlihat dari ujungnya.
+# - Semua bacaan memakai nilai mentah (sheet_mentah.py); isi() menerima
+#   grid yang sudah diambil bersama worksheet lain dalam satu request.
+
+VERIFIKASI_DETIK = int(os.environ.get("KASIR_VERIFIKASI_PENJUALAN", "600"))
+
+
+def _header(baris):
+    # sel kosong di ujung kanan tidak dikirim oleh API Sheets
+    baris = [str(h) for h in baris]
+    while baris and baris[-1] == "":
+        baris.pop()
+    return baris
+
+
+class SalinanSheet:
+    def __init__(self, verifikasi_detik=VERIFIKASI_DETIK):
+        self.verifikasi_detik = verifikasi_detik
+        self.lock = threading.Lock()
+        self._kosongkan()
+
+    def _kosongkan(self):
+        self.header = None
+        self.jumlah = 0           # baris data yang sudah tersinkron (tanpa header)
+        self.df = pd.DataFrame()
+        self._terakhir = None     # baris data terakhir, penanda sheet tidak ditulis ulang
+        self._hash = hashlib.sha1()
+        self._verifikasi = 0.0
+
+    def _rapikan(self, baris):
+        lebar = len(self.header)
+        return (list(baris) + [""] * lebar)[:lebar]
+
+    def muat(self, sheet):
+        """Semua baris sheet sebagai DataFrame. DataFrame dipakai bersama semua sesi: jangan diubah di tempat."""
+        with self.lock:
+            if self.header is None or time.monotonic() - self._verifikasi >= self.verifikasi_detik:
+                self._verifikasi_penuh(sheet_mentah.grid(sheet))
+            else:
+                self._ambil_baru(sheet)
+            return self.df
+
+    def isi(self, nilai):
+        """Verifikasi penuh dari grid seluruh sheet (header + semua baris); dimuat ulang kalau checksum berbeda."""
+        with self.lock:
+            self._verifikasi_penuh(nilai)
+
+    def _ambil_baru(self, sheet):
+        kolom_akhir = sel_a1("", len(self.header)) or "A"
+        kepala, ujung = sheet_mentah.ambil_rentang(sheet, ["1:1", f"A{self.jumlah + 1}:{kolom_akhir}"])
+        if (
+            _header(kepala[0] if kepala else []) != self.header
+            or not ujung
+            or (self._rapikan(ujung[0]) != self._terakhir if self.jumlah else _header(ujung[0]) != self.header)
+        ):
+            self._verifikasi_penuh(sheet_mentah.grid(sheet))
+            return
+        self._tambah(ujung[1:])
+
+    def _verifikasi_penuh(self, nilai):
+        nilai = list(nilai)
+        while nilai and not any(v != "" for v in nilai[-1]):
+            nilai.pop()
+        header = _header(nilai[0]) if nilai else []
+        if header == self.header:
+            cek = hashlib.sha1()
+            for baris in nilai[1:]:
+                cek.update(self._teks(self._rapikan(baris)))
+            if len(nilai) - 1 == self.jumlah and cek.digest() == self._hash.digest():
+                self._verifikasi = time.monotonic()
+                return
+        self._kosongkan()
+        self.header = header
+        self._tambah(nilai[1:])
+        self._verifikasi = time.monotonic()
+
+    @staticmethod
+    def _teks(baris):
+        return ("\x1f".join(map(repr, baris)) + "\n").encode("utf-8")
+
+    def _tambah(self, baris_baru):
+        baris_baru = [self._rapikan(b) for b in baris_baru]
+        if not baris_baru or not self.header:
+            return
+        for baris in baris_baru:
+            self._hash.update(self._teks(baris))
+        baru = sheet_mentah.tabel(baris_baru, header=self.header)
+        self.df = pd.concat([self.df, baru], ignore_index=True) if self.jumlah else baru
+        self.jumlah += len(baris_baru)
+        self._terakhir = baris_baru[-1]
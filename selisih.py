@@ -0,0 +1,107 @@
+from inventaris import sel_a1
+from jurnal import tulis_ulang
+
+# ================= SIMPAN KATALOG PER BARIS =================
+# Tambah / Edit / Hapus Produk dulu menulis ulang seluruh sheet Produk
+# untuk perubahan satu baris. terapkan() membandingkan katalog sebelum
+# diubah dengan katalog baru per kunci (mis. Nama Produk) lalu hanya
+# mengirim yang berbeda:
+#
+# - baris yang berubah: satu batch_update berisi hanya sel yang berbeda
+#   dari katalog lama (range per blok kolom berurutan), jadi kolom yang
+#   tidak diedit (mis. Stock yang sudah berubah di sheet) tidak tertimpa,
+# - baris yang dihapus: delete_rows per blok baris, dari bawah ke atas,
+# - baris baru: satu append_rows.
+#
+# Posisi baris diambil dari kolom kunci di sheet saat itu (bukan urutan
+# lokal), jadi baris yang ditambah / dihapus terminal lain tidak membuat
+# baris yang salah tertimpa. Kalau header sheet berbeda atau kuncinya
+# tidak unik, seluruh sheet ditulis ulang seperti sebelumnya.
+
+
+def _teks(v):
+    return "" if v is None else str(v)
+
+
+def _per_kunci(baris, i_kunci):
+    """{kunci: baris}; None kalau ada kunci kosong / ganda."""
+    hasil = {}
+    for b in baris:
+        kunci = _teks(b[i_kunci])
+        if kunci == "" or kunci in hasil:
+            return None
+        hasil[kunci] = b
+    return hasil
+
+
+def _rentang_kolom(lama, baru):
+    """Indeks kolom yang berbeda -> blok berurutan (awal, akhir), 0-based."""
+    blok = []
+    for j, (a, b) in enumerate(zip(lama, baru)):
+        if a == b:
+            continue
+        if blok and blok[-1][1] == j - 1:
+            blok[-1][1] = j
+        else:
+            blok.append([j, j])
+    return blok
+
+
+def _blok(nomor):
+    """Nomor baris (urut naik) -> blok berurutan (awal, akhir), dari blok paling bawah."""
+    blok = []
+    for n in nomor:
+        if blok and blok[-1][1] == n - 1:
+            blok[-1][1] = n
+        else:
+            blok.append([n, n])
+    return [tuple(b) for b in reversed(blok)]
+
+
+def terapkan(sheet, values, lama, kolom_kunci):
+    """values = [header] + baris katalog baru; lama = records katalog sebelum diubah.
+
+    Mengembalikan jumlah baris {"ditambah", "diubah", "dihapus"}, atau None
+    kalau seluruh sheet ditulis ulang.
+    """
+    header = [_teks(h) for h in values[0]]
+    header_sheet = [_teks(h) for h in sheet.row_values(1)]
+    while header_sheet and header_sheet[-1] == "":
+        header_sheet.pop()
+    baru = _per_kunci(values[1:], header.index(kolom_kunci)) if kolom_kunci in header else None
+    if header_sheet != header or baru is None:
+        tulis_ulang(sheet, values)
+        return None
+    i_kunci = header.index(kolom_kunci)
+
+    posisi = {}
+    for i, kunci in enumerate(sheet.col_values(i_kunci + 1)[1:], start=2):
+        if kunci == "":
+            continue
+        if kunci in posisi:
+            tulis_ulang(sheet, values)
+            return None
+        posisi[kunci] = i
+    lama = {_teks(p.get(kolom_kunci)): [_teks(p.get(h)) for h in header] for p in lama}
+
+    ubah, tambah, diubah = [], [], 0
+    for kunci, baris in baru.items():
+        if kunci not in posisi:
+            tambah.append(baris)
+            continue
+        n = posisi[kunci]
+        # baris yang tidak dikenal katalog lama ditulis utuh; selain itu hanya sel yang berubah
+        blok = _rentang_kolom(lama[kunci], [_teks(v) for v in baris]) if kunci in lama else [[0, len(header) - 1]]
+        for awal, akhir in blok:
+            ubah.append({"range": f"{sel_a1(n, awal + 1)}:{sel_a1(n, akhir + 1)}", "values": [list(baris[awal:akhir + 1])]})
+        diubah += bool(blok)
+    hapus = sorted(posisi[k] for k in lama if k not in baru and k in posisi)
+
+    # urutan: ubah dulu (posisi masih sesuai), hapus dari bawah, baru tambah di akhir
+    if ubah:
+        sheet.batch_update(ubah)
+    for awal, akhir in _blok(hapus):
+        sheet.delete_rows(awal, akhir)
+    if tambah:
+        sheet.append_rows(tambah)
+    return {"ditambah": len(tambah), "diubah": diubah, "dihapus": len(hapus)}
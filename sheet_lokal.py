@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import threading
+
+# ================= GOOGLE SHEET LOKAL (FAKE) =================
+# Pengganti gspread untuk uji coba tanpa internet. Isi semua worksheet
+# disimpan di satu file JSON. Hanya method yang dipakai app yang dibuat.
+# Aktifkan dengan: KASIR_SHEET_LOKAL=data_lokal/sheet_lokal.json
+
+PATH = os.environ.get("KASIR_SHEET_LOKAL", "")
+
+
+class WorksheetNotFound(Exception):
+    pass
+
+
+def _kolom(huruf):
+    col = 0
+    for h in huruf:
+        col = col * 26 + ord(h) - 64
+    return col
+
+
+def _parse_range(a1):
+    """'Produk'!B2:C3 -> ('Produk', (2, 2), (3, 3)). Judul None kalau tidak ada."""
+    judul = None
+    if "!" in a1:
+        judul, a1 = a1.rsplit("!", 1)
+        judul = judul.strip("'")
+    bagian = a1.split(":")
+    hasil = []
+    for b in bagian:
+        m = re.fullmatch(r"([A-Z]*)(\d*)", b)
+        col = _kolom(m.group(1)) if m.group(1) else None
+        row = int(m.group(2)) if m.group(2) else None
+        hasil.append((row, col))
+    awal = hasil[0]
+    akhir = hasil[1] if len(hasil) > 1 else awal
+    return judul, awal, akhir
+
+
+def _angka(v):
+    if isinstance(v, str):
+        try:
+            return int(v)
+        except ValueError:
+            try:
+                return float(v)
+            except ValueError:
+                return v
+    return v
+
+
+class Worksheet:
+    def __init__(self, spreadsheet, title):
+        self.spreadsheet = spreadsheet
+        self.title = title
+
+    @property
+    def _rows(self):
+        return self.spreadsheet._data[self.title]
+
+    # ---------- baca ----------
+    def get_all_values(self):
+        with self.spreadsheet.lock:
+            return [["" if v is None else str(v) for v in r] for r in self._rows]
+
+    def get_all_records(self):
+        with self.spreadsheet.lock:
+            if not self._rows:
+                return []
+            header = self._rows[0]
+            return [
+                {h: _angka(r[i]) if i < len(r) else "" for i, h in enumerate(header)}
+                for r in self._rows[1:]
+            ]
+
+    def row_values(self, row):
+        nilai = self.get_all_values()
+        return nilai[row - 1] if row <= len(nilai) else []
+
+    def col_values(self, col):
+        return [r[col - 1] if col <= len(r) else "" for r in self.get_all_values()]
+
+    def get(self, range_name, **kwargs):
+        return self.batch_get([range_name], **kwargs)[0]
+
+    def batch_get(self, ranges, value_render_option=None, **kwargs):
+        mentah = value_render_option == "UNFORMATTED_VALUE"
+        with self.spreadsheet.lock:
+            return [self._baca(r, mentah) for r in ranges]
+
+    def _baca(self, a1, mentah=False):
+        # seperti API Sheets: sel kosong di ujung baris & baris kosong di ujung rentang tidak dikirim.
+        # Nilai "mentah" = nilai yang tersimpan apa adanya (file lokal tidak punya format tampilan).
+        _, (row1, col1), (row2, col2) = _parse_range(a1)
+        hasil = []
+        for r in self._rows[(row1 or 1) - 1:row2]:
+            baris = ["" if v is None else v if mentah else str(v) for v in r[(col1 or 1) - 1:col2]]
+            while baris and baris[-1] == "":
+                baris.pop()
+            hasil.append(baris)
+        while hasil and not hasil[-1]:
+            hasil.pop()
+        return hasil
+
+    # ---------- tulis ----------
+    def clear(self):
+        with self.spreadsheet.lock:
+            self._rows.clear()
+            self.spreadsheet._simpan()
+
+    def update(self, values, range_name="A1"):
+        if isinstance(values, str):  # gaya lama: update(range, values)
+            values, range_name = range_name, values
+        with self.spreadsheet.lock:
+            self._tulis(range_name, values)
+            self.spreadsheet._simpan()
+
+    def batch_update(self, data):
+        with self.spreadsheet.lock:
+            for d in data:
+                self._tulis(d["range"], d["values"])
+            self.spreadsheet._simpan()
+
+    def batch_clear(self, ranges):
+        with self.spreadsheet.lock:
+            for a1 in ranges:
+                _, (row1, col1), (row2, col2) = _parse_range(a1)
+                for baris in self._rows[(row1 or 1) - 1:row2]:
+                    for j in range((col1 or 1) - 1, min(col2 or len(baris), len(baris))):
+                        baris[j] = ""
+            # seperti API Sheets: baris / sel kosong di ujung tidak ikut terbaca
+            for baris in self._rows:
+                while baris and baris[-1] == "":
+                    baris.pop()
+            while self._rows and not self._rows[-1]:
+                self._rows.pop()
+            self.spreadsheet._simpan()
+
+    def delete_rows(self, start_index, end_index=None):
+        with self.spreadsheet.lock:
+            del self._rows[start_index - 1:end_index or start_index]
+            self.spreadsheet._simpan()
+
+    def append_row(self, row):
+        self.append_rows([row])
+
+    def append_rows(self, rows, **kwargs):
+        with self.spreadsheet.lock:
+            self._rows.extend([list(r) for r in rows])
+            self.spreadsheet._simpan()
+
+    def _tulis(self, a1, values):
+        _, (row, col), _ = _parse_range(a1)
+        row, col = row or 1, col or 1
+        for i, nilai_baris in enumerate(values):
+            while len(self._rows) < row + i:
+                self._rows.append([])
+            baris = self._rows[row + i - 1]
+            for j, v in enumerate(nilai_baris):
+                while len(baris) < col + j:
+                    baris.append("")
+                baris[col + j - 1] = v
+
+
+class Spreadsheet:
+    def __init__(self, path=PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self._data = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._data = json.load(f)
+
+    def _simpan(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f)
+        os.replace(tmp, self.path)
+
+    def worksheets(self):
+        return [Worksheet(self, t) for t in self._data]
+
+    def worksheet(self, title):
+        if title not in self._data:
+            raise WorksheetNotFound(title)
+        return Worksheet(self, title)
+
+    def add_worksheet(self, title, rows=1000, cols=26):
+        with self.lock:
+            self._data.setdefault(title, [])
+            self._simpan()
+        return Worksheet(self, title)
+
+    def values_batch_get(self, ranges, params=None):
+        mentah = (params or {}).get("valueRenderOption") == "UNFORMATTED_VALUE"
+        hasil = []
+        with self.lock:
+            for r in ranges:
+                if "!" not in r:  # rentang berupa judul worksheet saja = seluruh isi worksheet
+                    r = r + "!A1:ZZZ"
+                judul, _, _ = _parse_range(r)
+                judul = judul.strip("'").replace("''", "'")
+                hasil.append({"range": r, "values": self.worksheet(judul)._baca(r.rsplit("!", 1)[1], mentah)})
+        return {"valueRanges": hasil}
+
+    def values_batch_update(self, body):
+        with self.lock:
+            for d in body["data"]:
+                judul, _, _ = _parse_range(d["range"])
+                self.worksheet(judul)._tulis(d["range"], d["values"])
+            self._simpan()
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+# ================= BACA SHEET MENTAH =================
+# get_all_records() meminta nilai yang sudah diformat (teks), lalu gspread
+# mengubah tiap sel kembali jadi angka dan membuat satu dict per baris;
+# pandas kemudian menebak tipe lagi dari dict-dict itu. Di sini nilai
+# diminta mentah (UNFORMATTED_VALUE: angka sudah berupa int / float,
+# tanggal tetap teks), beberapa worksheet sekaligus dalam satu
+# values_batch_get, dan kolom DataFrame dibangun langsung per kolom dari
+# grid, dipetakan lewat header.
+
+OPSI = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"}
+
+
+def ambil(spreadsheet, *judul):
+    """Grid nilai mentah (baris pertama = header) tiap worksheet `judul`, dalam satu request."""
+    hasil = spreadsheet.values_batch_get(["'" + j.replace("'", "''") + "'" for j in judul], params=OPSI)
+    return [r.get("values", []) for r in hasil["valueRanges"]]
+
+
+def grid(sheet):
+    return ambil(sheet.spreadsheet, sheet.title)[0]
+
+
+def ambil_rentang(sheet, ranges):
+    """Beberapa rentang A1 satu worksheet (satu request), nilai mentah seperti ambil()."""
+    return sheet.batch_get(ranges, value_render_option=OPSI["valueRenderOption"],
+                           date_time_render_option=OPSI["dateTimeRenderOption"])
+
+
+def _kolom(isi):
+    # sel kosong dikirim sebagai "", jadi kolom dengan sel kosong tetap object (sama seperti get_all_records)
+    jenis = set(map(type, isi))
+    if jenis <= {int}:
+        return np.array(isi, dtype=np.int64)
+    if jenis <= {int, float}:
+        return np.array(isi, dtype=float)
+    return pd.array(isi, dtype=object)
+
+
+def tabel(nilai, kolom=None, header=None):
+    """Grid -> DataFrame bertipe. Tanpa `header`, baris pertama grid dipakai sebagai header.
+
+    kolom = nama kolom yang diambil (urutannya); kolom yang tidak ada di header diisi "".
+    """
+    if header is None:
+        header, nilai = ([str(h) for h in nilai[0]], nilai[1:]) if nilai else ([], [])
+    posisi = {}
+    for i, h in enumerate(header):
+        if h != "":
+            posisi.setdefault(h, i)
+    kolom = list(posisi) if kolom is None else list(kolom)
+    data = {}
+    for k in kolom:
+        i = posisi.get(k)
+        data[k] = _kolom([r[i] if i is not None and i < len(r) else "" for r in nilai])
+    return pd.DataFrame(data, columns=kolom)
+
+
+def records(nilai):
+    """Grid -> list dict per baris, pengganti get_all_records() untuk Inventaris.muat()."""
+    if not nilai:
+        return []
+    header = [str(h) for h in nilai[0]]
+    lebar = len(header)
+    kosong = [""] * lebar
+    return [dict(zip(header, r if len(r) >= lebar else [*r, *kosong[len(r):]])) for r in nilai[1:]]
+
+
+def baca_records(sheet):
+    return records(grid(sheet))
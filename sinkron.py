@@ -0,0 +1,197 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+from inventaris import parse_int, sel_a1
+
+# ================= SINKRON MULTI-TERMINAL =================
+# Mode sinkron (KASIR_SINKRON=1): tiap terminal tidak lagi menulis kolom
+# Stock langsung, tapi mencatat perubahan stok sebagai delta (+/-) ke
+# worksheet "Delta", masing-masing diberi ID terminal dan nomor urut (Seq).
+#
+# Penggabungan (gabung) menerapkan delta ke worksheet "Produk" dan mencatat
+# Seq terakhir per terminal di worksheet "Sinkron". Update stok dan
+# watermark dikirim dalam satu values_batch_update, jadi menjalankan
+# gabung berulang kali tidak pernah menerapkan delta yang sama dua kali.
+# Jalankan gabung hanya di satu terminal utama (KASIR_SINKRON_UTAMA=1).
+
+AKTIF = os.environ.get("KASIR_SINKRON", "") == "1"
+UTAMA = os.environ.get("KASIR_SINKRON_UTAMA", "") == "1"
+TERMINAL_ID = os.environ.get("KASIR_TERMINAL") or f"{socket.gethostname()}-{os.getpid()}"
+
+HEADER_DELTA = ["Terminal", "Seq", "Kunci", "Delta", "Waktu", "Ref"]
+HEADER_WATERMARK = ["Terminal", "Seq Terakhir"]
+
+
+def buka_worksheet(spreadsheet, nama, header):
+    try:
+        return spreadsheet.worksheet(nama)
+    except Exception:
+        ws = spreadsheet.add_worksheet(nama, rows=1000, cols=len(header))
+        ws.append_row(header)
+        return ws
+
+
+class Sinkron:
+    def __init__(self, spreadsheet, sheet_produk, kolom_kunci, kolom_stok, terminal=TERMINAL_ID):
+        self.spreadsheet = spreadsheet
+        self.sheet_produk = sheet_produk
+        self.sheet_delta = buka_worksheet(spreadsheet, "Delta", HEADER_DELTA)
+        self.sheet_watermark = buka_worksheet(spreadsheet, "Sinkron", HEADER_WATERMARK)
+        self.kolom_kunci = kolom_kunci
+        self.kolom_stok = kolom_stok
+        self.terminal = terminal
+        self.lock = threading.Lock()
+        self.tertunda = {}  # seq -> (kunci, delta) milik terminal ini yang belum digabung
+        self.error_terakhir = None
+        self._thread = None
+        self.seq = max(
+            (int(r[1]) for r in self.sheet_delta.get_all_values()[1:] if r and r[0] == terminal),
+            default=0,
+        )
+
+    # ---------- catat delta ----------
+    def catat(self, items, ref=None):
+        """items: list (kunci, delta). Delta negatif = stok berkurang.
+
+        ref (mis. ID entri ledger offline) ditulis di kolom Ref tiap baris, dalam
+        append yang sama; kalau ref itu sudah ada di sheet Delta, tidak ada yang
+        dicatat. Mengembalikan False kalau dilewati.
+        """
+        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.lock:
+            if ref is not None and ref in self.sheet_delta.col_values(HEADER_DELTA.index("Ref") + 1)[1:]:
+                return False
+            seq_awal = self.seq
+            rows = []
+            for kunci, delta in items:
+                if delta == 0:
+                    continue
+                self.seq += 1
+                rows.append([self.terminal, self.seq, kunci, int(delta), waktu] + ([ref] if ref is not None else []))
+            if not rows:
+                return True
+            try:
+                self.sheet_delta.append_rows(rows)
+            except Exception:
+                self.seq = seq_awal
+                raise
+            for row in rows:
+                self.tertunda[row[1]] = (row[2], row[3])
+        return True
+
+    def watermark(self):
+        return {r[0]: parse_int(r[1]) for r in self.sheet_watermark.get_all_values()[1:] if r}
+
+    # ---------- gabung delta ke Produk ----------
+    def gabung(self):
+        """Terapkan delta baru ke sheet Produk. Mengembalikan jumlah delta yang diterapkan."""
+        baris_wm = self.sheet_watermark.get_all_values()[1:]
+        wm = {r[0]: parse_int(r[1]) for r in baris_wm if r}
+
+        per_kunci = {}
+        wm_baru = dict(wm)
+        dilihat = set()
+        for r in self.sheet_delta.get_all_values()[1:]:
+            if not r:
+                continue
+            terminal, seq = r[0], parse_int(r[1])
+            if seq <= wm.get(terminal, 0) or (terminal, seq) in dilihat:
+                continue
+            dilihat.add((terminal, seq))
+            per_kunci[r[2]] = per_kunci.get(r[2], 0) + parse_int(r[3])
+            wm_baru[terminal] = max(wm_baru.get(terminal, 0), seq)
+        if not dilihat:
+            return 0
+
+        header = self.sheet_produk.row_values(1)
+        col_kunci = header.index(self.kolom_kunci) + 1
+        col_stok = header.index(self.kolom_stok) + 1
+        nilai_kunci = self.sheet_produk.col_values(col_kunci)[1:]
+        nilai_stok = self.sheet_produk.col_values(col_stok)[1:]
+
+        judul_produk = self.sheet_produk.title
+        data = []
+        for kunci, delta in per_kunci.items():
+            if kunci not in nilai_kunci:
+                continue  # produk sudah dihapus
+            baris = nilai_kunci.index(kunci)
+            stok = parse_int(nilai_stok[baris]) if baris < len(nilai_stok) else 0
+            data.append({"range": f"'{judul_produk}'!{sel_a1(baris + 2, col_stok)}", "values": [[stok + delta]]})
+
+        judul_wm = self.sheet_watermark.title
+        urutan_wm = [r[0] for r in baris_wm if r]
+        for terminal, seq in wm_baru.items():
+            if wm.get(terminal) == seq:
+                continue
+            if terminal not in urutan_wm:
+                urutan_wm.append(terminal)
+            baris = urutan_wm.index(terminal) + 2
+            data.append({"range": f"'{judul_wm}'!A{baris}:B{baris}", "values": [[terminal, seq]]})
+
+        self.spreadsheet.values_batch_update({"valueInputOption": "RAW", "data": data})
+        return len(dilihat)
+
+    # ---------- muat ulang inventaris ----------
+    def segarkan(self, inv, records):
+        """Muat ulang inventaris dari sheet, ditambah delta terminal ini yang belum digabung.
+
+        records harus dibaca SEBELUM watermark: kalau gabung terjadi di antaranya,
+        stok sementara terhitung kurang (aman), bukan lebih (bisa oversell).
+        """
+        sudah = self.watermark().get(self.terminal, 0)
+        with self.lock:
+            for seq in [s for s in self.tertunda if s <= sudah]:
+                del self.tertunda[seq]
+            tertunda = list(self.tertunda.values())
+
+        indeks = {r[self.kolom_kunci]: r for r in records}
+        for kunci, delta in tertunda:
+            if kunci in indeks:
+                indeks[kunci][self.kolom_stok] = parse_int(indeks[kunci][self.kolom_stok]) + delta
+        inv.muat(records)
+
+    def mulai_otomatis(self, inv, load_records, interval=30, utama=UTAMA):
+        """Thread latar: gabung (kalau terminal utama) lalu segarkan inventaris tiap interval detik."""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if utama:
+                        self.gabung()
+                    self.segarkan(inv, load_records())
+                    self.error_terakhir = None
+                except Exception as e:
+                    self.error_terakhir = e
+
+        self._thread = threading.Thread(target=loop, name="kasir-sinkron", daemon=True)
+        self._thread.start()
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def dapatkan(spreadsheet, sheet_produk, kolom_kunci, kolom_stok):
+    """Satu objek Sinkron per proses, bisa dipanggil dari script maupun thread latar."""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = Sinkron(spreadsheet, sheet_produk, kolom_kunci, kolom_stok)
+        return _instance
+
+
+def checkout_delta(sinkron, inv, items):
+    """Reserve stok lokal, catat delta negatif ke sheet Delta, lalu commit."""
+    rid = inv.reserve(items)
+    try:
+        sinkron.catat([(key, -qty) for key, qty in inv.isi_reservasi(rid).items()])
+    except Exception:
+        inv.release(rid)
+        raise
+    return inv.commit(rid)
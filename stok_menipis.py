@@ -0,0 +1,339 @@
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit as st
+
+# ================= STOK MENIPIS =================
+# Monitor dipasang ke Inventaris (inventaris.pengamat). Tiap checkout /
+# tambah / edit / hapus produk mengabari kunci yang berubah, jadi monitor
+# cukup memperbarui produk itu saja, bukan memindai seluruh katalog tiap
+# rerun. Hanya muat ulang katalog (dari sheet) yang membangun ulang semua.
+#
+# - Batas stok per produk (default BATAS_DEFAULT) disimpan di data_lokal.
+# - Min-heap (stok - batas) menyimpan produk yang paling dekat habis di
+#   puncak. Entri lama tidak dihapus dari heap, cukup dilewati saat dibaca
+#   (nomor entri tidak cocok lagi), dan heap dipadatkan kalau sudah gemuk.
+# - Heap & himpunan stok rendah dipartisi per owner (seperti Inventaris),
+#   jadi tampilan satu owner hanya membaca partisi owner itu.
+# - Kecepatan jual = total qty per produk dalam `hari` hari terakhir:
+#   ditambah tiap checkout, dikurangi saat satu hari keluar dari jendela.
+
+FOLDER = os.environ.get("KASIR_DATA_LOKAL", "data_lokal")
+BATAS_DEFAULT = int(os.environ.get("KASIR_BATAS_STOK", "5"))
+
+
+class Kecepatan:
+    """Total qty terjual per produk dalam jendela `hari` hari terakhir."""
+
+    def __init__(self, hari=14):
+        self.hari = hari
+        self._harian = {}   # kunci -> {tanggal: qty}
+        self._jumlah = {}   # kunci -> total qty dalam jendela
+        self._keluar = []   # heap (tanggal, urutan, kunci) untuk hari yang akan keluar jendela
+        self._urutan = itertools.count()
+
+    def _awal(self):
+        return date.today() - timedelta(days=self.hari - 1)
+
+    def catat(self, kunci, qty, tanggal=None):
+        tanggal = tanggal or date.today()
+        if tanggal < self._awal():
+            return
+        harian = self._harian.setdefault(kunci, {})
+        if tanggal not in harian:
+            harian[tanggal] = 0
+            heapq.heappush(self._keluar, (tanggal, next(self._urutan), kunci))
+        harian[tanggal] += qty
+        self._jumlah[kunci] = self._jumlah.get(kunci, 0) + qty
+
+    def _geser(self):
+        awal = self._awal()
+        while self._keluar and self._keluar[0][0] < awal:
+            tanggal, _, kunci = heapq.heappop(self._keluar)
+            self._jumlah[kunci] -= self._harian[kunci].pop(tanggal)
+            if not self._harian[kunci]:
+                del self._harian[kunci]
+                del self._jumlah[kunci]
+
+    def per_hari(self, kunci):
+        self._geser()
+        return self._jumlah.get(kunci, 0) / self.hari
+
+    def laku(self, di=None):
+        """Kunci produk yang terjual dalam jendela (opsional hanya di antara kunci `di`)."""
+        self._geser()
+        if di is None:
+            return list(self._jumlah)
+        return [k for k in di if k in self._jumlah]
+
+
+def _teks(kunci):
+    return json.dumps(list(kunci) if isinstance(kunci, tuple) else kunci)
+
+
+def _dari_teks(teks):
+    kunci = json.loads(teks)
+    return tuple(kunci) if isinstance(kunci, list) else kunci
+
+
+class StokMenipis:
+    def __init__(self, inventaris, nama, kolom, hari=14, batas_default=BATAS_DEFAULT):
+        # kolom: kolom produk yang ditampilkan di daftar & laporan (mis. ["SKU", "Nama"])
+        self.inv = inventaris
+        self.kolom = kolom
+        self.path = os.path.join(FOLDER, f"batas_stok_{nama}.json")
+        self.batas_default = batas_default
+        self.kecepatan = Kecepatan(hari)
+        self.lock = threading.Lock()
+        self._batas = self._muat_batas()
+        self._entri = {}      # kunci -> (stok - batas, nomor entri di heap, owner)
+        self._anggota = {}    # owner -> {kunci}
+        self._heap = {}       # owner -> heap (stok - batas, nomor, kunci)
+        self._rendah = {}     # owner -> {kunci dengan stok <= batas}
+        self._nomor = itertools.count()
+        # urutan lock sama dengan saat dikabari: inventaris dulu, baru monitor
+        with inventaris.lock, self.lock:
+            self._bangun()
+            inventaris.pengamat.append(self._kabar)
+
+    # ---------- batas ----------
+    def _muat_batas(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            return {_dari_teks(k): v for k, v in json.load(f).items()}
+
+    def batas(self, kunci):
+        return self._batas.get(kunci, self.batas_default)
+
+    def atur_batas(self, kunci, batas):
+        with self.inv.lock, self.lock:
+            self._batas[kunci] = int(batas)
+            os.makedirs(FOLDER, exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({_teks(k): v for k, v in self._batas.items()}, f)
+            os.replace(tmp, self.path)
+            self._perbarui(kunci)
+
+    # ---------- pembaruan dari inventaris ----------
+    def _kabar(self, keys, terjual):
+        with self.lock:
+            for kunci, qty in terjual.items():
+                self.kecepatan.catat(kunci, qty)
+            if keys is None:
+                self._bangun()
+            else:
+                for kunci in keys:
+                    self._perbarui(kunci)
+
+    def _owner(self, p):
+        return p.get(self.inv.kolom_owner) if self.inv.kolom_owner else None
+
+    def _bagian(self, owner):
+        """Partisi yang dibaca untuk `owner` (None = semua owner)."""
+        if owner is None or not self.inv.kolom_owner:
+            return list(self._heap)
+        return [owner] if owner in self._heap else []
+
+    def _padatkan(self, owner):
+        heap = [(self._entri[k][0], self._entri[k][1], k) for k in self._anggota[owner]]
+        heapq.heapify(heap)
+        self._heap[owner] = heap
+
+    def _bangun(self):
+        self._entri, self._anggota, self._rendah = {}, {}, {}
+        for p in self.inv.produk:
+            kunci = self.inv.kunci_dari(p)
+            owner = self._owner(p)
+            selisih = self.inv.stok(kunci) - self.batas(kunci)
+            self._entri[kunci] = (selisih, next(self._nomor), owner)
+            self._anggota.setdefault(owner, set()).add(kunci)
+            rendah = self._rendah.setdefault(owner, set())
+            if selisih <= 0:
+                rendah.add(kunci)
+        self._heap = {}
+        for owner in self._anggota:
+            self._padatkan(owner)
+
+    def _lepas(self, kunci, owner):
+        self._anggota[owner].discard(kunci)
+        self._rendah[owner].discard(kunci)
+        if not self._anggota[owner]:
+            del self._anggota[owner], self._rendah[owner], self._heap[owner]
+
+    def _perbarui(self, kunci):
+        p = self.inv.cari(kunci)
+        lama = self._entri.get(kunci)
+        if p is None:
+            if lama is not None:
+                del self._entri[kunci]
+                self._lepas(kunci, lama[2])
+            return
+        owner = self._owner(p)
+        selisih = self.inv.stok(kunci) - self.batas(kunci)
+        if lama is not None and lama[0] == selisih and lama[2] == owner:
+            return
+        if lama is not None and lama[2] != owner:
+            self._lepas(kunci, lama[2])
+        nomor = next(self._nomor)
+        self._entri[kunci] = (selisih, nomor, owner)
+        self._anggota.setdefault(owner, set()).add(kunci)
+        heap = self._heap.setdefault(owner, [])
+        rendah = self._rendah.setdefault(owner, set())
+        heapq.heappush(heap, (selisih, nomor, kunci))
+        if selisih <= 0:
+            rendah.add(kunci)
+        else:
+            rendah.discard(kunci)
+        if len(heap) > 2 * len(self._anggota[owner]) + 64:
+            self._padatkan(owner)
+
+    # ---------- baca ----------
+    def jumlah(self):
+        return sum(len(r) for r in self._rendah.values())
+
+    def rendah(self, kunci):
+        entri = self._entri.get(kunci)
+        return entri is not None and entri[0] <= 0
+
+    def _baris(self, kunci, p):
+        return {
+            **{k: p.get(k) for k in self.kolom},
+            "Stok": self.inv.stok(kunci),
+            "Batas": self.batas(kunci),
+        }
+
+    def menipis(self, owner=None):
+        """Produk dengan stok <= batas, yang paling dekat habis lebih dulu.
+
+        Hanya entri di puncak heap partisi owner itu yang dibaca (sampai
+        stok > batas), lalu dikembalikan lagi ke heap.
+        """
+        ketemu = []
+        with self.lock:
+            for bagian in self._bagian(owner):
+                heap = self._heap[bagian]
+                diambil = []
+                while heap and heap[0][0] <= 0:
+                    entri = heapq.heappop(heap)
+                    selisih, nomor, kunci = entri
+                    if self._entri.get(kunci, ())[:2] != (selisih, nomor):
+                        continue  # entri lama
+                    diambil.append(entri)
+                    p = self.inv.cari(kunci)
+                    if p is not None:
+                        ketemu.append((selisih, nomor, self._baris(kunci, p)))
+                for entri in diambil:
+                    heapq.heappush(heap, entri)
+        ketemu.sort(key=lambda e: e[:2])
+        return [baris for _, _, baris in ketemu]
+
+    def reorder(self, owner=None, lead_hari=3, cover_hari=14):
+        """Saran order ulang dari kecepatan jual: stok harus cukup untuk lead time + cover_hari.
+
+        Yang dihitung hanya produk yang sedang menipis atau laku dalam
+        jendela; produk yang tidak laku dan stoknya aman tidak perlu diorder.
+        """
+        hasil = []
+        with self.lock:
+            kandidat = set()
+            for bagian in self._bagian(owner):
+                kandidat |= self._rendah[bagian]
+            if owner is None or not self.inv.kolom_owner:
+                kandidat.update(self.kecepatan.laku())
+            else:
+                kandidat.update(self.kecepatan.laku(self._anggota.get(owner, ())))
+            for kunci in kandidat:
+                p = self.inv.cari(kunci)
+                if p is None:
+                    continue
+                stok = self.inv.stok(kunci)
+                laju = self.kecepatan.per_hari(kunci)
+                saran = math.ceil(laju * (lead_hari + cover_hari) + self.batas(kunci) - stok)
+                if saran <= 0:
+                    continue
+                hasil.append({
+                    **self._baris(kunci, p),
+                    "Terjual/Hari": round(laju, 2),
+                    "Habis Dalam (hari)": round(stok / laju, 1) if laju else None,
+                    "Saran Order": saran,
+                })
+        hasil.sort(key=lambda r: (r["Habis Dalam (hari)"] is None, r["Habis Dalam (hari)"] or 0))
+        return hasil
+
+    def muat_penjualan(self, df, kolom_waktu, kolom_qty, kolom_kunci=None):
+        """Isi ulang kecepatan jual dari histori penjualan.
+
+        Isi sebelumnya diganti, jadi aman dipanggil lagi tiap kali histori
+        dimuat ulang (mis. saat koneksi sheet kembali online).
+        """
+        kolom_kunci = kolom_kunci or self.inv.kunci
+        kolom_kunci = list(kolom_kunci) if isinstance(kolom_kunci, tuple) else [kolom_kunci]
+        if df.empty or not {kolom_waktu, kolom_qty, *kolom_kunci} <= set(df.columns):
+            return
+        tanggal = pd.to_datetime(df[kolom_waktu], errors="coerce").dt.date
+        pilih = tanggal >= self.kecepatan._awal()
+        data = df.loc[pilih, kolom_kunci].assign(
+            _tanggal=tanggal[pilih],
+            _qty=pd.to_numeric(df.loc[pilih, kolom_qty], errors="coerce").fillna(0).astype(int),
+        )
+        kecepatan = Kecepatan(self.kecepatan.hari)
+        for baris in data.groupby(kolom_kunci + ["_tanggal"], sort=False)["_qty"].sum().reset_index().itertuples(index=False):
+            kunci = tuple(baris[:len(kolom_kunci)]) if len(kolom_kunci) > 1 else baris[0]
+            kecepatan.catat(kunci, int(baris[-1]), baris[-2])
+        with self.lock:
+            self.kecepatan = kecepatan
+
+
+# ---------- tampilan streamlit ----------
+def peringatan(monitor):
+    jumlah = monitor.jumlah()
+    if jumlah:
+        st.sidebar.warning(f"⚠️ {jumlah} produk stok menipis")
+
+
+def tampilkan(monitor, owner=None):
+    """Daftar stok menipis, pengaturan batas dan laporan reorder (opsional satu owner)."""
+    menipis = monitor.menipis(owner)
+    if menipis:
+        st.dataframe(pd.DataFrame(menipis))
+    else:
+        st.success("Semua stok aman.")
+
+    with st.expander("Atur Batas Stok"):
+        inv = monitor.inv
+        produk = inv.daftar_owner(owner) if owner is not None and inv.kolom_owner else inv.daftar()
+        if produk:
+            p = st.selectbox("Produk", produk, format_func=lambda p: " - ".join(str(p.get(k)) for k in monitor.kolom),
+                             key="batas_produk")
+            kunci = inv.kunci_dari(p)
+            batas = st.number_input("Batas stok", min_value=0, value=monitor.batas(kunci), key=f"batas_{kunci}")
+            if st.button("Simpan Batas"):
+                monitor.atur_batas(kunci, batas)
+                st.success("Batas stok disimpan.")
+
+    st.subheader("🔁 Laporan Reorder")
+    col1, col2 = st.columns(2)
+    lead = col1.number_input("Lead time (hari)", min_value=0, value=3)
+    cover = col2.number_input("Stok untuk (hari)", min_value=1, value=14)
+    reorder = monitor.reorder(owner, lead, cover)
+    if reorder:
+        st.dataframe(pd.DataFrame(reorder))
+    else:
+        st.info(f"Tidak ada produk yang perlu diorder (kecepatan jual {monitor.kecepatan.hari} hari terakhir).")
+
+
+def halaman(monitor):
+    st.title("⚠️ Stok Menipis")
+    owner = None
+    if monitor.inv.kolom_owner:
+        pilihan = st.selectbox("Owner", ["Semua"] + monitor.inv.owners(), format_func=str)
+        owner = None if pilihan == "Semua" else pilihan
+    tampilkan(monitor, owner)
@@ -0,0 +1,161 @@
+from functools import lru_cache
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+import memori
+import profil
+from inventaris import parse_int, sel_a1
+from transaksi import KOLOM_ID, id_transaksi  # app tetap memakai struk.KOLOM_ID / struk.id_transaksi
+
+# ================= STRUK TRANSAKSI =================
+# Struk dibuat dari satu dict transaksi:
+#   {"id", "waktu", "items": [{"nama", "qty", "harga"}], "total",
+#    "bayar" (opsional), "kembalian" (opsional)}
+#
+# Layout teks (printer thermal, lebar tetap) dan PDF memakai baris yang
+# sama. Template (header toko, font, ukuran halaman) disusun sekali lalu
+# di-cache, jadi render satu struk cukup menyusun baris item dan menulis
+# ke canvas reportlab (tanpa platypus), hanya beberapa milidetik.
+
+MM = 72 / 25.4  # 1 mm dalam point PDF
+def pastikan_kolom_id(sheet):
+    """Tambahkan kolom ID Transaksi di ujung header sheet Penjualan kalau belum ada."""
+    header = sheet.row_values(1)
+    if header and KOLOM_ID not in header:
+        sheet.update([[KOLOM_ID]], sel_a1(1, len(header) + 1))
+
+
+def rp(nilai):
+    return f"{int(nilai):,}"
+
+
+class Template:
+    def __init__(self, nama_toko, alamat="", lebar=32, kertas_mm=58, penutup="Terima kasih!"):
+        self.lebar = lebar                # jumlah karakter per baris
+        self.kertas = kertas_mm * MM      # lebar kertas dalam point
+        self.garis = "-" * lebar
+        self.font = "Courier"
+        # ukuran font supaya `lebar` karakter Courier (0.6 em) pas di kertas
+        self.ukuran_font = round((self.kertas - 8 * MM) / (lebar * 0.6), 1)
+        self.spasi = self.ukuran_font * 1.25
+        self.kepala = [nama_toko.upper().center(lebar)]
+        if alamat:
+            self.kepala.append(alamat[:lebar].center(lebar))
+        self.kepala.append(self.garis)
+        self.kaki = [self.garis, penutup.center(lebar)]
+
+    def _kiri_kanan(self, kiri, kanan):
+        kanan = str(kanan)
+        return f"{str(kiri)[:self.lebar - len(kanan) - 1]:<{self.lebar - len(kanan)}}{kanan}"
+
+    def baris(self, struk):
+        baris = list(self.kepala)
+        baris.append(f"No : {struk['id']}")
+        baris.append(f"Tgl: {struk['waktu']}")
+        baris.append(self.garis)
+        for item in struk["items"]:
+            baris.append(str(item["nama"])[:self.lebar])
+            baris.append(self._kiri_kanan(f"  {item['qty']} x {rp(item['harga'])}", rp(item["qty"] * item["harga"])))
+        baris.append(self.garis)
+        baris.append(self._kiri_kanan("TOTAL", rp(struk["total"])))
+        if struk.get("bayar") is not None:
+            baris.append(self._kiri_kanan("BAYAR", rp(struk["bayar"])))
+            baris.append(self._kiri_kanan("KEMBALI", rp(struk["kembalian"])))
+        baris.extend(self.kaki)
+        return baris
+
+    # ---------- output ----------
+    def teks(self, struk):
+        """Layout teks untuk printer thermal."""
+        return "\n".join(self.baris(struk)) + "\n"
+
+    def pdf(self, daftar_struk):
+        """PDF satu halaman per struk (satu struk atau cetak ulang banyak sekaligus)."""
+        with profil.ukur("import reportlab"):
+            from reportlab.pdfgen import canvas
+
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer)
+        for struk in daftar_struk:
+            baris = self.baris(struk)
+            tinggi = (len(baris) + 2) * self.spasi + 8 * MM
+            c.setPageSize((self.kertas, tinggi))
+            teks = c.beginText(4 * MM, tinggi - 4 * MM - self.ukuran_font)
+            teks.setFont(self.font, self.ukuran_font, self.spasi)
+            for b in baris:
+                teks.textLine(b)
+            c.drawText(teks)
+            c.showPage()
+        c.save()
+        return buffer.getvalue()
+
+
+@lru_cache(maxsize=8)
+def template(nama_toko, alamat="", lebar=32, kertas_mm=58):
+    return Template(nama_toko, alamat, lebar, kertas_mm)
+
+
+# ---------- tampilan streamlit ----------
+def tampilkan(data, tpl):
+    """Struk di halaman kasir + tombol unduh PDF dan teks thermal."""
+    teks = tpl.teks(data)
+    st.code(teks)
+    col1, col2 = st.columns(2)
+    col1.download_button("🧾 Struk PDF", tpl.pdf([data]), f"struk_{data['id']}.pdf", mime="application/pdf")
+    col2.download_button("🖨️ Struk Thermal", teks, f"struk_{data['id']}.txt", mime="text/plain")
+
+
+def cetak_ulang(df, tpl, **kolom):
+    """Form cetak ulang struk untuk rentang tanggal. kolom = argumen kolom dari_baris()."""
+    st.subheader("🧾 Cetak Ulang Struk")
+    col1, col2 = st.columns(2)
+    dari = col1.date_input("Dari Tanggal", key="struk_dari")
+    sampai = col2.date_input("Sampai Tanggal", key="struk_sampai")
+    if st.button("Siapkan Struk"):
+        daftar = dari_baris(df, dari=dari, sampai=sampai, **kolom)
+        # PDF bisa besar: disimpan di gudang sesi (lihat memori.py), bukan session_state
+        memori.simpan("cetak_ulang", (len(daftar), tpl.pdf(daftar) if daftar else None))
+    if memori.ambil("cetak_ulang") is not None:
+        jumlah, pdf = memori.ambil("cetak_ulang")
+        if pdf:
+            st.download_button(f"⬇️ Download {jumlah} Struk (PDF)", pdf, "cetak_ulang_struk.pdf", mime="application/pdf")
+        else:
+            st.info("Tidak ada transaksi di rentang tanggal ini.")
+
+
+# ---------- cetak ulang ----------
+def dari_baris(df, kolom_waktu, kolom_nama, kolom_qty, kolom_harga, kolom_id=None, dari=None, sampai=None):
+    """Susun ulang struk dari baris penjualan (satu baris per item), untuk rentang tanggal.
+
+    Baris dikelompokkan per ID transaksi; baris lama tanpa ID dikelompokkan per waktu.
+    """
+    if df.empty:
+        return []
+    tanggal = pd.to_datetime(df[kolom_waktu], errors="coerce").dt.date
+    pilih = tanggal.notna()
+    if dari:
+        pilih &= tanggal >= dari
+    if sampai:
+        pilih &= tanggal <= sampai
+    df = df[pilih]
+
+    kunci = df[kolom_waktu].astype(str)
+    if kolom_id and kolom_id in df:
+        ada_id = df[kolom_id].fillna("").astype(str) != ""
+        kunci = kunci.where(~ada_id, df[kolom_id].astype(str))
+
+    hasil = []
+    for k, grup in df.groupby(kunci, sort=False):
+        items = [
+            {"nama": r[kolom_nama], "qty": parse_int(r[kolom_qty]), "harga": parse_int(r[kolom_harga])}
+            for r in grup.to_dict("records")
+        ]
+        hasil.append({
+            "id": k if k != str(grup[kolom_waktu].iloc[0]) else "-",
+            "waktu": grup[kolom_waktu].iloc[0],
+            "items": items,
+            "total": sum(i["qty"] * i["harga"] for i in items),
+        })
+    return hasil
@@ -0,0 +1,105 @@
+import uuid
+from datetime import datetime
+
+# ================= INTI TRANSAKSI =================
+# Bagian kasir yang tidak butuh Streamlit, dipakai halaman (lewat pos.py &
+# struk.py) maupun api.py yang berjalan tanpa Streamlit:
+#
+# - Keranjang: baris keranjang dengan ID stabil,
+# - id_transaksi(): ID transaksi untuk struk & kolom ID Transaksi,
+# - checkout(): reserve stok, catat transaksi, baru commit stok, jadi stok
+#   tidak pernah berkurang tanpa transaksi yang tercatat.
+
+KOLOM_ID = "ID Transaksi"
+
+
+def id_transaksi():
+    """ID transaksi singkat yang bisa dibaca kasir, mis. 241019-3F9A2C."""
+    return f"{datetime.now():%y%m%d}-{uuid.uuid4().hex[:6].upper()}"
+
+
+def checkout(inventaris, items, catat):
+    """items: list (kunci, qty). Reserve stok, jalankan catat() (mis. log.catat), lalu commit.
+
+    Kalau catat() gagal, reservasi dilepas dan error diteruskan; stok tetap.
+    StokTidakCukup dari reserve juga diteruskan. Mengembalikan hasil catat().
+    """
+    rid = inventaris.reserve(items)
+    try:
+        hasil = catat()
+    except BaseException:
+        inventaris.release(rid)
+        raise
+    inventaris.commit(rid)
+    return hasil
+
+
+class Keranjang:
+    """Baris keranjang dengan ID stabil, jadi widget per baris tidak bergeser saat ada yang dihapus.
+
+    kunci: nama kolom (atau tuple kolom) yang menandai produk yang sama.
+    kolom_subtotal (opsional) dihitung ulang dari kolom_harga x kolom_qty.
+    """
+
+    def __init__(self, kunci, kolom_qty, kolom_harga, kolom_subtotal=None):
+        self.kunci = kunci
+        self.kolom_qty = kolom_qty
+        self.kolom_harga = kolom_harga
+        self.kolom_subtotal = kolom_subtotal
+        self.baris = {}  # id baris -> item (urutan sesuai urutan tambah)
+        self.versi = 0   # naik tiap kali isi keranjang berubah
+        self.tanda_harga = None  # (versi keranjang, versi tabel, daftar) terakhir dihitung harga.Mesin
+
+    def __iter__(self):
+        return iter(list(self.baris.values()))
+
+    def __len__(self):
+        return len(self.baris)
+
+    def _kunci(self, item):
+        if isinstance(self.kunci, tuple):
+            return tuple(item[k] for k in self.kunci)
+        return item[self.kunci]
+
+    def _hitung(self, item):
+        if self.kolom_subtotal:
+            item[self.kolom_subtotal] = item[self.kolom_harga] * item[self.kolom_qty]
+
+    def cari(self, kunci):
+        for id_baris, item in self.baris.items():
+            if self._kunci(item) == kunci:
+                return id_baris
+        return None
+
+    def qty(self, kunci):
+        id_baris = self.cari(kunci)
+        return self.baris[id_baris][self.kolom_qty] if id_baris is not None else 0
+
+    # ---------- ubah ----------
+    def tambah(self, item, qty):
+        """Tambah qty ke baris produk yang sama, atau buat baris baru. Mengembalikan id baris."""
+        id_baris = self.cari(self._kunci(item))
+        if id_baris is None:
+            id_baris = uuid.uuid4().hex[:8]
+            self.baris[id_baris] = dict(item, **{self.kolom_qty: 0})
+        self.baris[id_baris][self.kolom_qty] += qty
+        self._hitung(self.baris[id_baris])
+        self.versi += 1
+        return id_baris
+
+    def ubah_qty(self, id_baris, qty):
+        if id_baris in self.baris:
+            self.baris[id_baris][self.kolom_qty] = qty
+            self._hitung(self.baris[id_baris])
+            self.versi += 1
+
+    def hapus(self, id_baris):
+        if self.baris.pop(id_baris, None) is not None:
+            self.versi += 1
+
+    def kosongkan(self):
+        self.baris.clear()
+        self.versi += 1
+
+    def total(self):
+        return sum(item[self.kolom_harga] * item[self.kolom_qty] for item in self.baris.values())
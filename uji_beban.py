@@ -0,0 +1,404 @@
+import argparse
+import http.client
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import quote, urlparse
+
+import pandas as pd
+
+import selisih
+import sheet_lokal
+import sheet_mentah
+import transaksi
+from inventaris import Inventaris, StokTidakCukup, checkout_remote
+
+# ================= UJI BEBAN KASIR =================
+# Berapa kasir yang sanggup dilayani satu server? Script ini menjalankan N
+# kasir bersamaan (thread), masing-masing mengulang alur nyata:
+# cari produk -> tambah ke keranjang -> ubah qty -> checkout -> kadang buka
+# laporan, dan sesekali Edit Produk. Dicatat latensi (p50/p95/p99), jumlah
+# per detik dan error per langkah.
+#
+# Mode inti (default): memakai fungsi app apa adanya (Inventaris,
+# checkout_remote, append penjualan, simpan katalog lewat selisih.terapkan
+# seperti save_produk) di atas Google Sheet lokal (sheet_lokal) yang diberi
+# jeda per panggilan untuk meniru round-trip jaringan. --server membagi
+# kasir ke beberapa server (Inventaris sendiri-sendiri) yang memakai sheet
+# yang sama.
+#
+# Mode API (--api URL): alur yang sama lewat REST API (lihat api.py), mis.
+# ke app yang dijalankan dengan KASIR_API_PORT. Tanpa URL, API mandiri
+# dijalankan di proses ini.
+#
+# Di akhir, stok diperiksa: stok akhir harus = stok awal - qty terjual.
+# Stok akhir lebih besar berarti ada pengurangan stok yang tertimpa (lost
+# update), mis. Edit Produk yang menulis kolom Stock dari katalog yang
+# dibaca sebelum checkout kasir lain.
+#
+#   python uji_beban.py --kasir 20 --durasi 30 --latensi 0.05 --edit 0.02
+#   python uji_beban.py --api http://127.0.0.1:8502 --kunci name --qty qty
+
+HEADER_PRODUK = ["Nama Produk", "Owner", "Harga Reseller", "Harga Retail", "Potongan", "Stock"]
+HEADER_PENJUALAN = ["Waktu", "Nama Produk", "Owner", "Harga Jual", "Qty", "Subtotal", transaksi.KOLOM_ID]
+
+
+class Lambat:
+    """Proxy objek sheet_lokal dengan jeda per panggilan, meniru round-trip ke Google Sheets."""
+
+    def __init__(self, objek, latensi):
+        self._objek = objek
+        self._latensi = latensi
+
+    def __getattr__(self, nama):
+        nilai = getattr(self._objek, nama)
+        if nama == "spreadsheet":
+            return Lambat(nilai, self._latensi)
+        if not callable(nilai):
+            return nilai
+
+        def panggil(*args, **kwargs):
+            time.sleep(self._latensi * random.uniform(0.5, 1.5))
+            hasil = nilai(*args, **kwargs)
+            return Lambat(hasil, self._latensi) if isinstance(hasil, sheet_lokal.Worksheet) else hasil
+
+        return panggil
+
+
+class Pencatat:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waktu = defaultdict(list)                       # langkah -> list detik
+        self.error = defaultdict(lambda: defaultdict(int))   # langkah -> jenis error -> jumlah
+        self.terjual = defaultdict(int)                      # kunci -> qty dari checkout yang berhasil
+
+    def ukur(self, langkah, fungsi, *args):
+        mulai = time.perf_counter()
+        try:
+            return fungsi(*args)
+        except Exception as e:
+            with self.lock:
+                self.error[langkah][type(e).__name__] += 1
+            raise
+        finally:
+            with self.lock:
+                self.waktu[langkah].append(time.perf_counter() - mulai)
+
+    def jual(self, items):
+        with self.lock:
+            for kunci, qty in items:
+                self.terjual[kunci] += qty
+
+    def ringkasan(self, durasi):
+        baris = []
+        with self.lock:
+            for langkah, waktu in self.waktu.items():
+                ms = pd.Series(waktu) * 1000
+                gagal = sum(self.error[langkah].values())
+                baris.append({
+                    "Langkah": langkah,
+                    "Jumlah": len(waktu),
+                    "Per Detik": round(len(waktu) / durasi, 1),
+                    "Error %": round(100 * gagal / len(waktu), 2),
+                    "p50 (ms)": round(ms.quantile(0.5), 1),
+                    "p95 (ms)": round(ms.quantile(0.95), 1),
+                    "p99 (ms)": round(ms.quantile(0.99), 1),
+                    "Max (ms)": round(ms.max(), 1),
+                    "Error": ", ".join(f"{k}: {v}" for k, v in self.error[langkah].items()),
+                })
+        return pd.DataFrame(baris)
+
+
+# ---------- mode inti: fungsi app di atas sheet lokal ----------
+def buat_sheet(jumlah_produk, stok, pemilik=5):
+    """Spreadsheet lokal di memori (tanpa file) berisi sheet Produk & Penjualan."""
+    spreadsheet = sheet_lokal.Spreadsheet(path="")
+    produk = spreadsheet.add_worksheet("Produk")
+    produk.update([HEADER_PRODUK] + [
+        [f"Produk {i:05d}", f"Owner {i % pemilik}", 40000 + i, 50000 + i, 10000, stok]
+        for i in range(jumlah_produk)
+    ])
+    spreadsheet.add_worksheet("Penjualan").update([HEADER_PENJUALAN])
+    return spreadsheet
+
+
+class Server:
+    """Satu server app: inventaris bersama semua kasirnya, sheet lewat jaringan (Lambat)."""
+
+    def __init__(self, spreadsheet, latensi, jeda_edit):
+        self.sheet_produk = Lambat(spreadsheet, latensi).worksheet("Produk")
+        self.sheet_penjualan = Lambat(spreadsheet, latensi).worksheet("Penjualan")
+        self.jeda_edit = jeda_edit
+        self.inventaris = Inventaris(self.load_records(), "Nama Produk", "Stock", "Owner")
+
+    def load_records(self):
+        return sheet_mentah.baca_records(self.sheet_produk)
+
+
+class KlienInti:
+    """Satu kasir yang memanggil fungsi app langsung, seperti halaman Kasir di bismillah.py."""
+
+    def __init__(self, server, rng):
+        self.server = server
+        self.inv = server.inventaris
+        self.rng = rng
+
+    def cari(self):
+        # seperti kotak cari katalog: saring nama produk dengan potongan teks
+        teks = f"{self.rng.randrange(len(self.inv.produk)):05d}"[:self.rng.randint(3, 5)]
+        hasil = [p["Nama Produk"] for p in self.inv.daftar() if teks in p["Nama Produk"]]
+        return self.rng.choice(hasil) if hasil else self.inv.daftar()[0]["Nama Produk"]
+
+    def keranjang_baru(self):
+        return transaksi.Keranjang("Nama Produk", "Qty", "Harga Jual", "Subtotal")
+
+    def tambah(self, keranjang, kunci, qty):
+        p = self.inv.cari(kunci)
+        if self.inv.tersedia(kunci) < keranjang.qty(kunci) + qty:
+            raise StokTidakCukup(kunci)
+        keranjang.tambah({"Nama Produk": kunci, "Owner": p["Owner"], "Harga Jual": int(p["Harga Retail"])}, qty)
+
+    def ubah(self, keranjang):
+        id_baris, item = self.rng.choice(list(keranjang.baris.items()))
+        qty = self.rng.randint(1, 3)
+        if self.inv.tersedia(item["Nama Produk"]) < qty:
+            raise StokTidakCukup(item["Nama Produk"])
+        keranjang.ubah_qty(id_baris, qty)
+
+    def checkout(self, keranjang):
+        items = [(item["Nama Produk"], item["Qty"]) for item in keranjang]
+        checkout_remote(self.server.sheet_produk, self.inv, items, self.server.load_records)
+        waktu = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        id_trx = transaksi.id_transaksi()
+        self.server.sheet_penjualan.append_rows([
+            [waktu, i["Nama Produk"], i["Owner"], i["Harga Jual"], i["Qty"], i["Subtotal"], id_trx] for i in keranjang
+        ])
+        return items
+
+    def laporan(self):
+        df = sheet_mentah.tabel(sheet_mentah.grid(self.server.sheet_penjualan))
+        return df.groupby("Owner")["Subtotal"].sum() if not df.empty else df
+
+    def edit(self):
+        # alur Edit Produk: kasir mengisi form (jeda), klik Update -> rerun membaca
+        # katalog terbaru lalu simpan_katalog. Hanya Harga Retail yang diubah; Stock
+        # tidak dikirim karena tidak diedit (lihat bismillah.py), dan di memori cukup
+        # satu produk itu yang diperbarui, stok checkout kasir lain tidak tertimpa.
+        kunci = self.rng.choice(self.inv.daftar())["Nama Produk"]
+        time.sleep(self.server.jeda_edit)
+        lama = [dict(p) for p in self.inv.daftar()]
+        df = pd.DataFrame(lama)
+        i = df.index[df["Nama Produk"] == kunci][0]
+        harga = int(df.at[i, "Harga Retail"]) + 100
+        df.at[i, "Harga Retail"] = harga
+        values = [df.columns.values.tolist()] + df.values.tolist()
+        selisih.terapkan(self.server.sheet_produk, values, lama, "Nama Produk")
+        self.inv.ubah(kunci, {"Harga Retail": harga})
+
+
+# ---------- mode API ----------
+class GagalHttp(Exception):
+    pass
+
+
+class KlienApi:
+    """Satu kasir lewat REST API (lihat api.py), satu koneksi keep-alive per kasir."""
+
+    def __init__(self, url, kunci_produk, kolom_kunci, kolom_qty, rng):
+        alamat = urlparse(url)
+        self.koneksi = http.client.HTTPConnection(alamat.hostname, alamat.port or 80, timeout=30)
+        self.kunci_produk = kunci_produk
+        self.kolom_kunci = kolom_kunci
+        self.kolom_qty = kolom_qty
+        self.rng = rng
+
+    def minta(self, method, path, body=None):
+        self.koneksi.request(method, path, json.dumps(body) if body is not None else None,
+                             {"Content-Type": "application/json"})
+        r = self.koneksi.getresponse()
+        data = json.loads(r.read() or b"null")
+        if r.status == 409:
+            raise StokTidakCukup(data["error"])
+        if r.status != 200:
+            raise GagalHttp(f"{r.status} {data}")
+        return data
+
+    def cari(self):
+        kunci = self.rng.choice(self.kunci_produk)
+        teks = json.dumps(kunci) if isinstance(kunci, list) else str(kunci)
+        self.minta("GET", f"/produk/{quote(teks, safe='')}")
+        return kunci
+
+    def keranjang_baru(self):
+        return self.minta("POST", "/keranjang")["id"]
+
+    def tambah(self, keranjang, kunci, qty):
+        self.minta("POST", f"/keranjang/{keranjang}/item", {"kunci": kunci, "qty": qty})
+
+    def ubah(self, keranjang):
+        item = self.rng.choice(self.minta("GET", f"/keranjang/{keranjang}")["items"])
+        self.minta("PATCH", f"/keranjang/{keranjang}/item/{item['baris']}", {"qty": self.rng.randint(1, 3)})
+
+    def checkout(self, keranjang):
+        isi = self.minta("GET", f"/keranjang/{keranjang}")["items"]
+        self.minta("POST", f"/keranjang/{keranjang}/checkout")
+        return [(_kunci(item[self.kolom_kunci]), item[self.kolom_qty]) for item in isi]
+
+    def laporan(self):
+        return self.minta("GET", "/laporan")
+
+
+def _kunci(kunci):
+    return tuple(kunci) if isinstance(kunci, list) else kunci
+
+
+def stok_api(url, kolom_kunci):
+    alamat = urlparse(url)
+    koneksi = http.client.HTTPConnection(alamat.hostname, alamat.port or 80, timeout=30)
+    koneksi.request("GET", "/produk")
+    produk = json.loads(koneksi.getresponse().read())
+    koneksi.close()
+    if isinstance(kolom_kunci, tuple):
+        return {tuple(p[k] for k in kolom_kunci): p["tersedia"] for p in produk}
+    return {p[kolom_kunci]: p["tersedia"] for p in produk}
+
+
+# ---------- jalankan ----------
+def kasir(klien, catat, sampai, p_laporan, p_edit, jeda):
+    rng = klien.rng
+    while time.monotonic() < sampai:
+        try:
+            if rng.random() < p_edit:
+                catat.ukur("edit produk", klien.edit)
+                continue
+            keranjang = catat.ukur("keranjang baru", klien.keranjang_baru)
+            isi = 0
+            for _ in range(rng.randint(1, 4)):
+                kunci = catat.ukur("cari", klien.cari)
+                try:
+                    catat.ukur("tambah", klien.tambah, keranjang, kunci, rng.randint(1, 3))
+                    isi += 1
+                except StokTidakCukup:
+                    pass  # seperti di kasir: pilih produk lain
+            if not isi:
+                continue
+            try:
+                catat.ukur("ubah qty", klien.ubah, keranjang)
+            except StokTidakCukup:
+                pass
+            catat.jual(catat.ukur("checkout", klien.checkout, keranjang))
+            if rng.random() < p_laporan:
+                catat.ukur("laporan", klien.laporan)
+        except Exception:
+            pass  # sudah dihitung per langkah oleh Pencatat
+        time.sleep(jeda * rng.random())
+
+
+def jalankan(buat_klien, jumlah_kasir, durasi, p_laporan=0.1, p_edit=0.0, jeda=0.0, seed=1):
+    """buat_klien(i, rng) -> klien kasir ke-i. Mengembalikan (Pencatat, durasi sebenarnya)."""
+    catat = Pencatat()
+    sampai = time.monotonic() + durasi
+    thread = [
+        threading.Thread(target=kasir, args=(buat_klien(i, random.Random(seed + i)), catat, sampai, p_laporan, p_edit, jeda),
+                         name=f"kasir-{i}", daemon=True)
+        for i in range(jumlah_kasir)
+    ]
+    mulai = time.monotonic()
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+    return catat, time.monotonic() - mulai
+
+
+def periksa_stok(awal, akhir, terjual):
+    """Bandingkan stok akhir dengan stok awal - terjual. Mengembalikan DataFrame produk yang tidak cocok."""
+    baris = []
+    for kunci, stok_awal in awal.items():
+        harapan = stok_awal - terjual.get(kunci, 0)
+        if akhir.get(kunci) != harapan:
+            baris.append({"Produk": kunci, "Awal": stok_awal, "Terjual": terjual.get(kunci, 0),
+                          "Harapan": harapan, "Akhir": akhir.get(kunci)})
+    return pd.DataFrame(baris, columns=["Produk", "Awal", "Terjual", "Harapan", "Akhir"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uji beban kasir bersamaan")
+    parser.add_argument("--kasir", type=int, default=10, help="jumlah kasir bersamaan")
+    parser.add_argument("--durasi", type=float, default=20, help="detik")
+    parser.add_argument("--laporan", type=float, default=0.1, help="peluang buka laporan setelah checkout")
+    parser.add_argument("--edit", type=float, default=0.0, help="peluang Edit Produk per putaran (mode inti)")
+    parser.add_argument("--jeda", type=float, default=0.0, help="jeda maksimum antar transaksi per kasir (detik)")
+    parser.add_argument("--seed", type=int, default=1)
+    # mode inti
+    parser.add_argument("--server", type=int, default=1, help="jumlah server app yang berbagi sheet")
+    parser.add_argument("--produk", type=int, default=200)
+    parser.add_argument("--stok", type=int, default=1000)
+    parser.add_argument("--latensi", type=float, default=0.02, help="jeda rata-rata per panggilan sheet (detik)")
+    parser.add_argument("--jeda-edit", type=float, default=0.5, help="waktu mengisi form Edit Produk (detik)")
+    # mode API
+    parser.add_argument("--api", nargs="?", const="", default=None, help="URL API; kosong = jalankan API mandiri")
+    parser.add_argument("--kunci", default="Nama Produk", help="kolom kunci produk di API")
+    parser.add_argument("--qty", default="Qty", help="kolom qty keranjang di API")
+    args = parser.parse_args()
+    if args.api is not None and args.edit:
+        parser.error("--edit hanya untuk mode inti: API tidak punya Edit Produk")
+
+    if args.api is None:
+        spreadsheet = buat_sheet(args.produk, args.stok)
+        server = [Server(spreadsheet, args.latensi, args.jeda_edit) for _ in range(args.server)]
+        awal = {p["Nama Produk"]: p["Stock"] for p in sheet_mentah.records(sheet_mentah.grid(spreadsheet.worksheet("Produk")))}
+        catat, durasi = jalankan(lambda i, rng: KlienInti(server[i % len(server)], rng), args.kasir, args.durasi,
+                                 args.laporan, args.edit, args.jeda, args.seed)
+        akhir = {p["Nama Produk"]: p["Stock"] for p in sheet_mentah.records(sheet_mentah.grid(spreadsheet.worksheet("Produk")))}
+        penjualan = sheet_mentah.tabel(sheet_mentah.grid(spreadsheet.worksheet("Penjualan")))
+        tercatat = penjualan.groupby("Nama Produk")["Qty"].sum().to_dict() if not penjualan.empty else {}
+    else:
+        url = args.api
+        sementara = None
+        try:
+            if not url:
+                import api
+                import log_transaksi
+                # log API mandiri di folder sementara (dihapus di akhir), bukan data_lokal milik app
+                log_transaksi.FOLDER = sementara = tempfile.mkdtemp(prefix="uji_beban_")
+                inventaris = Inventaris([{"Nama Produk": f"Produk {i:05d}", "Harga Retail": 50000 + i,
+                                          "Stock": args.stok} for i in range(args.produk)], "Nama Produk", "Stock")
+                api_server = api.mulai(api.toko_standar(inventaris, log_transaksi.LogTransaksi("uji_beban"),
+                                                        "Harga Retail"), port=0)
+                url = f"http://127.0.0.1:{api_server.server_address[1]}"
+            awal = stok_api(url, args.kunci)
+            kunci_produk = [list(k) if isinstance(k, tuple) else k for k in awal]
+            catat, durasi = jalankan(lambda i, rng: KlienApi(url, kunci_produk, args.kunci, args.qty, rng), args.kasir,
+                                     args.durasi, args.laporan, 0.0, args.jeda, args.seed)
+            akhir = stok_api(url, args.kunci)
+        finally:
+            if sementara:
+                if url:
+                    api_server.shutdown()
+                shutil.rmtree(sementara, ignore_errors=True)
+        tercatat = None
+
+    pd.set_option("display.width", 200)
+    print(f"{args.kasir} kasir, {durasi:.1f} detik")
+    print(catat.ringkasan(durasi).to_string(index=False))
+
+    selisih_stok = periksa_stok(awal, akhir, catat.terjual)
+    hilang = (selisih_stok["Akhir"] - selisih_stok["Harapan"]).clip(lower=0).sum()
+    print(f"\nQty terjual: {sum(catat.terjual.values())}")
+    if selisih_stok.empty:
+        print("Stok konsisten: stok akhir = stok awal - terjual untuk semua produk.")
+    else:
+        print(f"STOK TIDAK KONSISTEN di {len(selisih_stok)} produk; {hilang} qty pengurangan stok hilang (lost update).")
+        print(selisih_stok.head(20).to_string(index=False))
+    if tercatat is not None and tercatat != {k: v for k, v in catat.terjual.items() if v}:
+        print("Baris Penjualan di sheet tidak sama dengan checkout yang berhasil.")
+
+
+if __name__ == "__main__":
+    main()